@@ -0,0 +1,143 @@
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+
+import httpcache
+import ingest
+from figcache import figure_cache
+from predcache import prediction_cache
+from inference import feature_info, registry, DEFAULT_MODEL, wqi_labels
+
+api = Blueprint("api", __name__, url_prefix="/api/v1")
+
+# Rows per chunk written to the response stream.
+STREAM_CHUNK_ROWS = 10000
+
+
+class BatchError(ValueError):
+    pass
+
+
+def _read_batch():
+    if request.mimetype in ("text/csv", "application/csv"):
+        return pd.read_csv(io.BytesIO(request.get_data()))
+
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict) and "rows" in payload:
+        payload = payload["rows"]
+    if not payload:
+        raise BatchError("Request body must be CSV or a non-empty JSON list of rows.")
+    return pd.DataFrame(payload)
+
+
+def _feature_matrix(batch, feature_keys):
+    # Accept the form keys ("bod") as well as the dataset column names ("BOD (mg/l)").
+    columns = {}
+    for key in feature_keys:
+        column = feature_info[key][0]
+        for name in (key, column, column.strip()):
+            if name in batch.columns:
+                columns[key] = name
+                break
+    missing = [key for key in feature_keys if key not in columns]
+    if missing:
+        raise BatchError(f"Missing columns: {', '.join(missing)}")
+
+    values = batch[[columns[key] for key in feature_keys]].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    # The model validates in float32, so anything beyond that range is rejected up front.
+    valid = np.isfinite(values) & (values >= 0) & (values <= np.finfo(np.float32).max)
+    bad_rows = np.flatnonzero(~valid.all(axis=1))
+    if len(bad_rows):
+        raise BatchError(f"{len(bad_rows)} rows have missing, non-numeric or out-of-range values (first: {bad_rows[:20].tolist()})")
+    return values
+
+
+def _csv_chunks(wqi, labels):
+    yield "wqi,label\n"
+    for start in range(0, len(wqi), STREAM_CHUNK_ROWS):
+        stop = start + STREAM_CHUNK_ROWS
+        yield pd.DataFrame({"wqi": wqi[start:stop], "label": labels[start:stop]}).to_csv(index=False, header=False)
+
+
+def _ndjson_chunks(wqi, labels):
+    for start in range(0, len(wqi), STREAM_CHUNK_ROWS):
+        stop = start + STREAM_CHUNK_ROWS
+        yield "".join(json.dumps({"wqi": w, "label": l}) + "\n" for w, l in zip(wqi[start:stop].tolist(), labels[start:stop].tolist()))
+
+
+@api.route("/predict", methods=["POST"])
+def predict_batch():
+    """Score many samples in one vectorized pass. Responds with CSV for CSV input, NDJSON otherwise.
+
+    ``?model=isqa`` picks the ISQA model instead of the default weight-based one.
+    """
+    name = request.args.get("model", DEFAULT_MODEL)
+    if name not in registry.specs:
+        return jsonify(error=f"Unknown model {name!r}; choose from {', '.join(registry.specs)}"), 400
+    try:
+        bundle = registry.get(name)
+        values = _feature_matrix(_read_batch(), bundle.features)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    wqi = bundle.predict_wqi(values)
+    labels = wqi_labels(wqi)
+    headers = {"X-Model-Version": f"{bundle.name}@{bundle.version}"}
+
+    if request.mimetype in ("text/csv", "application/csv") or request.accept_mimetypes.best == "text/csv":
+        return Response(stream_with_context(_csv_chunks(wqi, labels)), mimetype="text/csv", headers=headers)
+    return Response(stream_with_context(_ndjson_chunks(wqi, labels)), mimetype="application/x-ndjson", headers=headers)
+
+
+@api.route("/readings", methods=["POST"])
+def add_readings():
+    """Append new readings (CSV or JSON rows in the water.csv schema) to the live data.
+
+    With WPP_INGEST_DIR set the batch goes through the drop directory, so every worker ingests it
+    on its next poll (202); otherwise only this worker applies it, right away.
+    """
+    drop_dir = os.environ.get("WPP_INGEST_DIR")
+    try:
+        if drop_dir:
+            accepted, rejected = ingest.drop_readings(_read_batch(), drop_dir)
+        else:
+            accepted, rejected = ingest.ingest_readings(_read_batch())
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    if drop_dir:
+        return jsonify(accepted=accepted, rejected=rejected, queued=True), 202
+    return jsonify(accepted=accepted, rejected=rejected, total_ingested=ingest.ingested_rows)
+
+
+@api.route("/figure-cache", methods=["GET"])
+def figure_cache_stats():
+    return jsonify(figure_cache.stats())
+
+
+@api.route("/prediction-cache", methods=["GET"])
+def prediction_cache_stats():
+    return jsonify(prediction_cache.stats())
+
+
+@api.route("/http-cache", methods=["GET"])
+def http_cache_stats():
+    return jsonify(httpcache.stats())
+
+
+@api.route("/models", methods=["GET"])
+def list_models():
+    """Version, load time and memory of each model, and whether a new version is loading."""
+    return jsonify(registry.models())
+
+
+@api.route("/models/<name>/reload", methods=["POST"])
+def reload_model(name):
+    """Load the model's files again in the background; requests keep using the current version until it is ready."""
+    if name not in registry.specs:
+        return jsonify(error=f"Unknown model {name!r}"), 404
+    registry.reload(name)
+    return jsonify(reloading=name), 202
@@ -1,61 +1,110 @@
 import dash
+import dash_bootstrap_components as dbc
+import logging
+import os
+import threading
 import numpy as np
 import pandas as pd
-import dash_leaflet as dl
-import plotly.express as px
 import plotly.graph_objects as go
-import dash_bootstrap_components as dbc
-import os
 
-from plotly.subplots import make_subplots
-from dash import dcc, html, Input, Output, State, no_update
+from dash import dcc, html, callback, clientside_callback, ClientsideFunction, ctx, Input, Output, Patch, State, no_update
 
-from map import map_layout
+import map as map_page
 
 import warnings
 warnings.filterwarnings("ignore")
 
-import joblib
-model = joblib.load("code/wpp_model_weight.pkl")
-scaler = joblib.load("code/scaler.dump")
-
-df = pd.read_csv('data/water.csv')
-df = df.dropna(subset=['year', 'Canal_name (EN)', 'Sample_water_point (EN)', '  pH', 'SS (mg/l)', 'NH3N (mg/l)', 'DO (mg/l)', 'TEMP. (oC)', 'H2S (mg/l)', 'BOD (mg/l)', 'COD (mg/l)', 'TKN (mg/l)', 'NO2 (mg/l)', 'NO3 (mg/l)', 'T-P (mg/l)', 'T.Coliform (col/100ml)'])
-df = df[df['Canal_name (EN)'] != '#VALUE!']
-df['year'] = df['year'].astype(int) - 543
-
-map_df = pd.read_csv('data/canalwater1.csv')
-
-map_df = map_df[['Canal_name (EN)', 'Latitude', 'Longitude', '  pH', 'DO (mg/l)', 'SS (mg/l)']]
-map_df = map_df.dropna(subset=['Latitude', 'Longitude', '  pH', 'DO (mg/l)', 'SS (mg/l)'])
-map_df = map_df[(map_df['Latitude'] != 0) & (map_df['Longitude'] != 0)]
-
-aggregated_df = df.groupby(['Canal_name (EN)', 'year']).agg({
-    '  pH': 'mean', 'DO (mg/l)': 'mean', 'SS (mg/l)': 'mean', 'NH3N (mg/l)': 'mean',
-    'TEMP. (oC)': 'mean', 'H2S (mg/l)': 'mean', 'BOD (mg/l)': 'mean', 'COD (mg/l)': 'mean',
-    'TKN (mg/l)': 'mean', 'NO2 (mg/l)': 'mean', 'NO3 (mg/l)': 'mean', 'T-P (mg/l)': 'mean',
-    'T.Coliform (col/100ml)': 'mean',
-}).reset_index()
-
-canal_options = [{'label': canal, 'value': canal} for canal in df['Canal_name (EN)'].unique() if canal != '#VALUE!']
-year_options = [{'label': str(year), 'value': year} for year in sorted(df['year'].unique())]
-
-feature_info = {
-    "ph": ("  pH", "pH"),
-    "do": ("DO (mg/l)", "Dissolved Oxygen (mg/l)"),
-    "tds": ("SS (mg/l)", "Suspended Solids (mg/l)"),
-    "nh3n": ("NH3N (mg/l)", "Ammonia (mg/l)"),
-    "temp": ("TEMP. (oC)", "Temperature (oC)"),
-    "h2s": ("H2S (mg/l)", "Hydrogen Sulfide (mg/l)"),
-    "bod": ("BOD (mg/l)", "Biochemical Oxygen Demand (mg/l)"),
-    "cod": ("COD (mg/l)", "Chemical Oxygen Demand (mg/l)"),
-    "tkn": ("TKN (mg/l)", "Total Kjeldahl Nitrogen (mg/l)"),
-    "no2": ("NO2 (mg/l)", "Nitrite (mg/l)"),
-    "no3": ("NO3 (mg/l)", "Nitrate (mg/l)"),
-    "tp": ("T-P (mg/l)", "Total Phosphorus"),
-    "coliform": ("T.Coliform (col/100ml)", "Coliform")
-}
-selected_feature_keys = ["ph", "do", "bod", "no3", "tds", "cod", "coliform"]
+from cube import AggregateCube
+from datastore import WATER_CSV, water_table, metric_columns, dataset_version
+from figcache import figure_cache
+from scoring import WQI, scored_table
+from sensitivity import GRID_POINTS, ranked_gains, sensitivity
+from timeseries import TimeSeriesStore
+import httpcache
+import ingest
+import outofcore
+from metrics import metrics_api, instrument, record_rows
+from inference import feature_info, model_version, served_version, selected_feature_keys, wqi_label
+from predict_service import prediction_service
+from predcache import prediction_cache
+from api import api
+
+log = logging.getLogger(__name__)
+
+# Filled in by load_data() on first use so importing the app stays cheap
+df = None
+cube = None
+series_store = None
+canal_options = []
+year_options = []
+_data_lock = threading.Lock()
+
+
+def load_data():
+    """Read the scored water table and build the aggregate cube, trend rollups and dropdown options, once.
+
+    With WPP_DATA_MODE=chunked the cube is reduced from the CSV in chunks instead (see outofcore.py).
+    """
+    global df, cube, series_store
+    if cube is not None:
+        return
+    with _data_lock:
+        if cube is not None:
+            return
+        if outofcore.chunked():
+            # Only the aggregates are kept; there is no raw table in this mode
+            series_store, cube = outofcore.water_reductions()
+            canals = cube.table(['Canal_name (EN)']).index
+            years = cube.table(['year']).index
+        else:
+            df = scored_table(water_table(), WATER_CSV)
+            series_store = TimeSeriesStore(metric_columns)
+            series_store.update(df)
+            cube = AggregateCube(df, metric_columns + [WQI])
+            canals, years = df['Canal_name (EN)'].unique(), df['year'].unique()
+        canal_options[:] = [{'label': canal, 'value': canal} for canal in canals if canal != '#VALUE!']
+        year_options[:] = [{'label': str(year), 'value': year} for year in sorted(years)]
+
+
+# New readings (POST /api/v1/readings or WPP_INGEST_DIR) update the aggregates and dropdowns in place
+@ingest.subscribe
+def apply_readings(readings):
+    load_data()
+    cube.update(readings)
+    series_store.update(readings)
+
+    known_canals = {option['value'] for option in canal_options}
+    canal_options.extend({'label': canal, 'value': canal} for canal in readings['Canal_name (EN)'].unique() if canal not in known_canals)
+    years = {option['value'] for option in year_options} | set(readings['year'].tolist())
+    year_options[:] = [{'label': str(year), 'value': year} for year in sorted(years)]
+
+    # Figures cached before this batch are stale
+    figure_cache.version = data_version()
+
+
+# A replaced model rescores the source table and every ingested row, and the cube is swapped whole
+@ingest.on_rescore
+def rescore_readings(chunks):
+    global df, cube
+    with _data_lock:
+        if cube is None:
+            return
+        if outofcore.chunked():
+            table, rescored = None, outofcore.water_reductions()[1]
+        else:
+            table = scored_table(water_table(), WATER_CSV)
+            rescored = AggregateCube(table, metric_columns + [WQI])
+        for readings in chunks:
+            rescored.update(readings)
+        df, cube = table, rescored
+        figure_cache.version = data_version()
+        log.info("rescored dashboard model=%s", model_version())
+
+
+def data_version():
+    """What cached figures depend on: the source CSVs, the rows ingested since and the WQI model."""
+    return f"{dataset_version()}+{ingest.ingested_rows}+{model_version()}"
+
 
 parameter_options = [
     {'label': 'pH', 'value': '  pH'},
@@ -73,9 +122,6 @@ parameter_options = [
     {'label': 'Total Coliform (col/100ml)', 'value': 'T.Coliform (col/100ml)'}
 ]
 
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP], suppress_callback_exceptions=True)
-app.title = "Bangkok Canal Water Quality"
-
 navbar = html.Div([
     dcc.Location(id='nav-url', refresh=False),
     dbc.Navbar(
@@ -83,7 +129,10 @@ navbar = html.Div([
             dbc.NavbarBrand("Bangkok Canal Water Quality", href="/", className="fw-semibold fs-4 text-white"),
             dbc.NavbarToggler(id="navbar-toggler"),
             dbc.Collapse(
-                html.Div(id="nav-links", className="ms-auto d-flex gap-3"),
+                html.Div([
+                    dbc.NavLink("Dashboard", id="nav-dashboard", href="/", className="text-white"),
+                    dbc.NavLink("Prediction", id="nav-prediction", href="/prediction", className="text-white")
+                ], id="nav-links", className="ms-auto d-flex gap-3"),
                 id="navbar-collapse",
                 navbar=True,
                 is_open=True
@@ -111,6 +160,8 @@ def dashboard_layout():
         html.Div(id='tabs-content', className='mt-4')
     ], fluid=False)
 
+sensitivity_options = [{'label': feature_info[key][1], 'value': key} for key in selected_feature_keys]
+
 def prediction_layout():
     # feature_defaults = {
     #     "ph": 7.0,
@@ -161,10 +212,54 @@ def prediction_layout():
                 ]
                 )
             ], md=6),
+        ]),
+
+        # What-if sweeps around the entered values, filled in on Predict
+        html.H4("What If?", className="text-center mt-5 mb-3"),
+        dbc.Row([
+            dbc.Col([
+                dbc.Label("Heatmap X"),
+                dcc.Dropdown(id='sensitivity-x', options=sensitivity_options, value='bod', clearable=False)
+            ], md=6),
+            dbc.Col([
+                dbc.Label("Heatmap Y"),
+                dcc.Dropdown(id='sensitivity-y', options=sensitivity_options, value='do', clearable=False)
+            ], md=6)
+        ], className="mb-3"),
+        html.Div(id='sensitivity-summary', className="text-center fw-semibold mb-2"),
+        dbc.Row([
+            dbc.Col([dcc.Graph(id='sensitivity-curves')], md=6),
+            dbc.Col([dcc.Graph(id='sensitivity-heatmap')], md=6)
         ])
     ], fluid=False)
 
-@app.callback(
+# Repeated and near-identical inputs reuse the WQI, label and gauge (see predcache.py)
+@prediction_cache.memoize
+def prediction_result(values):
+    wqi = prediction_service.predict(values)[0]
+    label = wqi_label(wqi)
+    color = "#2c3e50"
+
+    fig = go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=wqi,
+        domain={'x': [0, 1], 'y': [0, 1]},
+        title={'text': "Predicted Water Quality Index"},
+        gauge={
+            'axis': {'range': [0, 100]},
+            'bar': {'color': color},
+            'steps': [
+                {'range': [0, 50], 'color': "#FF6B6B"},
+                {'range': [50, 75], 'color': "#FFD700"},
+                {'range': [75, 100], 'color': "#00C49F"}
+            ]
+        }
+    ))
+
+    return fig, label
+
+
+@callback(
     Output('gauge-graph', 'figure'),
     Output('gauge-label', 'children'),  
     #Output('prediction-output', 'children'),
@@ -174,6 +269,7 @@ def prediction_layout():
 )
 
 
+@instrument
 def predict_quality(n_clicks, *inputs):
     if not n_clicks:
         return no_update, no_update
@@ -183,76 +279,91 @@ def predict_quality(n_clicks, *inputs):
 
     try:
         values = [float(x) for x in inputs]
-        values = np.array(values).reshape(1, -1)
-        scaled_data = scaler.transform(values)
-        wqi = np.exp(model.predict(scaled_data)[0])
-
-        if wqi >= 75:
-            label = "✅ Safe"
-            color = "#2c3e50"
-        elif wqi >= 50:
-            label = "⚠️ Potentially Unsafe"
-            color = "#2c3e50"
-        else:
-            label = "❌ Unsafe"
-            color = "#2c3e50"
-
-        fig = go.Figure(go.Indicator(
-            mode="gauge+number",
-            value=wqi,
-            domain={'x': [0, 1], 'y': [0, 1]},
-            title={'text': "Predicted Water Quality Index"},
-            gauge={
-                'axis': {'range': [0, 100]},
-                'bar': {'color': color},
-                'steps': [
-                    {'range': [0, 50], 'color': "#FF6B6B"},
-                    {'range': [50, 75], 'color': "#FFD700"},
-                    {'range': [75, 100], 'color': "#00C49F"}
-                ]
-            }
-        ))
-
-        return fig, label
+        record_rows(1)
+        return prediction_result(values)
 
     except Exception as e:
         return f"Error in prediction: {e}"
 
 
-app.layout = html.Div([
-    dcc.Location(id='url', refresh=False),
-    navbar,
-    html.Div(id='page-content')
-])
+@callback(
+    Output('sensitivity-curves', 'figure'),
+    Output('sensitivity-heatmap', 'figure'),
+    Output('sensitivity-summary', 'children'),
+    Input('predict-button', 'n_clicks'),
+    Input('sensitivity-x', 'value'),
+    Input('sensitivity-y', 'value'),
+    [State(key, 'value') for key in selected_feature_keys],
+    prevent_initial_call=True
+)
+@instrument
+def update_sensitivity(n_clicks, x_key, y_key, *inputs):
+    if not n_clicks or any(val is None for val in inputs):
+        return no_update, no_update, no_update
+
+    values = [float(x) for x in inputs]
+    pairs = [(x_key, y_key)] if x_key != y_key else []
+    # Every curve and the heatmap are scored together as one batch
+    base, grids, curves, heatmaps = sensitivity(values, prediction_service.predict, pairs)
+    record_rows(1 + len(curves) * GRID_POINTS + sum(heat.size for heat in heatmaps.values()))
+
+    percent = np.linspace(0, 200, GRID_POINTS)
+    curve_fig = go.Figure([
+        go.Scatter(x=percent, y=curves[key], name=feature_info[key][1], customdata=grids[key],
+                   hovertemplate="%{customdata:.3g} → WQI %{y:.1f}")
+        for key in selected_feature_keys
+    ])
+    curve_fig.add_hline(y=base, line_dash='dot', line_color='#7f8c8d')
+    curve_fig.update_layout(
+        title_text="Changing One Input at a Time",
+        xaxis_title="% of entered value",
+        yaxis_title="Predicted WQI",
+        height=450,
+        margin=dict(t=60, b=40, l=40, r=40),
+        legend=dict(orientation='h', y=-0.2)
+    )
+
+    if pairs:
+        heat_fig = go.Figure(go.Heatmap(x=grids[x_key], y=grids[y_key], z=heatmaps[(x_key, y_key)],
+                                        colorscale='RdYlGn', zmin=0, zmax=100, colorbar=dict(title='WQI')))
+        heat_fig.add_trace(go.Scatter(x=[values[selected_feature_keys.index(x_key)]], y=[values[selected_feature_keys.index(y_key)]],
+                                      mode='markers', marker=dict(color='black', size=10, symbol='x'), name='Entered', showlegend=False))
+        heat_fig.update_layout(title_text=f"{feature_info[x_key][1]} × {feature_info[y_key][1]}",
+                               xaxis_title=feature_info[x_key][1], yaxis_title=feature_info[y_key][1],
+                               height=450, margin=dict(t=60, b=40, l=40, r=40))
+    else:
+        heat_fig = go.Figure().update_layout(title_text="Pick two different inputs for the heatmap", height=450)
+
+    key, gain, best = ranked_gains(base, curves)[0]
+    if gain <= 0:
+        summary = "No single change raises the predicted WQI."
+    else:
+        summary = (f"Fix {feature_info[key][1]} first: at {grids[key][best]:.3g} the predicted WQI "
+                   f"rises from {base:.1f} to {base + gain:.1f}.")
+    return curve_fig, heat_fig, summary
+
 
 # Routing callback
-@app.callback(Output('page-content', 'children'), Input('url', 'pathname'))
+@callback(Output('page-content', 'children'), Input('url', 'pathname'))
+@instrument
 def display_page(pathname):
     if pathname == '/prediction':
         return prediction_layout()
     return dashboard_layout()
 
 
-# Reset button logic
-@app.callback(
+# Reset button logic, in the browser (assets/clientside.js)
+clientside_callback(
+    ClientsideFunction("wpp", "resetFields"),
     [Output(key, 'value') for key in selected_feature_keys],
     Input('reset-button', 'n_clicks')
 )
-def reset_fields(n):
-    if not n:
-        return dash.no_update
-    return [None] * len(selected_feature_keys)
-
-# App layout with routing
-app.layout = html.Div([
-    dcc.Location(id='url', refresh=False),
-    navbar,
-    html.Div(id='page-content')
-])
 
 # Dashboard tab content callback
-@app.callback(Output('tabs-content', 'children'), Input('tabs', 'value'))
+@callback(Output('tabs-content', 'children'), Input('tabs', 'value'))
+@instrument
 def render_tab_content(tab):
+    load_data()
     if tab == 'tab-canal':
         return dbc.Container([
             html.H4("Canal-wise Water Quality Overview", className="text-center mb-4 "),
@@ -314,7 +425,7 @@ def render_tab_content(tab):
 
             dbc.Row([
                 dbc.Col([
-                    dcc.Graph(id='gauge-graph')
+                    dcc.Graph(id='gauge-graph', figure=gauge_skeleton())
                 ])
             ])
         ])
@@ -331,125 +442,130 @@ def render_tab_content(tab):
             dcc.Graph(id='trend-line-chart')
         ])
     elif tab == 'tab-map':
-        return map_layout
+        return map_page.map_layout()
 
 
-@app.callback(
+@callback(
     Output('canal-bar-graph', 'figure'),
     Input('bar-canal-dropdown', 'value'),
     Input('bar-metric-dropdown', 'value')
 )
+@instrument
 def update_bar_chart(selected_canal, selected_metric):
+    # The error figure is built out here, so the cache only ever stores real charts
     try:
-        print("Selected Canal:", selected_canal)
-        print("Selected Metric:", selected_metric)
-        print("Available columns:", df.columns.tolist())
-
-        df_canal = df[df['Canal_name (EN)'] == selected_canal]
-
-        if selected_metric not in df_canal.columns:
-            raise ValueError(f" Column '{selected_metric}' not found in DataFrame!")
-
-        df_grouped = df_canal.groupby('Sample_water_point (EN)')[selected_metric].mean().reset_index()
-
-        fig = px.bar(
-                df_grouped,
-                x='Sample_water_point (EN)',
-                y=selected_metric,
-                title=f"{selected_metric} at Each Sample Point in {selected_canal}",
-                labels={
-                    'Sample_water_point (EN)': 'Sampling Point',
-                    selected_metric: selected_metric
-                },
-                color=selected_metric,
-                color_continuous_scale=px.colors.sequential.Aggrnyl,  # Chic pastel green-blue
-                height=660
-            )
+        return bar_figure(selected_canal, selected_metric)
+    except Exception as e:
+        log.exception("update_bar_chart failed canal=%s metric=%s", selected_canal, selected_metric)
+        return go.Figure().update_layout(title=f"Error: {e}")
 
-        fig.update_layout(
-                template="plotly_white",
-                font=dict(family="Inter, sans-serif", size=13),
-                title_x=0.5,
-                title_font=dict(size=18, color="#2c3e50"),
-                plot_bgcolor="#fdfdfd",
-                paper_bgcolor="#ffffff",
-                margin=dict(t=60, l=40, r=40, b=80),
-                xaxis=dict(
-                    title='',
-                    tickangle=-45,
-                    showgrid=False,
-                    zeroline=False,
-                ),
-                yaxis=dict(
-                    title=selected_metric,
-                    showgrid=True,
-                    gridcolor='rgba(200,200,200,0.2)',
-                    zeroline=False,
-                ),
-                coloraxis_colorbar=dict(
-                    title=selected_metric,
-                    tickfont=dict(size=12),
-                    lenmode='pixels', len=150
-                )
+@figure_cache.memoize
+def bar_figure(selected_canal, selected_metric):
+    import plotly.express as px
+
+    load_data()
+    log.debug("bar chart canal=%s metric=%s", selected_canal, selected_metric)
+
+    if selected_metric not in cube.metrics:
+        raise ValueError(f" Column '{selected_metric}' not found in DataFrame!")
+
+    df_grouped = cube.by_sample_point(selected_canal)[[selected_metric]].reset_index()
+    record_rows(len(df_grouped))
+
+    fig = px.bar(
+            df_grouped,
+            x='Sample_water_point (EN)',
+            y=selected_metric,
+            title=f"{selected_metric} at Each Sample Point in {selected_canal}",
+            labels={
+                'Sample_water_point (EN)': 'Sampling Point',
+                selected_metric: selected_metric
+            },
+            color=selected_metric,
+            color_continuous_scale=px.colors.sequential.Aggrnyl,  # Chic pastel green-blue
+            height=660
+        )
+
+    fig.update_layout(
+            template="plotly_white",
+            font=dict(family="Inter, sans-serif", size=13),
+            title_x=0.5,
+            title_font=dict(size=18, color="#2c3e50"),
+            plot_bgcolor="#fdfdfd",
+            paper_bgcolor="#ffffff",
+            margin=dict(t=60, l=40, r=40, b=80),
+            xaxis=dict(
+                title='',
+                tickangle=-45,
+                showgrid=False,
+                zeroline=False,
+            ),
+            yaxis=dict(
+                title=selected_metric,
+                showgrid=True,
+                gridcolor='rgba(200,200,200,0.2)',
+                zeroline=False,
+            ),
+            coloraxis_colorbar=dict(
+                title=selected_metric,
+                tickfont=dict(size=12),
+                lenmode='pixels', len=150
             )
+        )
 
-        return fig
+    return fig
 
-    except Exception as e:
-        print(" Error in update_bar_chart:", e)
-        return go.Figure().update_layout(title=f"Error: {e}")
 
 
+# Gauge name -> metric column; the order is the order of the gauges (and traces) in the grid
+gauge_metrics = {
+    'pH': '  pH', 'DO': 'DO (mg/l)', 'TDS': 'SS (mg/l)', 'NH3N': 'NH3N (mg/l)', 'TEMP': 'TEMP. (oC)',
+    'H2S': 'H2S (mg/l)', 'BOD': 'BOD (mg/l)', 'COD': 'COD (mg/l)', 'TKN': 'TKN (mg/l)', 'NO2': 'NO2 (mg/l)',
+    'NO3': 'NO3 (mg/l)', 'TP': 'T-P (mg/l)', 'TC': 'T.Coliform (col/100ml)', 'WQI': WQI
+}
 
-@app.callback(
-    Output('gauge-graph', 'figure', allow_duplicate=True),
-    Input('year-dropdown', 'value'),
-    Input('canal-dropdown', 'value'),
-    prevent_initial_call="initial_duplicate"
-)
-def update_gauge_graph(selected_year, selected_canal):
-    filtered_df = aggregated_df[(aggregated_df['year'] == selected_year) & 
-                                (aggregated_df['Canal_name (EN)'] == selected_canal)]
-    if filtered_df.empty:
-        return go.Figure()
-
-    metrics = filtered_df.iloc[0]
-    values = {
-        'pH': metrics['  pH'], 'DO': metrics['DO (mg/l)'], 'TDS': metrics['SS (mg/l)'],
-        'NH3N': metrics['NH3N (mg/l)'], 'TEMP': metrics['TEMP. (oC)'], 'H2S': metrics['H2S (mg/l)'],
-        'BOD': metrics['BOD (mg/l)'], 'COD': metrics['COD (mg/l)'], 'TKN': metrics['TKN (mg/l)'],
-        'NO2': metrics['NO2 (mg/l)'], 'NO3': metrics['NO3 (mg/l)'], 'TP': metrics['T-P (mg/l)'],
-        'TC': metrics['T.Coliform (col/100ml)']
-    }
-
-    thresholds = {
-        'pH': [6.5, 8.5], 'DO': [2, 6], 'TDS': [50, 100], 'NH3N': [1.5, 5], 'TEMP': [30, 40],
-        'H2S': [0.05, 0.1], 'BOD': [2, 5], 'COD': [20, 50], 'TKN': [1, 5], 'NO2': [0.05, 0.1],
-        'NO3': [5, 10], 'TP': [0.2, 0.5], 'TC': [1000, 3000]
-    }
-
-    max_ranges = {
-        'pH': 14, 'DO': 10, 'TDS': 200, 'NH3N': 15, 'TEMP': 50,
-        'H2S': 1, 'BOD': 50, 'COD': 100, 'TKN': 20, 'NO2': 1,
-        'NO3': 20, 'TP': 2, 'TC': 5000
-    }
+gauge_thresholds = {
+    'pH': [6.5, 8.5], 'DO': [2, 6], 'TDS': [50, 100], 'NH3N': [1.5, 5], 'TEMP': [30, 40],
+    'H2S': [0.05, 0.1], 'BOD': [2, 5], 'COD': [20, 50], 'TKN': [1, 5], 'NO2': [0.05, 0.1],
+    'NO3': [5, 10], 'TP': [0.2, 0.5], 'TC': [1000, 3000], 'WQI': [50, 75]
+}
+
+gauge_max_ranges = {
+    'pH': 14, 'DO': 10, 'TDS': 200, 'NH3N': 15, 'TEMP': 50,
+    'H2S': 1, 'BOD': 50, 'COD': 100, 'TKN': 20, 'NO2': 1,
+    'NO3': 20, 'TP': 2, 'TC': 5000, 'WQI': 100
+}
+
+# Low is good for the measurements; the predicted WQI is the other way round
+gauge_step_colors = {'WQI': ["#FF6B6B", "#FFD700", "#00C49F"]}
+
+_gauge_skeleton = None
+
+
+def gauge_skeleton():
+    """The gauge grid with no values, built once and sent with the tab; callbacks only patch it."""
+    global _gauge_skeleton
+    if _gauge_skeleton is not None:
+        return _gauge_skeleton
+    from plotly.subplots import make_subplots
 
     fig = make_subplots(rows=3, cols=5, specs=[[{'type': 'indicator'}]*5]*3)
     row, col = 1, 1
 
-    for i, (name, val) in enumerate(values.items()):
-        limit1, limit2 = thresholds[name]
+    for name in gauge_metrics:
+        limit1, limit2 = gauge_thresholds[name]
+        low, mid, high = gauge_step_colors.get(name, ["#00C49F", "#FFD700", "#FF6B6B"])
         fig.add_trace(go.Indicator(
             mode="gauge+number",
-            value=val,
+            value=None,
             title={'text': name},
             gauge={
-                'axis': {'range': [0, max_ranges[name]], 'tickwidth': 1, 'tickcolor': "#7f8c8d"},
+                'axis': {'range': [0, gauge_max_ranges[name]], 'tickwidth': 1, 'tickcolor': "#7f8c8d"},
                 'bar': {'color': "#2c3e50"},
                 'steps': [
-                    {'range': [0, limit1], 'color': "#00C49F"},
-                    {'range': [limit1, limit2], 'color': "#FFD700"},
-                    {'range': [limit2, max_ranges[name]], 'color': "#FF6B6B"}
+                    {'range': [0, limit1], 'color': low},
+                    {'range': [limit1, limit2], 'color': mid},
+                    {'range': [limit2, gauge_max_ranges[name]], 'color': high}
                 ],
                 'threshold': {
                     'line': {'color': "blue", 'width': 4},
@@ -466,80 +582,156 @@ def update_gauge_graph(selected_year, selected_canal):
     fig.update_layout(
         template='plotly_white',
         font=dict(family="Inter, sans-serif", size=14, color="#333"),
-        title_text=f"Water Quality Metrics – {selected_canal} ({selected_year})",
+        title_text="Water Quality Metrics",
         title_x=0.5,
         height=900,
         margin=dict(t=60, b=40, l=40, r=40)
     )
+    _gauge_skeleton = fig
     return fig
 
-@app.callback(
+@callback(
+    Output('gauge-graph', 'figure', allow_duplicate=True),
+    Input('year-dropdown', 'value'),
+    Input('canal-dropdown', 'value'),
+    prevent_initial_call="initial_duplicate"
+)
+@instrument
+def update_gauge_graph(selected_year, selected_canal):
+    # Only the values and the title change, so send those instead of the whole grid
+    load_data()
+    metrics = cube.get(selected_canal, selected_year)
+    patch = Patch()
+    for i, column in enumerate(gauge_metrics.values()):
+        value = None if metrics is None else metrics[column]
+        patch['data'][i]['value'] = None if pd.isna(value) else float(value)
+    title = f"Water Quality Metrics – {selected_canal} ({selected_year})"
+    patch['layout']['title']['text'] = title if metrics is not None else f"{title}: no data"
+    return patch
+
+@callback(
     Output('card-ph', 'children'),
     Output('card-do', 'children'),
     Output('card-tds', 'children'),
     Input('year-dropdown', 'value'),
     Input('canal-dropdown', 'value')
 )
+@instrument
 def update_cards(year, canal):
-    filtered = aggregated_df[(aggregated_df['year'] == year) & (aggregated_df['Canal_name (EN)'] == canal)]
-    if filtered.empty:
+    load_data()
+    row = cube.get(canal, year)
+    if row is None:
         return "N/A", "N/A", "N/A"
 
-    row = filtered.iloc[0]
     return (
         f"{row['  pH']:.2f}",
         f"{row['DO (mg/l)']:.2f}",
         f"{row['SS (mg/l)']:.2f}"
     )
 
-@app.callback(
+def zoom_range(relayout):
+    """(start, end) of the x-axis range in a relayoutData event, (None, None) for a reset, or None otherwise."""
+    relayout = relayout or {}
+    if relayout.get('xaxis.autorange'):
+        return None, None
+    if 'xaxis.range[0]' in relayout and 'xaxis.range[1]' in relayout:
+        return relayout['xaxis.range[0]'], relayout['xaxis.range[1]']
+    if 'xaxis.range' in relayout:
+        return tuple(relayout['xaxis.range'])
+    return None
+
+@callback(
     Output('trend-line-chart', 'figure'),
-    Input('trend-canal-dropdown', 'value')
+    Input('trend-canal-dropdown', 'value'),
+    Input('trend-line-chart', 'relayoutData')
 )
-def update_trend_chart(selected_canal):
+@instrument
+def update_trend_chart(selected_canal, relayout=None):
+    # Zooming in re-queries that range at a finer rollup; a new canal or a reset shows everything
+    start = end = None
+    if ctx.triggered_id == 'trend-line-chart':
+        zoom = zoom_range(relayout)
+        if zoom is None:
+            return no_update
+        start, end = zoom
+    return trend_figure(selected_canal, start, end)
+
+@figure_cache.memoize
+def trend_figure(selected_canal, start=None, end=None):
+    import plotly.express as px
+
+    load_data()
     value_vars = [param["value"] for param in parameter_options if param['value'] != 'T.Coliform (col/100ml)']
-    df_trend = aggregated_df[aggregated_df['Canal_name (EN)'] == selected_canal].copy()
-    df_trend['year'] = df_trend['year'].astype(int)
-
-    # Melt the dataframe to long format
-    df_long = df_trend.melt(
-        id_vars='year',
-        value_vars=value_vars,
-        var_name='Metric',
-        value_name='Measurement'
-    )
+    level, series = series_store.series(selected_canal, start, end)
+
+    # Long format, one row per (metric, bucket); LTTB keeps different buckets for each metric
+    df_long = pd.concat([pd.DataFrame({'time': series[metric].index, 'Metric': metric, 'Measurement': series[metric].to_numpy()})
+                         for metric in value_vars], ignore_index=True)
+    record_rows(len(df_long))
+    times = pd.DatetimeIndex(df_long['time'])
+    years = f"{times.min().year}–{times.max().year}" if len(times) else "no data"
 
     fig = px.line(
         df_long,
-        x='year',
+        x='time',
         y='Measurement',
         color='Metric',
-        markers=True,
-        title=f"Water Quality Trends in {selected_canal} (2018–2020)",
+        markers=len(df_long) <= 50 * len(value_vars),
+        title=f"Water Quality Trends in {selected_canal} ({years})",
     )
 
+    # Annual samples read as years on the axis, as they always have
+    annual = bool(len(times)) and bool(((times.month == 1) & (times.day == 1) & (times.hour == 0)).all())
+    xaxis = dict(title='year', dtick='M12', tickformat='%Y') if annual else dict(title='time')
+    if start is not None:
+        xaxis['range'] = [start, end]
     fig.update_layout(
         legend_title_text='Metric',
         height=500,
-        xaxis=dict(tickmode='linear', dtick=1),
+        xaxis=xaxis,
         title_x=0.5,
-        margin=dict(t=60, b=40, l=40, r=40)
+        margin=dict(t=60, b=40, l=40, r=40),
+        # Keeps legend selections across zoom re-queries of the same canal
+        uirevision=selected_canal,
     )
 
     return fig
 
-@app.callback(
-    Output("nav-links", "children"),
+# Highlights the current page's link, in the browser (assets/clientside.js)
+clientside_callback(
+    ClientsideFunction("wpp", "activeLinks"),
+    Output("nav-dashboard", "className"),
+    Output("nav-prediction", "className"),
     Input("nav-url", "pathname")
 )
-def update_active_link(pathname):
-    return [
-        dbc.NavLink("Dashboard", href="/", className=f"text-white {'fw-bold border-bottom border-2 border-white' if pathname == '/' else ''}"),
-        dbc.NavLink("Prediction", href="/prediction", className=f"text-white {'fw-bold border-bottom border-2 border-white' if pathname == '/prediction' else ''}")
-    ]
 
-import os
-import logging
+def create_app():
+    """Build the Dash app. Data, the model and plotly.express load on first use."""
+    logging.basicConfig(level=os.environ.get("WPP_LOG_LEVEL", "INFO").upper(),
+                        format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP], suppress_callback_exceptions=True)
+    app.title = "Bangkok Canal Water Quality"
+    app.layout = html.Div([
+        dcc.Location(id='url', refresh=False),
+        navbar,
+        html.Div(id='page-content')
+    ])
+    app.server.register_blueprint(api)
+    app.server.register_blueprint(metrics_api)
+    # Callback ETags change with the data (including ingested rows) and the default model.
+    # served_version() only stats the model files until a callback loads the model.
+    httpcache.init_app(app.server, lambda: f"{figure_cache.version}+{served_version()}")
+
+    # dataset_version() only stats the source CSVs, so figures are keyed correctly before any load
+    figure_cache.version = dataset_version()
+
+    if os.environ.get("WPP_INGEST_DIR"):
+        ingest.watch_directory(os.environ["WPP_INGEST_DIR"])
+    return app
+
+
+app = create_app()
+server = app.server
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8050)) ## default to 8050 if not set
@@ -0,0 +1,27 @@
+// Clientside callbacks, referenced from Python as ClientsideFunction("wpp", "<name>").
+// They need no server state, so they run in the browser instead of costing a request.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    wpp: {
+        resetFields: function (n) {
+            if (!n) {
+                return window.dash_clientside.no_update;
+            }
+            return window.dash_clientside.callback_context.outputs_list.map(function () { return null; });
+        },
+
+        activeLinks: function (pathname) {
+            const link = "text-white";
+            const active = link + " fw-bold border-bottom border-2 border-white";
+            return [pathname === "/" ? active : link, pathname === "/prediction" ? active : link];
+        },
+
+        // Point colours are recomputed from the thresholds in the hideout (assets/map_layer.js) and
+        // cells carry a status for every parameter, so a new parameter only changes the hideouts.
+        mapParameter: function (parameter, markerHideout, aggregateHideout) {
+            return [
+                Object.assign({}, markerHideout, {parameter: parameter}),
+                Object.assign({}, aggregateHideout, {parameter: parameter})
+            ];
+        }
+    }
+});
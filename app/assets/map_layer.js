@@ -0,0 +1,67 @@
+// Functions referenced from the map's dl.GeoJSON layer as {"variable": "wppMap.<name>"}.
+// dash-leaflet passes the component props (including `hideout`) as the last argument.
+window.wppMap = Object.assign({}, window.wppMap, {
+    _icons: {},
+
+    pinIcon: function (url) {
+        if (!this._icons[url]) {
+            this._icons[url] = L.icon({
+                iconUrl: url,
+                iconSize: [32, 32],  // Match Google Maps pin
+                iconAnchor: [16, 32],  // Anchor at pin's point
+                popupAnchor: [0, -32]
+            });
+        }
+        return this._icons[url];
+    },
+
+    // Same rules as map.classify_safety: ranges are [safe, moderate] as [min, max], null is unbounded.
+    status: function (value, ranges) {
+        const within = function (range) {
+            return (range[0] === null || value >= range[0]) && (range[1] === null || value <= range[1]);
+        };
+        if (value === null || value === undefined || !ranges) {
+            return 3;
+        }
+        return within(ranges[0]) ? 0 : within(ranges[1]) ? 1 : 2;
+    },
+
+    pointToLayer: function (feature, latlng, context) {
+        const hideout = context.hideout;
+        const props = feature.properties;
+        const index = hideout.parameters.indexOf(hideout.parameter);
+        const raw = props.v[index];
+        const status = window.wppMap.status(raw, hideout.thresholds[index]);
+        const value = raw === null || raw === undefined ? "nan" : raw;
+        const tooltip = document.createElement("div");
+        [
+            "Canal: " + props.c,
+            "Sampling Point: " + props.p,
+            hideout.parameter + ": " + value + " (" + hideout.statuses[status] + ")"
+        ].forEach(function (text) {
+            const line = document.createElement("div");
+            line.textContent = text;
+            tooltip.appendChild(line);
+        });
+        return L.marker(latlng, {icon: window.wppMap.pinIcon(hideout.pins[status])}).bindTooltip(tooltip);
+    }
+});
+
+window.wppMap = Object.assign({}, window.wppMap, {
+    // Server-side cell summaries for zoomed-out views: a count badge in the cell's status colour.
+    // props.s holds the cell's status for every parameter, in hideout.parameters order.
+    aggregateToLayer: function (feature, latlng, context) {
+        const hideout = context.hideout;
+        const props = feature.properties;
+        const index = hideout.parameters.indexOf(hideout.parameter);
+        const status = index < 0 ? 3 : props.s[index];
+        const badge = document.createElement("div");
+        badge.textContent = props.n >= 1000 ? Math.round(props.n / 100) / 10 + "k" : String(props.n);
+        badge.style.cssText = "width:40px;height:40px;line-height:40px;border-radius:20px;text-align:center;" +
+            "font:bold 12px sans-serif;opacity:0.85;border:2px solid #333;background:" + hideout.colors[status];
+        const icon = L.divIcon({html: badge.outerHTML, className: "", iconSize: [40, 40]});
+        return L.marker(latlng, {icon: icon}).bindTooltip(
+            props.n + " samples, mostly " + hideout.statuses[status] + " for " + hideout.parameter
+        );
+    }
+});
@@ -0,0 +1,42 @@
+// Revalidates Dash callback requests (see app/httpcache.py). Browsers never revalidate POSTs, so the
+// last responses that carried an ETag are kept here by request body, and an identical request sends
+// that ETag. A 304 is answered from the kept copy, so an unchanged figure is not sent again.
+(function () {
+    const MAX_ENTRIES = 50;
+    const kept = new Map();  // request body -> {etag, body}, least recently used first
+    const fetch = window.fetch.bind(window);
+
+    function keep(key, entry) {
+        kept.delete(key);
+        kept.set(key, entry);
+        if (kept.size > MAX_ENTRIES) {
+            kept.delete(kept.keys().next().value);
+        }
+    }
+
+    window.fetch = function (resource, init) {
+        const url = typeof resource === "string" ? resource : resource.url;
+        if (!init || init.method !== "POST" || typeof init.body !== "string" || url.indexOf("_dash-update-component") < 0) {
+            return fetch(resource, init);
+        }
+        const key = init.body;
+        const entry = kept.get(key);
+        if (entry) {
+            init = Object.assign({}, init, {headers: Object.assign({}, init.headers, {"If-None-Match": entry.etag})});
+        }
+        return fetch(resource, init).then(function (response) {
+            if (response.status === 304 && entry) {
+                keep(key, entry);
+                return new Response(entry.body, {status: 200, headers: {"Content-Type": "application/json"}});
+            }
+            const etag = response.headers.get("ETag");
+            if (response.status !== 200 || !etag) {
+                return response;
+            }
+            return response.text().then(function (body) {
+                keep(key, {etag: etag, body: body});
+                return new Response(body, {status: 200, statusText: response.statusText, headers: response.headers});
+            });
+        });
+    };
+})();
@@ -0,0 +1,137 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from datastore import widen
+
+CANAL = 'Canal_name (EN)'
+YEAR = 'year'
+POINT = 'Sample_water_point (EN)'
+
+
+class AggregateCube:
+    """Mean/min/max/count of every metric for each canal x year x sample point, plus all roll-ups.
+
+    Rows are grouped once at the finest level; coarser cells are rolled up from those sums,
+    counts and extremes, so a canal-wide mean is still weighted by row rather than by point.
+    Cells are keyed by ``(canal, year, point)`` with ``None`` for "all", so callbacks read a
+    precomputed value with a dict lookup instead of masking and grouping the raw table.
+
+    ``update`` folds new rows into the finest-level sums, counts and extremes and re-derives the
+    roll-ups from those, so its cost depends on the number of cells, not on rows seen so far.
+    """
+
+    dims = (CANAL, YEAR, POINT)
+    stats = ('mean', 'min', 'max', 'count')
+
+    def __init__(self, df, metrics):
+        self.metrics = list(metrics)
+        self._parts = self._group(df)
+        self._rebuild()
+
+    def _group(self, df):
+        # Aggregate in float64 even where the table stores float32 metrics
+        df = pd.DataFrame({**{dim: df[dim] for dim in self.dims}, **{metric: widen(df[metric]) for metric in self.metrics}}, index=df.index)
+        base = df.groupby(list(self.dims), observed=True)[self.metrics].agg(['sum', 'min', 'max', 'count'])
+        return {stat: base.xs(stat, axis=1, level=1) for stat in ('sum', 'min', 'max', 'count')}
+
+    @classmethod
+    def from_chunks(cls, chunks, metrics):
+        """Build the cube from an iterable of tables, holding one chunk and the partial aggregates at a time."""
+        cube = cls.__new__(cls)
+        cube.metrics = list(metrics)
+        parts = None
+        for chunk in chunks:
+            new = cube._group(chunk)
+            parts = new if parts is None else cls._merge(parts, new)
+        if parts is None:
+            raise ValueError("no rows to aggregate")
+        cube._parts = parts
+        cube._rebuild()
+        return cube
+
+    @classmethod
+    def from_parts(cls, parts, metrics):
+        """Rebuild a cube from the table ``parts_table()`` returned."""
+        cube = cls.__new__(cls)
+        cube.metrics = list(metrics)
+        index = pd.MultiIndex.from_frame(parts[list(cls.dims)].astype(object))
+        cube._parts = {stat: pd.DataFrame({metric: np.asarray(parts[f"{stat}:{metric}"]) for metric in cube.metrics}, index=index)
+                       for stat in ('sum', 'min', 'max', 'count')}
+        cube._rebuild()
+        return cube
+
+    def parts_table(self):
+        """The finest-level sums, extremes and counts as one flat table, one row per canal x year x point."""
+        columns = {f"{stat}:{metric}": part[metric].to_numpy() for stat, part in self._parts.items() for metric in self.metrics}
+        return pd.concat([self._parts['sum'].index.to_frame(index=False), pd.DataFrame(columns)], axis=1)
+
+    @staticmethod
+    def _merge(parts, new):
+        merged = {}
+        for stat, reduce in (('sum', 'sum'), ('min', 'min'), ('max', 'max'), ('count', 'sum')):
+            both = pd.concat([parts[stat], new[stat]])
+            # New canals or points turn categorical levels into plain ones; both group the same.
+            both.index = pd.MultiIndex.from_arrays([both.index.get_level_values(i).astype(object) for i in range(both.index.nlevels)],
+                                                   names=both.index.names)
+            merged[stat] = getattr(both.groupby(level=list(range(both.index.nlevels))), reduce)()
+        return merged
+
+    def update(self, df):
+        """Add the rows of ``df`` (same columns as the table the cube was built from)."""
+        self._parts = self._merge(self._parts, self._group(df))
+        self._rebuild()
+
+    def _rebuild(self):
+        # Built aside and swapped in at the end so concurrent readers never see a partial cube.
+        parts = self._parts
+        cells, tables = {}, {}
+        for keep in itertools.product([True, False], repeat=len(self.dims)):
+            levels = [dim for dim, kept in zip(self.dims, keep) if kept]
+            if levels:
+                grouped = {stat: part.groupby(level=levels, observed=True) for stat, part in parts.items()}
+                sums, counts = grouped['sum'].sum(), grouped['count'].sum()
+                table = {'mean': sums / counts.where(counts > 0), 'min': grouped['min'].min(),
+                         'max': grouped['max'].max(), 'count': counts}
+            else:
+                counts = parts['count'].sum()
+                table = {'mean': parts['sum'].sum() / counts.where(counts > 0), 'min': parts['min'].min(),
+                         'max': parts['max'].max(), 'count': counts}
+                table = {stat: values.to_frame().T for stat, values in table.items()}
+            tables[tuple(levels)] = table
+
+            rows = {stat: table[stat].to_numpy().tolist() for stat in self.stats}
+            for i, index in enumerate(table['mean'].index):
+                named = dict(zip(levels, index if isinstance(index, tuple) else (index,)))
+                key = tuple(named.get(dim) for dim in self.dims)
+                cells[key] = {stat: dict(zip(self.metrics, rows[stat][i])) for stat in self.stats}
+
+        # Per-canal slices, cut on first use, for callbacks that chart every year or point of a canal.
+        self._cells, self._tables, self._slices = cells, tables, {}
+
+    def _canal_slice(self, levels, canal, stat):
+        key = (levels, canal, stat)
+        if key not in self._slices:
+            if (canal, None, None) in self._cells:
+                self._slices[key] = self._tables[levels][stat].xs(canal, level=0)
+            else:
+                self._slices[key] = pd.DataFrame(columns=self.metrics, index=pd.Index([], name=levels[1]))
+        return self._slices[key]
+
+    def get(self, canal=None, year=None, point=None, stat='mean'):
+        """Return ``{metric: value}`` for one cell, or ``None`` if it has no rows."""
+        cell = self._cells.get((canal, year, point))
+        return None if cell is None else cell[stat]
+
+    def table(self, levels, stat='mean'):
+        """All cells grouped by ``levels`` (a subset of ``dims``, in order) as a DataFrame."""
+        return self._tables[tuple(levels)][stat]
+
+    def by_year(self, canal, stat='mean'):
+        """Per-year values for one canal, indexed by year."""
+        return self._canal_slice((CANAL, YEAR), canal, stat)
+
+    def by_sample_point(self, canal, stat='mean'):
+        """Per-sample-point values for one canal over all years, indexed by sample point."""
+        return self._canal_slice((CANAL, POINT), canal, stat)
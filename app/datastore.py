@@ -0,0 +1,192 @@
+"""Typed columnar cache for the raw canal CSVs.
+
+Each CSV is parsed and cleaned once, then written as one ``.npy`` file per column under
+``data/cache/<name>-<key>/`` in compact types: float32 metrics, int16 years and text columns
+as categorical codes. Every page reads the same shared, read-only table. Later loads
+memory-map those files read-only, so gunicorn workers share the same pages instead of each
+parsing its own copy. The key covers the source file's size and mtime and ``CACHE_VERSION``,
+so an edited CSV (or a changed cleaning step) gets a fresh cache on the next load.
+
+Run ``python app/datastore.py`` to build the caches ahead of starting the server.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = "data/cache"
+# Bump when a cleaning function or the stored types change so existing caches are rebuilt.
+CACHE_VERSION = 2
+
+WATER_CSV = "data/water.csv"
+CANAL_MAP_CSV = "data/canalwater1.csv"
+
+metric_columns = ['  pH', 'TEMP. (oC)', 'DO (mg/l)', 'H2S (mg/l)', 'BOD (mg/l)', 'COD (mg/l)', 'SS (mg/l)', 'TKN (mg/l)', 'NH3N (mg/l)', 'NO2 (mg/l)', 'NO3 (mg/l)', 'T-P (mg/l)', 'T.Coliform (col/100ml)']
+
+
+def clean_water(df):
+    df = df.dropna(subset=['year', 'Canal_name (EN)', 'Sample_water_point (EN)'] + metric_columns)
+    df = df[df['Canal_name (EN)'] != '#VALUE!'].copy()
+    df['year'] = df['year'].astype(int) - 543
+    return df
+
+
+def clean_canal_map(df):
+    df["Latitude"] = pd.to_numeric(df["Latitude"], errors="coerce")
+    df["Longitude"] = pd.to_numeric(df["Longitude"], errors="coerce")
+    df = df.dropna(subset=["Latitude", "Longitude"]).copy()
+    df['year'] = df['year'].astype(int) - 543
+    for param in metric_columns:
+        if param in df.columns:
+            df[param] = pd.to_numeric(df[param], errors='coerce')
+    return df
+
+
+def compact(df):
+    """Narrow the numeric types: float32 metrics (where every value fits) and an int16 year."""
+    df = df.copy()
+    for name in df.columns:
+        values = df[name]
+        if name in metric_columns and values.dtype == np.float64:
+            # Coliform counts reach 1e121, far past float32; such columns stay float64.
+            if not (np.abs(values) > np.finfo(np.float32).max).any():
+                df[name] = values.astype(np.float32)
+        elif name == 'year':
+            df[name] = values.astype(np.int16)
+    return df
+
+
+def widen(values):
+    """float64 copy of a column, with float32 values rounded back to the 7 significant digits
+    they hold (7.3 rather than 7.300000190734863)."""
+    values = np.asarray(values)
+    wide = values.astype(float)
+    if values.dtype != np.float32:
+        return wide
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        scale = 10.0 ** (6 - np.floor(np.log10(np.abs(wide))))
+        rounded = np.round(wide * scale) / scale
+    return np.where(np.isfinite(rounded), rounded, wide)
+
+
+def _cache_path(csv_path, name=None, version=""):
+    stat = os.stat(csv_path)
+    raw = f"{os.path.abspath(csv_path)}:{stat.st_size}:{stat.st_mtime_ns}:{CACHE_VERSION}"
+    if version:
+        raw = f"{raw}:{version}"
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    if name:
+        stem = f"{stem}.{name}"
+    return os.path.join(CACHE_DIR, f"{stem}-{hashlib.sha1(raw.encode()).hexdigest()[:12]}")
+
+
+def _write_table(df, path):
+    columns = []
+    for i, name in enumerate(df.columns):
+        entry = {"name": name, "file": f"col{i}.npy"}
+        values = df[name]
+        if values.dtype == object or isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype("category")
+            entry["categories"] = values.cat.categories.tolist()
+            values = values.cat.codes
+        np.save(os.path.join(path, entry["file"]), values.to_numpy())
+        columns.append(entry)
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump({"columns": columns, "rows": len(df)}, f)
+
+
+def _read_table(path):
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    data = {}
+    for entry in meta["columns"]:
+        values = np.load(os.path.join(path, entry["file"]), mmap_mode="r")
+        if "categories" in entry:
+            values = pd.Categorical.from_codes(values, entry["categories"])
+        data[entry["name"]] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def _publish(path, write):
+    """Create cache directory ``path`` by calling ``write(tmp_dir)`` and renaming the result into place."""
+    if os.path.isdir(path):
+        return path
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    prefix = os.path.basename(path).rsplit("-", 1)[0]
+    tmp = tempfile.mkdtemp(dir=CACHE_DIR, prefix=f".{prefix}-")
+    try:
+        write(tmp)
+        os.rename(tmp, path)
+    except OSError:
+        # Another worker published the same cache first.
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.isdir(path):
+            raise
+
+    # Workers that still map an old cache keep their pages after it is unlinked.
+    for name in os.listdir(CACHE_DIR):
+        if name.startswith(f"{prefix}-") and os.path.join(CACHE_DIR, name) != path:
+            shutil.rmtree(os.path.join(CACHE_DIR, name), ignore_errors=True)
+    return path
+
+
+def build_cache(csv_path, clean):
+    """Parse and clean ``csv_path`` and publish its column cache. Returns the cache directory."""
+    return _publish(_cache_path(csv_path), lambda tmp: _write_table(compact(clean(pd.read_csv(csv_path))), tmp))
+
+
+def _write_tables(tables, path):
+    for name, df in tables.items():
+        os.mkdir(os.path.join(path, name))
+        _write_table(df, os.path.join(path, name))
+
+
+_tables = {}
+
+
+def load_table(csv_path, clean):
+    """Return the cleaned table for ``csv_path`` backed by read-only memory-mapped columns.
+
+    Every caller gets the same frame; copy it before changing anything.
+    """
+    path = build_cache(csv_path, clean)
+    if _tables.get(csv_path, (None,))[0] != path:
+        _tables[csv_path] = (path, _read_table(path))
+    return _tables[csv_path][1]
+
+
+def load_reduced(csv_path, name, build, version=""):
+    """Return the tables ``build()`` reduces ``csv_path`` to (a dict of name -> DataFrame).
+
+    They are cached next to the column cache under ``name`` and rebuilt when the CSV or
+    ``version`` (whatever else the tables depend on, such as a model) changes, so only the
+    first worker after a change pays for the pass over the data.
+    """
+    path = _publish(_cache_path(csv_path, name, version), lambda tmp: _write_tables(build(), tmp))
+    key = (csv_path, name)
+    if _tables.get(key, (None,))[0] != path:
+        _tables[key] = (path, {table: _read_table(os.path.join(path, table)) for table in sorted(os.listdir(path))})
+    return _tables[key][1]
+
+
+def dataset_version():
+    """Identifies the current contents of both source CSVs (and the cleaning code)."""
+    return "+".join(os.path.basename(_cache_path(csv_path)) for csv_path in (WATER_CSV, CANAL_MAP_CSV))
+
+
+def water_table():
+    return load_table(WATER_CSV, clean_water)
+
+
+def canal_map_table():
+    return load_table(CANAL_MAP_CSV, clean_canal_map)
+
+
+if __name__ == "__main__":
+    for csv_path, clean in [(WATER_CSV, clean_water), (CANAL_MAP_CSV, clean_canal_map)]:
+        print(csv_path, "->", build_cache(csv_path, clean))
@@ -0,0 +1,169 @@
+"""Memoization of dashboard figures keyed on callback inputs and the dataset version.
+
+Figures are stored as Plotly JSON in a bounded LRU store. By default the store lives in
+process memory; set ``WPP_FIGURE_CACHE_PATH`` to a SQLite file to share one cache (and its
+hit/miss counters) between all gunicorn workers on the host.
+"""
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import plotly.graph_objects as go
+
+DEFAULT_MAX_ENTRIES = 256
+# Lookups a SQLite-backed process counts in memory before writing them out.
+FLUSH_EVERY = 64
+
+
+class MemoryBackend:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {"backend": "memory", "hits": self.hits, "misses": self.misses,
+                "entries": len(self._entries), "max_entries": self.max_entries}
+
+
+class SQLiteBackend:
+    """LRU store in a SQLite file, safe to share between processes.
+
+    Lookups only read. Each process keeps its hit/miss counts and the recency of the entries it hit
+    in memory and writes them in one transaction every ``FLUSH_EVERY`` lookups (or with the next
+    put), so workers do not queue on the write lock for every hit.
+    """
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "misses": 0}
+        self._used = {}
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS figures (key TEXT PRIMARY KEY, value TEXT, last_used REAL)")
+            db.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)")
+            db.executemany("INSERT OR IGNORE INTO counters VALUES (?, 0)", [("hits",), ("misses",)])
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared between threads.
+        if getattr(self._local, "db", None) is None:
+            self._local.db = sqlite3.connect(self.path, timeout=5)
+            self._local.db.execute("PRAGMA journal_mode=WAL")
+        return self._local.db
+
+    def get(self, key):
+        row = self._connect().execute("SELECT value FROM figures WHERE key = ?", (key,)).fetchone()
+        with self._lock:
+            self._counts["hits" if row else "misses"] += 1
+            if row is not None:
+                self._used[key] = time.time()
+            due = sum(self._counts.values()) >= FLUSH_EVERY
+        if due:
+            self.flush()
+        return row[0] if row else None
+
+    def flush(self):
+        with self._connect() as db:
+            self._write_pending(db)
+
+    def _write_pending(self, db):
+        with self._lock:
+            counts, self._counts = self._counts, {"hits": 0, "misses": 0}
+            used, self._used = self._used, {}
+        db.executemany("UPDATE counters SET value = value + ? WHERE name = ?",
+                       [(n, name) for name, n in counts.items() if n])
+        db.executemany("UPDATE figures SET last_used = MAX(last_used, ?) WHERE key = ?",
+                       [(when, key) for key, when in used.items()])
+
+    def put(self, key, value):
+        with self._connect() as db:
+            self._write_pending(db)
+            db.execute("INSERT OR REPLACE INTO figures VALUES (?, ?, ?)", (key, value, time.time()))
+            db.execute("DELETE FROM figures WHERE key IN (SELECT key FROM figures ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                       (self.max_entries,))
+
+    def clear(self):
+        with self._connect() as db:
+            db.execute("DELETE FROM figures")
+
+    def stats(self):
+        self.flush()
+        db = self._connect()
+        counters = dict(db.execute("SELECT name, value FROM counters").fetchall())
+        entries = db.execute("SELECT COUNT(*) FROM figures").fetchone()[0]
+        return {"backend": "sqlite", "path": self.path, "hits": counters["hits"], "misses": counters["misses"],
+                "entries": entries, "max_entries": self.max_entries}
+
+
+class FigureCache:
+    def __init__(self, backend, version=""):
+        self.backend = backend
+        # Part of every key, so bumping it (new data) orphans old figures without a flush.
+        self.version = version
+
+    def key(self, name, args):
+        raw = json.dumps([name, self.version, args], default=str)
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def memoize(self, fn):
+        """Cache the figures ``fn`` returns. Apply it below ``@app.callback``.
+
+        Failures are not cached: an exception from ``fn`` propagates and the next call runs it again,
+        so catch errors (and build any error figure) outside the memoized function.
+        """
+        @functools.wraps(fn)
+        def wrapper(*args):
+            key = self.key(fn.__name__, args)
+            cached = self.backend.get(key)
+            if cached is not None:
+                return json.loads(cached)
+            result = fn(*args)
+            if isinstance(result, go.Figure):
+                self.backend.put(key, result.to_json())
+            return result
+        return wrapper
+
+    def stats(self):
+        stats = self.backend.stats()
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["version"] = self.version
+        return stats
+
+
+def from_env():
+    max_entries = int(os.environ.get("WPP_FIGURE_CACHE_SIZE", DEFAULT_MAX_ENTRIES))
+    path = os.environ.get("WPP_FIGURE_CACHE_PATH")
+    return FigureCache(SQLiteBackend(path, max_entries) if path else MemoryBackend(max_entries))
+
+
+figure_cache = from_env()
@@ -0,0 +1,139 @@
+"""HTTP compression and conditional responses for the Dash server.
+
+Text responses larger than ``MIN_SIZE`` are compressed with brotli when the ``brotli`` package is
+installed and the client accepts it, and with gzip otherwise. Static files (component bundles and
+assets) never change for a given URL and ETag, so their compressed copies are kept in a small LRU
+instead of being recompressed on every request.
+
+Callback responses get a weak ETag computed from the request body, the dataset version (which
+counts ingested rows) and the model version. Callbacks are pure functions of those, the same
+assumption the figure cache makes. A callback request whose If-None-Match matches gets a 304
+before the callback runs. Browsers do not revalidate POSTs on their own, so
+``assets/revalidate.js`` keeps the last callback responses and sends their ETags. The index page,
+layout and dependencies get an ETag of their body and are answered 304 when unchanged.
+
+Set ``WPP_COMPRESS=0`` when a reverse proxy already compresses responses.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_SIZE = 500
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+STATIC_CACHE_ENTRIES = 64
+COMPRESSIBLE = {"text/html", "text/css", "text/plain", "application/json", "application/javascript", "text/javascript", "image/svg+xml"}
+STATIC_PREFIXES = ("/_dash-component-suites/", "/assets/")
+CALLBACK_PATH = "/_dash-update-component"
+TAGGED_GETS = ("/_dash-layout", "/_dash-dependencies")
+
+_static = OrderedDict()
+_lock = threading.Lock()
+_counts = {"compressed": 0, "raw_bytes": 0, "sent_bytes": 0, "not_modified": 0}
+
+
+def _count(**amounts):
+    with _lock:
+        for name, amount in amounts.items():
+            _counts[name] += amount
+
+
+def stats():
+    with _lock:
+        counts = dict(_counts)
+    counts["saved_ratio"] = 1 - counts["sent_bytes"] / counts["raw_bytes"] if counts["raw_bytes"] else 0.0
+    return counts
+
+
+def callback_etag(version, body):
+    return hashlib.sha1(version.encode() + b"\0" + body).hexdigest()[:20]
+
+
+def encoding_for(response):
+    """``"br"``, ``"gzip"`` or None for this response and the current request."""
+    if response.status_code != 200 or response.is_streamed or "Content-Encoding" in response.headers:
+        return None
+    if response.mimetype not in COMPRESSIBLE:
+        return None
+    if brotli is not None and request.accept_encodings["br"]:
+        return "br"
+    return "gzip" if request.accept_encodings["gzip"] else None
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, GZIP_LEVEL, mtime=0)
+
+
+def compressed_static(data, encoding):
+    key = (request.full_path, encoding, len(data), hashlib.sha1(data).digest())
+    with _lock:
+        if key in _static:
+            _static.move_to_end(key)
+            return _static[key]
+    packed = compress(data, encoding)
+    with _lock:
+        _static[key] = packed
+        while len(_static) > STATIC_CACHE_ENTRIES:
+            _static.popitem(last=False)
+    return packed
+
+
+def not_modified(tag):
+    _count(not_modified=1)
+    response = Response(status=304)
+    response.set_etag(tag, weak=True)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def init_app(server, version):
+    """Install the hooks on ``server``. ``version()`` returns the current dataset and model version."""
+    enabled = os.environ.get("WPP_COMPRESS", "1") != "0"
+
+    @server.before_request
+    def answer_unchanged_callbacks():
+        if request.method == "POST" and request.path == CALLBACK_PATH and request.if_none_match:
+            tag = callback_etag(version(), request.get_data())
+            if request.if_none_match.contains_weak(tag):
+                return not_modified(tag)
+
+    @server.after_request
+    def tag_and_compress(response):
+        if response.status_code == 200 and not response.is_streamed:
+            if request.method == "POST" and request.path == CALLBACK_PATH:
+                response.set_etag(callback_etag(version(), request.get_data()), weak=True)
+                response.headers["Cache-Control"] = "no-cache"
+            elif request.method == "GET" and (request.path in TAGGED_GETS or response.mimetype == "text/html"):
+                response.add_etag(weak=True)
+                response.headers["Cache-Control"] = "no-cache"
+                if request.if_none_match.contains_weak(response.get_etag()[0]):
+                    return not_modified(response.get_etag()[0])
+
+        encoding = encoding_for(response) if enabled else None
+        if response.mimetype in COMPRESSIBLE:
+            response.vary.add("Accept-Encoding")
+        if encoding is None:
+            return response
+        response.direct_passthrough = False
+        data = response.get_data()
+        if len(data) < MIN_SIZE:
+            return response
+        if request.path.startswith(STATIC_PREFIXES):
+            packed = compressed_static(data, encoding)
+        else:
+            packed = compress(data, encoding)
+        response.set_data(packed)
+        response.headers["Content-Encoding"] = encoding
+        _count(compressed=1, raw_bytes=len(data), sent_bytes=len(packed))
+        return response
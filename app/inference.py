@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+
+from registry import ModelRegistry
+
+# "compiled" swaps sklearn's predict for the flattened NumPy tree engine.
+INFERENCE_BACKEND = os.environ.get("WPP_INFERENCE_BACKEND", "sklearn")
+
+feature_info = {
+    "ph": ("  pH", "pH"),
+    "do": ("DO (mg/l)", "Dissolved Oxygen (mg/l)"),
+    "tds": ("SS (mg/l)", "Suspended Solids (mg/l)"),
+    "nh3n": ("NH3N (mg/l)", "Ammonia (mg/l)"),
+    "temp": ("TEMP. (oC)", "Temperature (oC)"),
+    "h2s": ("H2S (mg/l)", "Hydrogen Sulfide (mg/l)"),
+    "bod": ("BOD (mg/l)", "Biochemical Oxygen Demand (mg/l)"),
+    "cod": ("COD (mg/l)", "Chemical Oxygen Demand (mg/l)"),
+    "tkn": ("TKN (mg/l)", "Total Kjeldahl Nitrogen (mg/l)"),
+    "no2": ("NO2 (mg/l)", "Nitrite (mg/l)"),
+    "no3": ("NO3 (mg/l)", "Nitrate (mg/l)"),
+    "tp": ("T-P (mg/l)", "Total Phosphorus"),
+    "coliform": ("T.Coliform (col/100ml)", "Coliform")
+}
+# Order matters: this is the column order the scaler and model were fitted on.
+selected_feature_keys = ["ph", "do", "bod", "no3", "tds", "cod", "coliform"]
+
+# Weight-based WQI (the prediction page) and ISQA. Inputs listed under "log1p" (ln(x + 1)) or
+# "log10p" (log10(x + 1)) are transformed before scaling, the way each model was trained.
+MODEL_SPECS = {
+    "weight": {"model": "code/wpp_model_weight.pkl", "scaler": "code/scaler.dump",
+               "features": selected_feature_keys, "log10p": ["coliform"]},
+    "isqa": {"model": "code/wpp_model_isqa.pkl", "scaler": "code/scaler_isqa.dump",
+             "features": ["ph", "cod", "h2s", "coliform"], "log1p": ["coliform"]},
+}
+DEFAULT_MODEL = "weight"
+
+# Bundles load on first use; unpickling imports sklearn, the slowest import in the app.
+registry = ModelRegistry(MODEL_SPECS, compiled=INFERENCE_BACKEND == "compiled")
+
+
+def load_model(name=DEFAULT_MODEL):
+    """Return (model, scaler) of the current version of ``name``."""
+    bundle = registry.get(name)
+    return bundle.model, bundle.scaler
+
+
+def model_version(name=DEFAULT_MODEL):
+    return registry.get(name).version
+
+
+def served_version(name=DEFAULT_MODEL):
+    """Like model_version, but read from file stats when the model is not loaded yet instead of loading it."""
+    return registry.version(name)
+
+
+def predict_wqi(values, model=DEFAULT_MODEL):
+    """Score an (n, k) array of raw inputs for ``model`` in one pass and return n WQI values."""
+    return registry.get(model).predict_wqi(values)
+
+
+wqi_bins = [50, 75]
+wqi_label_names = np.array(["❌ Unsafe", "⚠️ Potentially Unsafe", "✅ Safe"])
+
+
+def wqi_labels(wqi):
+    return wqi_label_names[np.digitize(wqi, wqi_bins)]
+
+
+def wqi_label(wqi):
+    return str(wqi_labels(wqi))
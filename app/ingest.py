@@ -0,0 +1,281 @@
+"""Live ingestion of new canal readings.
+
+Readings use the same columns as ``data/water.csv`` (Buddhist-era ``year``, English canal and
+sample point names, the 13 metric columns; ``Latitude``/``Longitude`` optional). They arrive
+either through ``POST /api/v1/readings`` or as CSV files dropped into ``WPP_INGEST_DIR``, which
+every worker polls, so all of them pick the rows up. With ``WPP_INGEST_DIR`` set, POSTed batches
+are written there as drop files too; without it they only reach the worker that receives them.
+Rows appended to a drop file later are ingested on their own; earlier rows are not read again.
+Validated batches are scored by the WQI model and handed to the functions registered with
+``subscribe``; the pages use that
+to fold the rows into their aggregates, correlation matrix and dropdown options in place.
+When the model registry replaces the WQI model, everything ingested so far is scored again and
+handed to the functions registered with ``on_rescore``, which rebuild their WQI rollups. For that,
+accepted rows are appended to a temporary journal file rather than kept in memory.
+"""
+import glob
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+import inference
+from datastore import clean_water, metric_columns
+from scoring import with_wqi
+from timeseries import TIMESTAMP
+
+log = logging.getLogger(__name__)
+
+required_columns = ['year', 'Canal_name (EN)', 'Sample_water_point (EN)'] + metric_columns
+POLL_SECONDS = float(os.environ.get("WPP_INGEST_POLL_SECONDS", 5))
+# The journal keeps these columns; anything else in a batch is not needed to rescore it.
+journal_columns = required_columns + ['Canal_name', 'Sample_water_point', 'Latitude', 'Longitude', TIMESTAMP]
+RESCORE_CHUNK_ROWS = 100_000
+
+_subscribers = []
+_rescorers = []
+_journal = None  # accepted raw rows, so a replaced model can score them again
+_lock = threading.Lock()
+ingested_batches = 0
+ingested_rows = 0
+
+
+class RunningCorrelation:
+    """Pairwise Pearson correlation maintained from running co-moments.
+
+    Like ``DataFrame.corr``, each pair only uses rows where both columns are present, so every
+    pair keeps its own count, means, sums of squares and co-moment. Batches are merged with the
+    parallel update of Chan et al., so the matrix never needs the raw rows again.
+    """
+
+    fields = ('n', 'mean_x', 'mean_y', 'm2_x', 'm2_y', 'co')
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        p = len(self.columns)
+        self.n = np.zeros((p, p))
+        self.mean_x = np.zeros((p, p))
+        self.mean_y = np.zeros((p, p))
+        self.m2_x = np.zeros((p, p))
+        self.m2_y = np.zeros((p, p))
+        self.co = np.zeros((p, p))
+
+    def update(self, frame):
+        values = frame.reindex(columns=self.columns).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        if not valid.any():
+            return
+        # Centre each column on its batch mean first to keep the sums well conditioned.
+        shift = np.nan_to_num(np.nanmean(np.where(valid, values, np.nan), axis=0))
+        d = np.where(valid, values - shift, 0.0)
+        w = valid.astype(float)
+
+        n_b = w.T @ w
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_x_b = np.where(n_b > 0, (d.T @ w) / n_b, 0.0)
+            mean_y_b = np.where(n_b > 0, (w.T @ d) / n_b, 0.0)
+        m2_x_b = (d * d).T @ w - n_b * mean_x_b ** 2
+        m2_y_b = w.T @ (d * d) - n_b * mean_y_b ** 2
+        co_b = d.T @ d - n_b * mean_x_b * mean_y_b
+        mean_x_b = np.where(n_b > 0, mean_x_b + shift[:, None], 0.0)
+        mean_y_b = np.where(n_b > 0, mean_y_b + shift[None, :], 0.0)
+
+        n = self.n + n_b
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = np.where(n > 0, self.n * n_b / n, 0.0)
+            share = np.where(n > 0, n_b / n, 0.0)
+        delta_x = mean_x_b - self.mean_x
+        delta_y = mean_y_b - self.mean_y
+        self.m2_x += m2_x_b + delta_x ** 2 * weight
+        self.m2_y += m2_y_b + delta_y ** 2 * weight
+        self.co += co_b + delta_x * delta_y * weight
+        self.mean_x += delta_x * share
+        self.mean_y += delta_y * share
+        self.n = n
+
+    def to_table(self):
+        """The running moments as a flat table, one row per column, for caching."""
+        data = {'column': self.columns}
+        for field in self.fields:
+            values = getattr(self, field)
+            data.update({f"{field}:{j}": values[:, j] for j in range(len(self.columns))})
+        return pd.DataFrame(data)
+
+    @classmethod
+    def from_table(cls, table):
+        tracker = cls(list(table['column']))
+        for field in cls.fields:
+            columns = [np.asarray(table[f"{field}:{j}"], dtype=float) for j in range(len(tracker.columns))]
+            setattr(tracker, field, np.column_stack(columns))
+        return tracker
+
+    def correlation(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.co / (np.sqrt(self.m2_x) * np.sqrt(self.m2_y))
+        corr[self.n < 2] = np.nan
+        corr = np.clip(corr, -1, 1)
+        np.fill_diagonal(corr, np.where(np.diag(self.n) >= 2, 1.0, np.nan))
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+def subscribe(fn):
+    """Register ``fn(readings)`` to be called with each validated batch; usable as a decorator."""
+    _subscribers.append(fn)
+    return fn
+
+
+def on_rescore(fn):
+    """Register ``fn(chunks)`` to be called after the WQI model is replaced; usable as a decorator.
+
+    ``chunks`` yields every row ingested so far, scored by the new model, a bounded number of rows
+    at a time (nothing when no row has been ingested). It is called under the ingest lock, so no
+    batch arrives halfway through.
+    """
+    _rescorers.append(fn)
+    return fn
+
+
+def validate_readings(batch):
+    """Check the schema and clean ``batch`` the same way water.csv is cleaned at load."""
+    missing = [column for column in required_columns if column not in batch.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    batch = batch.copy()
+    for column in ['year'] + metric_columns + [c for c in ('Latitude', 'Longitude') if c in batch.columns]:
+        batch[column] = pd.to_numeric(batch[column], errors='coerce')
+    return clean_water(batch)
+
+
+def ingest_readings(batch):
+    """Validate ``batch`` and apply it to every subscriber. Returns ``(accepted, rejected)`` row counts."""
+    global ingested_batches, ingested_rows
+    readings = validate_readings(batch)
+    if len(readings):
+        with _lock:
+            # Scored under the lock, so a model swapped in meanwhile rescores this batch too
+            scored = with_wqi(readings)
+            _append_journal(batch.loc[readings.index])
+            ingested_batches += 1
+            ingested_rows += len(readings)
+            for fn in _subscribers:
+                fn(scored)
+    return len(readings), len(batch) - len(readings)
+
+
+@inference.registry.subscribe
+def rescore(name):
+    if name != inference.DEFAULT_MODEL:
+        return
+    with _lock:
+        for fn in _rescorers:
+            fn(_journal_chunks())
+
+
+def _append_journal(rows):
+    global _journal
+    header = _journal is None
+    if header:
+        _journal = tempfile.TemporaryFile("w+", encoding="utf-8", newline="")
+    _journal.seek(0, os.SEEK_END)
+    rows.reindex(columns=journal_columns).to_csv(_journal, header=header, index=False)
+
+
+def _journal_chunks():
+    if _journal is None:
+        return
+    _journal.flush()
+    _journal.seek(0)
+    for chunk in pd.read_csv(_journal, chunksize=RESCORE_CHUNK_ROWS):
+        yield with_wqi(validate_readings(chunk))
+
+
+def drop_readings(batch, path):
+    """Write the valid rows of ``batch`` to a new CSV in ``path`` for every worker's watcher.
+
+    The file is written under a temporary name and renamed into place, so a watcher never sees half
+    of it. Returns ``(accepted, rejected)`` row counts; the rows are ingested on the next poll.
+    """
+    readings = validate_readings(batch)
+    if len(readings):
+        name = f"readings-{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        tmp = os.path.join(path, f".{name}.tmp")
+        # The raw rows, since validation converts the year and would be applied again on ingest
+        batch.loc[readings.index].to_csv(tmp, index=False)
+        os.replace(tmp, os.path.join(path, f"{name}.csv"))
+    return len(readings), len(batch) - len(readings)
+
+
+def read_new_rows(filename, offsets):
+    """``(rows, end)``: the rows appended to ``filename`` since its offset and the byte offset just
+    past them, or ``(None, None)`` when there are none.
+
+    ``offsets`` maps each file to the byte offset consumed so far; the caller advances it to ``end``
+    once the rows are ingested. Only complete lines are read, so a row that is still being written is
+    picked up on the next call. Drop files are append-only: a file that shrinks was replaced, and is
+    skipped from its new end on.
+    """
+    with open(filename, 'rb') as f:
+        header = f.readline()
+        if not header.endswith(b"\n"):
+            return None, None
+        start = offsets.get(filename, len(header))
+        size = os.fstat(f.fileno()).st_size
+        if size < start:
+            log.warning("drop file shrank, skipping its current rows file=%s", filename)
+            offsets[filename] = size
+            return None, None
+        f.seek(start)
+        chunk = f.read()
+    end = chunk.rfind(b"\n") + 1
+    if end == 0:
+        return None, None
+    return pd.read_csv(io.BytesIO(header + chunk[:end])), start + end
+
+
+def ingest_file(filename, offsets):
+    """Ingest the rows appended to ``filename`` since the last call. Returns ``(accepted, rejected)``.
+
+    The offset only moves past rows that were ingested: when the batch is refused (a ValueError from
+    validation, e.g. a missing column) it raises and the same rows are read again on the next call.
+    """
+    rows, end = read_new_rows(filename, offsets)
+    if rows is None:
+        return 0, 0
+    counts = ingest_readings(rows) if len(rows) else (0, 0)
+    offsets[filename] = end
+    return counts
+
+
+def watch_directory(path, poll_seconds=POLL_SECONDS):
+    """Ingest the CSVs in ``path``, and the rows later appended to them, from a daemon thread.
+
+    A file whose rows could not be ingested keeps its offset and is read again from there once it
+    changes, so nothing is lost while its problem is fixed.
+    """
+    offsets = {}
+    sizes = {}
+
+    def poll():
+        while True:
+            for filename in sorted(glob.glob(os.path.join(path, "*.csv"))):
+                try:
+                    size = os.stat(filename).st_size
+                    if sizes.get(filename) == size:
+                        continue
+                    sizes[filename] = size
+                    accepted, rejected = ingest_file(filename, offsets)
+                    if accepted or rejected:
+                        log.info("ingested file=%s accepted=%d rejected=%d", filename, accepted, rejected)
+                except (OSError, ValueError) as e:
+                    log.warning("could not ingest file=%s error=%s", filename, e)
+            time.sleep(poll_seconds)
+
+    thread = threading.Thread(target=poll, name="ingest-watcher", daemon=True)
+    thread.start()
+    return thread
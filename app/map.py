@@ -1,34 +1,32 @@
-import dash
+import copy
+import functools
+import logging
+import threading
+import numpy as np
 import pandas as pd
 import dash_leaflet as dl
-import plotly.express as px
-import plotly.graph_objects as go
 import dash_bootstrap_components as dbc
-from dash import html, dcc, callback, Output, Input
+from dash import html, dcc, callback, clientside_callback, ClientsideFunction, Output, Input, Patch, State
+from dash.exceptions import PreventUpdate
 
+from datastore import CANAL_MAP_CSV, canal_map_table, widen
+from ingest import RunningCorrelation, on_rescore, subscribe
+from metrics import instrument, record_rows
+from scoring import WQI, scored_table, with_wqi
+import outofcore
+from spatial import ViewportIndex
 
-df = pd.read_csv('data/canalwater1.csv')
+log = logging.getLogger(__name__)
 
-df["Latitude"] = pd.to_numeric(df["Latitude"], errors="coerce")
-df["Longitude"] = pd.to_numeric(df["Longitude"], errors="coerce")
-df = df.dropna(subset=["Latitude", "Longitude"])
-print("Valid Coordinates Count:", len(df))
-df['year'] = df['year'].astype(int) - 543
+# Filled in by load_data() on first use so importing the page stays cheap
+points = None
+correlation_tracker = None
+point_summary = None
+canal_options = [{'label': 'All Canals', 'value': 'all'}]
+_data_lock = threading.Lock()
 
+columns_to_exclude = ['BO', 'SS', 'Temp', 'DO', 'ISQA', WQI, 'Longitude', 'Latitude']
 
-
-for param in ['  pH','TEMP. (oC)',  'DO (mg/l)', 'H2S (mg/l)', 'BOD (mg/l)', 'COD (mg/l)', 'SS (mg/l)', 'TKN (mg/l)', 'NH3N (mg/l)', 'NO2 (mg/l)', 'NO3 (mg/l)', 'T-P (mg/l)', 'T.Coliform (col/100ml)']:
-    if param in df.columns:
-        df[param] = pd.to_numeric(df[param], errors='coerce')
-
-
-columns_to_exclude = ['BO', 'SS', 'Temp', 'DO', 'ISQA', 'Longitude', 'Latitude']
-columns_to_exclude += [col for col in df.columns if 'unnamed' in col.lower()]
-df_filtered = df.drop(columns=[col for col in columns_to_exclude if col in df.columns], errors='ignore')
-
-correlation_matrix = df_filtered.corr(numeric_only=True)
-
-canal_options = [{'label': 'All Canals', 'value': 'all'}] + [{'label': canal, 'value': canal} for canal in df['Canal_name (EN)'].unique()]
 parameter_options = [
     {'label': 'pH', 'value': '  pH'},
     {'label': 'Temperature (°C)', 'value': 'TEMP. (oC)'},
@@ -42,12 +40,15 @@ parameter_options = [
     {'label': 'Nitrite[NO2] (mg/l)', 'value': 'NO2 (mg/l)'},
     {'label': 'Nitrate[NO3] (mg/l)', 'value': 'NO3 (mg/l)'},
     {'label': 'Total Phosphorus (mg/l)', 'value': 'T-P (mg/l)'},
-    {'label': 'Total Coliform (col/100ml)', 'value': 'T.Coliform (col/100ml)'}
+    {'label': 'Total Coliform (col/100ml)', 'value': 'T.Coliform (col/100ml)'},
+    {'label': 'Predicted WQI', 'value': WQI}
 ]
-year_options = [{'label': 'All Years', 'value': 'all'}] + [{'label': str(year), 'value': str(year)} for year in sorted(df["year"].unique())]
+year_options = [{'label': 'All Years', 'value': 'all'}]
 
 # Define safety thresholds for each parameter
 safety_thresholds = {
+    # Scored by the prediction model; high is good (see inference.wqi_bins)
+    WQI: {'safe': (75, float('inf')), 'moderate': (50, 75), 'unsafe': (-float('inf'), float('inf'))},
     '  pH': {'safe': (6.5, 8.5), 'moderate': (5.5, 9.5), 'unsafe': (-float('inf'), float('inf'))},
     'TEMP. (oC)': {'safe': (15, 30), 'moderate': (10, 35), 'unsafe': (-float('inf'), float('inf'))},
     'DO (mg/l)': {'safe': (5, 8), 'moderate': (3, 10), 'unsafe': (-float('inf'), float('inf'))},
@@ -63,140 +64,377 @@ safety_thresholds = {
     'T.Coliform (col/100ml)': {'safe': (0, 1000), 'moderate': (1000, 100000), 'unsafe': (100000, float('inf'))}
 }
 
-# Function to determine safety status and color
-def get_safety_status(value, parameter):
-    if pd.isna(value) or not isinstance(value, (int, float)):
-        print(f"Invalid value for {parameter}: {value}")
-        return 'unknown', '#808080'  # Gray
-    thresholds = safety_thresholds.get(parameter, {'safe': (0, float('inf')), 'moderate': (0, float('inf')), 'unsafe': (0, float('inf'))})
-    
+safety_status_names = np.array(['safe', 'moderate', 'unsafe', 'unknown'])
+safety_colors = np.array(['#00FF00', '#FFFF00', '#FF0000', '#808080'])  # Green, yellow, red, gray
+SAFE, MODERATE, UNSAFE, UNKNOWN = range(4)
+
+# Map status to Google Maps pin image
+pin_images = np.array([
+    'https://maps.google.com/mapfiles/ms/icons/green-dot.png',
+    'https://maps.google.com/mapfiles/ms/icons/yellow-dot.png',
+    'https://maps.google.com/mapfiles/ms/icons/red-dot.png',
+    'https://maps.google.com/mapfiles/ms/icons/grey-dot.png'
+])
+
+default_thresholds = {'safe': (0, float('inf')), 'moderate': (0, float('inf')), 'unsafe': (0, float('inf'))}
+
+def classify_safety(values, parameter):
+    """Status code (index into safety_status_names) for every value of one parameter at once."""
+    values = widen(pd.to_numeric(pd.Series(values), errors='coerce'))
+    thresholds = safety_thresholds.get(parameter, default_thresholds)
     safe_min, safe_max = thresholds['safe']
     moderate_min, moderate_max = thresholds['moderate']
-    
-    if safe_min <= value <= safe_max:
-        status = 'safe'
-        color = '#00FF00'  # Green
-    elif moderate_min <= value <= moderate_max:
-        status = 'moderate'
-        color = '#FFFF00'  # Yellow
-    else:
-        status = 'unsafe'
-        color = '#FF0000'  # Red
-    
-    # print(f"Parameter: {parameter}, Value: {value}, Status: {status}, Color: {color}")
-    return status, color
+
+    codes = np.full(len(values), UNSAFE, dtype=np.int8)
+    codes[(moderate_min <= values) & (values <= moderate_max)] = MODERATE
+    codes[(safe_min <= values) & (values <= safe_max)] = SAFE
+    codes[np.isnan(values)] = UNKNOWN
+    return codes
+
+# Function to determine safety status and color
+def get_safety_status(value, parameter):
+    code = classify_safety([value], parameter)[0]
+    return str(safety_status_names[code]), str(safety_colors[code])
+
+def threshold_ranges(parameters):
+    """[[safe_min, safe_max], [moderate_min, moderate_max]] per parameter for the browser, None where unbounded."""
+    bound = lambda x: None if np.isinf(x) else x
+    return [[[bound(x) for x in safety_thresholds.get(param, default_thresholds)[status]] for status in ('safe', 'moderate')]
+            for param in parameters]
+
+# Grid index over the sampling points so the map only ships what is in view
+def build_viewport_index(df, safety_codes):
+    return ViewportIndex(df['Latitude'], df['Longitude'],
+                         filters={'canal': df['Canal_name (EN)'].cat.codes, 'year': df['year']},
+                         statuses=safety_codes)
+
+name_columns = ['Canal_name', 'Sample_water_point', 'Canal_name (EN)', 'Sample_water_point (EN)']
+
+class MapPoints:
+    """The map's rows with the status of every row for every parameter and their viewport index.
+
+    Never changed in place: new readings or scores build a new one, which replaces ``points`` in a
+    single assignment, so a callback sees one consistent set. Readings are appended to ``recent``
+    and to the index's tail (see spatial.py) without copying the table; the whole set is rebuilt
+    only when the index asks for it.
+    """
+
+    def __init__(self, df, safety_codes):
+        self.df = df
+        self.recent = None  # rows appended since the index was built, at positions len(df) onwards
+        self.safety_codes = safety_codes
+        self.viewport_index = build_viewport_index(df, safety_codes)
+
+    @classmethod
+    def classify(cls, df, parameters=None):
+        parameters = [param for param in safety_thresholds if param in df.columns] if parameters is None else parameters
+        return cls(df, {param: classify_safety(df[param], param) for param in parameters})
+
+    def __len__(self):
+        return len(self.df) + (0 if self.recent is None else len(self.recent))
+
+    def table(self, extra=None):
+        """Every row, appended ones (and then ``extra``) last, with the name columns as categories."""
+        frames = [frame for frame in (self.recent, extra) if frame is not None]
+        if not frames:
+            return self.df
+        combined = pd.concat([self.df] + [frame.reindex(columns=self.df.columns) for frame in frames], ignore_index=True)
+        for column in name_columns:
+            combined[column] = combined[column].astype('category')
+        return combined
+
+    def rows(self, positions):
+        """The rows at sorted ``positions``, whether in the table or appended."""
+        if self.recent is None:
+            return self.df.iloc[positions]
+        split = np.searchsorted(positions, len(self.df))
+        return pd.concat([self.df.iloc[positions[:split]], self.recent.iloc[positions[split:] - len(self.df)]])
+
+    def appended(self, readings):
+        """A MapPoints with ``readings`` added. It shares this one's table and index unless the index
+        needs a rebuild or a reading is on a canal the table's categories do not have."""
+        parameters = list(self.safety_codes)
+        canals = self.df['Canal_name (EN)'].cat.categories
+        index = None
+        if readings['Canal_name (EN)'].isin(canals).all():
+            index = self.viewport_index.appended(
+                readings['Latitude'], readings['Longitude'],
+                filters={'canal': canals.get_indexer(readings['Canal_name (EN)']), 'year': readings['year']},
+                statuses={param: classify_safety(readings[param], param) for param in parameters})
+        if index is None:
+            return MapPoints.classify(self.table(readings), parameters)
+        rows = readings.reindex(columns=self.df.columns)
+        points = copy.copy(self)
+        points.recent = rows.reset_index(drop=True) if self.recent is None else pd.concat([self.recent, rows], ignore_index=True)
+        points.viewport_index = index
+        return points
+
+def replace_points(new_points):
+    global points
+    with _data_lock:
+        points = new_points
+    # Cached layers are keyed on the MapPoints they came from; drop the old ones to free them
+    viewport_geojson.cache_clear()
+
+def load_data():
+    """Read the sampling points and build their safety codes, viewport index and dropdown options, once."""
+    global points, point_summary, correlation_tracker
+    if points is not None:
+        return
+    with _data_lock:
+        if points is not None:
+            return
+        if outofcore.chunked():
+            # One averaged point per sample point and year instead of every reading
+            point_summary, correlation_tracker = outofcore.canal_map_summary(correlation_columns)
+            df = point_summary.table()
+        else:
+            df = scored_table(canal_map_table(), CANAL_MAP_CSV)
+        log.info("loaded map points valid_coordinates=%d", len(df))
+        canal_options[1:] = [{'label': canal, 'value': canal} for canal in df['Canal_name (EN)'].unique()]
+        year_options[1:] = [{'label': str(year), 'value': str(year)} for year in sorted(df["year"].unique())]
+        points = MapPoints.classify(df)
+
+def correlation_matrix():
+    """Correlation of the numeric sample columns, including ingested readings."""
+    return _correlation_tracker().correlation()
+
+def correlation_columns(df):
+    excluded = columns_to_exclude + [col for col in df.columns if 'unnamed' in col.lower()]
+    return df.drop(columns=[col for col in excluded if col in df.columns], errors='ignore').select_dtypes('number').columns
+
+def _correlation_tracker():
+    # Kept as running co-moments so ingested readings update it without the raw rows
+    global correlation_tracker
+    with _data_lock:
+        if correlation_tracker is None:
+            tracker = RunningCorrelation(correlation_columns(points.table()))
+            tracker.update(points.table())
+            correlation_tracker = tracker
+    return correlation_tracker
 
 # Define page layouts
-map_layout = dbc.Container([
-
-    # Controls: Dropdowns
-    dbc.Row([
-        dbc.Col([
-            html.Label("Select Canal:", className="fw-semibold"),
-            dcc.Dropdown(
-                id='canal-dropdown',
-                options=canal_options,
-                value='all',
-                clearable=False,
-                className="mb-3"
-            ),
-        ], md=4),  
-
-        dbc.Col([
-            html.Label("Select Parameter:", className="fw-semibold"),
-            dcc.Dropdown(
-                id='parameter-dropdown',
-                options=parameter_options,
-                value='  pH',
-                clearable=False,
-                className="mb-3"
-            ),
-        ], md=4),
-
-        dbc.Col([
-            html.Label("Select Year:", className="fw-semibold"),
-            dcc.Dropdown(
-                id='year-dropdown',
-                options=year_options,
-                value='all',
-                clearable=False,
-                className="mb-3"
-            ),
-        ], md=4),
-    ], className="mb-4"),
-
-
-    # Map full-width
-    dbc.Row([
-        dbc.Col(
-            dl.Map(
-                id='map',
-                center=[13.7563, 100.5018],
-                zoom=10,
-                children=[
-                    dl.TileLayer(
-                        url="https://{s}.basemaps.cartocdn.com/light_all/{z}/{x}/{y}{r}.png",
-                        attribution='© <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors © <a href="https://carto.com/attributions">CARTO</a>',
-                        subdomains='abcd',
-                        maxZoom=20
-                    ),
-                    dl.LayerGroup(id='marker-layer')
-                ],
-                style={'width': '100%', 'height': '600px'}
-            ),
-            md=12
-        )
-    ])
-], fluid=True,style={'paddingBottom': '40px'})
+def map_layout():
+    load_data()
+    return dbc.Container([
+
+        # Controls: Dropdowns
+        dbc.Row([
+            dbc.Col([
+                html.Label("Select Canal:", className="fw-semibold"),
+                dcc.Dropdown(
+                    id='canal-dropdown',
+                    options=canal_options,
+                    value='all',
+                    clearable=False,
+                    className="mb-3"
+                ),
+            ], md=4),  
+
+            dbc.Col([
+                html.Label("Select Parameter:", className="fw-semibold"),
+                dcc.Dropdown(
+                    id='parameter-dropdown',
+                    options=parameter_options,
+                    value='  pH',
+                    clearable=False,
+                    className="mb-3"
+                ),
+            ], md=4),
+
+            dbc.Col([
+                html.Label("Select Year:", className="fw-semibold"),
+                dcc.Dropdown(
+                    id='year-dropdown',
+                    options=year_options,
+                    value='all',
+                    clearable=False,
+                    className="mb-3"
+                ),
+            ], md=4),
+        ], className="mb-4"),
+
+
+        # Map full-width
+        dbc.Row([
+            dbc.Col(
+                dl.Map(
+                    id='map',
+                    center=[13.7563, 100.5018],
+                    zoom=10,
+                    children=[
+                        dl.TileLayer(
+                            url="https://{s}.basemaps.cartocdn.com/light_all/{z}/{x}/{y}{r}.png",
+                            attribution='© <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors © <a href="https://carto.com/attributions">CARTO</a>',
+                            subdomains='abcd',
+                            maxZoom=20
+                        ),
+                        # Markers are drawn client-side from one GeoJSON collection (assets/map_layer.js)
+                        dl.GeoJSON(
+                            id='marker-layer',
+                            cluster=True,
+                            zoomToBoundsOnClick=True,
+                            spiderfyOnMaxZoom=True,
+                            superClusterOptions={'radius': 60},
+                            pointToLayer={'variable': 'wppMap.pointToLayer'},
+                            # Thresholds ship once with the layout; the browser colours points from them
+                            hideout={'pins': pin_images.tolist(), 'statuses': safety_status_names.tolist(), 'parameters': list(points.safety_codes),
+                                     'thresholds': threshold_ranges(points.safety_codes), 'parameter': '  pH'}
+                        ),
+                        # Per-cell summaries when too many points are in view (zoomed out)
+                        dl.GeoJSON(
+                            id='aggregate-layer',
+                            pointToLayer={'variable': 'wppMap.aggregateToLayer'},
+                            hideout={'colors': safety_colors.tolist(), 'statuses': safety_status_names.tolist(), 'parameters': list(points.safety_codes),
+                                     'parameter': '  pH'}
+                        )
+                    ],
+                    style={'width': '100%', 'height': '600px'}
+                ),
+                md=12
+            )
+        ])
+    ], fluid=True,style={'paddingBottom': '40px'})
 
 prediction_layout = dbc.Container([
     html.H1("Water Quality Prediction Model", className="text-center mt-4 text-primary fw-bold"),
 ])
 
-# Callback to update map
+EMPTY_LAYER = {"type": "FeatureCollection", "features": []}
+
+def point_geojson(points, rows):
+    """FeatureCollection of the sampling points at positions ``rows`` of points.
+
+    Properties are kept short: c = canal, p = sampling point, v = the value of every parameter in
+    safety_codes order. The browser works out the status of the selected one.
+    """
+    filtered_df = points.rows(rows)
+    values = np.column_stack([widen(filtered_df[param]) for param in points.safety_codes])
+    values = np.where(np.isnan(values), None, values)
+
+    features = [
+        {"type": "Feature", "geometry": {"type": "Point", "coordinates": [lon, lat]},
+         "properties": {"c": canal, "p": point, "v": value}}
+        for lat, lon, canal, point, value in zip(
+            filtered_df["Latitude"].round(6).tolist(), filtered_df["Longitude"].round(6).tolist(),
+            filtered_df['Canal_name (EN)'].tolist(), filtered_df['Sample_water_point (EN)'].tolist(),
+            values.tolist()
+        )
+    ]
+    return {"type": "FeatureCollection", "features": features}
+
+def cell_geojson(points, summary):
+    """FeatureCollection with one point per grid cell: n = sample count, s = most common known status
+    of every parameter in safety_codes order."""
+    statuses = []
+    for param in points.safety_codes:
+        known = summary["status_counts"][param][:, :UNKNOWN]
+        statuses.append(np.where(known.sum(axis=1) > 0, known.argmax(axis=1), UNKNOWN))
+    features = [
+        {"type": "Feature", "geometry": {"type": "Point", "coordinates": [lon, lat]}, "properties": {"n": n, "s": s}}
+        for lat, lon, n, s in zip(summary["lat"].round(6).tolist(), summary["lon"].round(6).tolist(),
+                                  summary["count"].tolist(), np.column_stack(statuses).tolist())
+    ]
+    return {"type": "FeatureCollection", "features": features}
+
+@functools.lru_cache(maxsize=256)
+def viewport_geojson(points, selected_canal, selected_year, bounds, cell_size):
+    """(points layer, aggregate layer) for one snapped viewport of ``points``; exactly one of them is non-empty."""
+    canals = points.df['Canal_name (EN)'].cat.categories
+    filter_values = {
+        'canal': None if selected_canal == 'all' else (canals.get_loc(selected_canal) if selected_canal in canals else -1),
+        'year': None if selected_year == 'all' else int(selected_year),
+    }
+    mode, result = points.viewport_index.query(bounds, cell_size, filter_values)
+    if mode == "points":
+        return point_geojson(points, result), EMPTY_LAYER
+    return EMPTY_LAYER, cell_geojson(points, result)
+
+# Callback to update map. The parameter is not an input: the layers carry every parameter and
+# mapParameter (assets/clientside.js) recolours them in the browser.
 @callback(
-    Output("marker-layer", "children"),
+    Output("marker-layer", "data"),
+    Output("marker-layer", "hideout"),
+    Output("aggregate-layer", "data"),
     [Input("canal-dropdown", "value"),
-     Input("parameter-dropdown", "value"),
-     Input("year-dropdown", "value")]
+     Input("year-dropdown", "value"),
+     Input("map", "bounds"),
+     Input("map", "zoom")],
+    State("marker-layer", "hideout")
 )
-def update_map_markers(selected_canal, selected_parameter, selected_year):
-    if selected_canal == 'all':
-        filtered_df = df if selected_year == 'all' else df[df['year'] == int(selected_year)]
+@instrument
+def update_map_markers(selected_canal, selected_year, bounds=None, zoom=None, current_hideout=None):
+    load_data()
+    current = points
+    if bounds is not None:
+        (south, west), (north, east) = bounds
+        bounds = (south, west, north, east)
+    cell_size, bounds = current.viewport_index.snap(bounds, zoom)
+
+    # Pans and zooms that land on the same cells change nothing on the map
+    view_key = [selected_canal, selected_year, list(bounds), cell_size]
+    if current_hideout and current_hideout.get('view') == view_key:
+        raise PreventUpdate
+
+    markers, cells = viewport_geojson(current, selected_canal, selected_year, bounds, cell_size)
+    # Only the view key changes; the thresholds and selected parameter stay as the browser has them
+    marker_hideout = Patch()
+    marker_hideout['view'] = view_key
+    record_rows(len(markers['features']) + len(cells['features']))
+    log.debug("map updated markers=%d cells=%d canal=%s year=%s", len(markers['features']), len(cells['features']), selected_canal, selected_year)
+    return markers, marker_hideout, cells
+
+clientside_callback(
+    ClientsideFunction("wpp", "mapParameter"),
+    Output("marker-layer", "hideout", allow_duplicate=True),
+    Output("aggregate-layer", "hideout"),
+    Input("parameter-dropdown", "value"),
+    State("marker-layer", "hideout"),
+    State("aggregate-layer", "hideout"),
+    prevent_initial_call=True
+)
+
+@subscribe
+def apply_readings(readings):
+    load_data()
+    _correlation_tracker().update(readings)
+
+    known_canals = {option['value'] for option in canal_options}
+    canal_options.extend({'label': canal, 'value': canal} for canal in readings['Canal_name (EN)'].unique() if canal not in known_canals)
+    years = {option['value'] for option in year_options[1:]} | {str(year) for year in readings['year'].tolist()}
+    year_options[1:] = [{'label': year, 'value': year} for year in sorted(years)]
+
+    # Readings with coordinates also go on the map: appended to the points, or folded into the
+    # point averages in chunked mode
+    if {'Latitude', 'Longitude'} <= set(readings.columns):
+        located = readings.dropna(subset=['Latitude', 'Longitude'])
+        current = points
+        if len(located) and point_summary is not None:
+            point_summary.update(located)
+            replace_points(MapPoints.classify(point_summary.table(), list(current.safety_codes)))
+        elif len(located):
+            replace_points(current.appended(located))
+
+# A replaced model changes the WQI of every point; the other parameters and the correlation
+# matrix (which leaves WQI out) stay as they are
+@on_rescore
+def rescore_points(chunks):
+    global point_summary
+    current = points
+    if current is None:
+        return
+    if point_summary is not None:
+        summary = outofcore.canal_map_summary(correlation_columns)[0]
+        for readings in chunks:
+            located = readings.dropna(subset=['Latitude', 'Longitude'])
+            if len(located):
+                summary.update(located)
+        # The rebuilt summary may order its points differently, so every status is recomputed
+        point_summary = summary
+        replace_points(MapPoints.classify(summary.table(), list(current.safety_codes)))
     else:
-        filtered_df = df[(df['Canal_name (EN)'] == selected_canal) & (df['year'] == int(selected_year))] if selected_year != 'all' else df[df['Canal_name (EN)'] == selected_canal]
-    
-    markers = []
-    for idx, row in filtered_df.iterrows():
-        if pd.notnull(row["Latitude"]) and pd.notnull(row["Longitude"]):
-            status, color = get_safety_status(row[selected_parameter], selected_parameter)
-            # Map status to Google Maps pin image
-            pin_image = {
-                'safe': 'https://maps.google.com/mapfiles/ms/icons/green-dot.png',
-                'moderate': 'https://maps.google.com/mapfiles/ms/icons/yellow-dot.png',
-                'unsafe': 'https://maps.google.com/mapfiles/ms/icons/red-dot.png',
-                'unknown': 'https://maps.google.com/mapfiles/ms/icons/grey-dot.png'
-            }[status]
-            marker = dl.Marker(
-                position=[row["Latitude"], row["Longitude"]],
-                icon={
-                    "iconUrl": pin_image,
-                    "iconSize": [32, 32],  # Adjust size to match Google Maps pin
-                    "iconAnchor": [16, 32],  # Anchor at pin's point
-                    "popupAnchor": [0, -32]
-                },
-                children=[
-                    dl.Tooltip(html.Div([
-                        html.Div(f"Canal: {row['Canal_name (EN)']}"),
-                        html.Div(f"Sampling Point: {row['Sample_water_point (EN)']}"),
-                        html.Div(f"{selected_parameter}: {row[selected_parameter]} ({status})")
-                    ]))
-                ]
-            )
-            markers.append(marker)
-    
-    print(f"Map updated with {len(markers)} markers for {'All Canals' if selected_canal == 'all' else selected_canal}, {'All Years' if selected_year == 'all' else selected_year}")
-    return markers
+        table = with_wqi(current.table())
+        replace_points(MapPoints(table, {param: classify_safety(table[param], param) for param in current.safety_codes}))
 
 # @callback(
 #     Output("page-content", "children"),
@@ -0,0 +1,194 @@
+"""Per-callback latency, payload and row-count histograms, and an on-demand sampling profiler.
+
+Wrap a Dash callback with ``@instrument`` (below ``@callback``) to record its wall time, and
+call ``record_rows(n)`` inside it to record how many rows it worked on. The size of each
+callback response is taken from the response itself once Dash has serialized it.
+
+Register ``metrics_api`` on the Flask server to serve them: ``GET /metrics`` serves the histograms in the Prometheus text format, and
+``GET /debug/profile?seconds=5`` samples the stacks of every thread in the worker for that long
+and returns them as collapsed stacks (one ``frame;frame;frame count`` line per stack, the input
+format of flamegraph.pl and speedscope). Both are off unless ``WPP_DEBUG_TOKEN`` is set, and then
+only answer requests with an ``Authorization: Bearer <token>`` header carrying it; the peer address
+says nothing behind a reverse proxy.
+"""
+import functools
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from dash.exceptions import PreventUpdate
+from flask import Blueprint, Response, abort, g, has_request_context, request
+
+log = logging.getLogger(__name__)
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+ROWS_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+MAX_PROFILE_SECONDS = 60
+
+
+class Histogram:
+    """Cumulative histogram with one ``callback`` label, in the shape Prometheus expects."""
+
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label, value):
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                series = self._series[label] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self, label):
+        """(bucket counts, sum, count) for ``label``, or None when nothing was observed."""
+        with self._lock:
+            series = self._series.get(label)
+            return None if series is None else (list(series[0]), series[1], series[2])
+
+    def exposition(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label, (counts, total, count) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{{callback="{label}",le="{bound}"}} {bucket_count}')
+                lines.append(f'{self.name}_bucket{{callback="{label}",le="+Inf"}} {count}')
+                lines.append(f'{self.name}_sum{{callback="{label}"}} {total}')
+                lines.append(f'{self.name}_count{{callback="{label}"}} {count}')
+        return lines
+
+
+callback_seconds = Histogram("wpp_callback_seconds", "Wall time of Dash callbacks.", SECONDS_BUCKETS)
+callback_response_bytes = Histogram("wpp_callback_response_bytes", "Size of Dash callback responses.", BYTES_BUCKETS)
+callback_rows = Histogram("wpp_callback_rows", "Rows a Dash callback worked on.", ROWS_BUCKETS)
+histograms = [callback_seconds, callback_response_bytes, callback_rows]
+
+callback_errors = Counter()
+_current = threading.local()
+
+
+def instrument(fn):
+    """Record the wall time of callback ``fn`` and any rows it reports. Apply it below ``@callback``."""
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        _current.callback = name
+        if has_request_context():
+            g.wpp_callback = name
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except PreventUpdate:
+            raise
+        except Exception:
+            callback_errors[name] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            _current.callback = None
+            callback_seconds.observe(name, elapsed)
+            log.debug("callback=%s seconds=%.4f", name, elapsed)
+    return wrapper
+
+
+def record_rows(count):
+    """Record that the running instrumented callback worked on ``count`` rows."""
+    name = getattr(_current, "callback", None)
+    if name is not None:
+        callback_rows.observe(name, count)
+
+
+def exposition():
+    lines = []
+    for histogram in histograms:
+        lines.extend(histogram.exposition())
+    lines.append("# HELP wpp_callback_errors_total Dash callbacks that raised.")
+    lines.append("# TYPE wpp_callback_errors_total counter")
+    for name, count in sorted(callback_errors.items()):
+        lines.append(f'wpp_callback_errors_total{{callback="{name}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}"
+
+
+def sample_stacks(seconds, interval=0.005):
+    """Sample the stack of every other thread every ``interval`` seconds for ``seconds``.
+
+    Returns a Counter of collapsed stacks (outermost frame first, prefixed with the thread name).
+    """
+    skip = threading.get_ident()
+    names = {}
+    stacks = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == skip:
+                continue
+            if ident not in names:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            frames = []
+            while frame is not None:
+                frames.append(_frame_name(frame))
+                frame = frame.f_back
+            frames.append(names.get(ident, str(ident)))
+            stacks[";".join(reversed(frames))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+metrics_api = Blueprint("metrics", __name__)
+
+
+@metrics_api.before_request
+def token_only():
+    token = os.environ.get("WPP_DEBUG_TOKEN")
+    if not token:
+        abort(404)
+    scheme, _, given = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(given.strip().encode(), token.encode()):
+        abort(403)
+
+
+@metrics_api.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(exposition(), mimetype="text/plain; version=0.0.4")
+
+
+@metrics_api.route("/debug/profile", methods=["GET"])
+def profile():
+    """Collapsed stacks of this worker's threads over ``?seconds=`` (default 5), ``?interval_ms=`` apart."""
+    seconds = min(request.args.get("seconds", 5, type=float), MAX_PROFILE_SECONDS)
+    interval = request.args.get("interval_ms", 5, type=float) / 1000
+    log.info("profiling seconds=%s interval_ms=%s", seconds, interval * 1000)
+    stacks = sample_stacks(seconds, interval)
+    body = "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+    return Response(body, mimetype="text/plain")
+
+
+@metrics_api.after_app_request
+def record_response_size(response):
+    name = g.get("wpp_callback")
+    if name is not None:
+        size = response.calculate_content_length()
+        if size is not None:
+            callback_response_bytes.observe(name, size)
+    return response
+
@@ -0,0 +1,134 @@
+"""Out-of-core loading for datasets larger than memory.
+
+With ``WPP_DATA_MODE=chunked`` the pages never hold the raw readings. Each CSV is streamed
+``WPP_CHUNK_ROWS`` rows at a time through a generator pipeline (parse, coerce, clean, score),
+and every chunk is folded into running reductions: the aggregate cube's sums, extremes and
+counts per canal, year and sample point and the trend rollups for the dashboard, and one
+averaged row per sample point and year (plus the correlation moments) for the map. Memory is
+bounded by the chunk size and the number of distinct sample points, years and days, not by the
+number of readings. The reductions are cached next to the column cache, so only the first worker
+after a CSV or the model changes reads it.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from cube import AggregateCube
+from datastore import CANAL_MAP_CSV, WATER_CSV, clean_canal_map, clean_water, compact, load_reduced, metric_columns, widen
+import inference
+from ingest import RunningCorrelation
+from scoring import WQI, with_wqi
+from timeseries import TimeSeriesStore
+
+DATA_MODE = os.environ.get("WPP_DATA_MODE", "memory")
+CHUNK_ROWS = int(os.environ.get("WPP_CHUNK_ROWS", 100_000))
+
+
+def chunked():
+    return DATA_MODE == "chunked"
+
+
+def read_chunks(csv_path, clean, chunk_rows=CHUNK_ROWS):
+    """Yield ``csv_path`` as cleaned tables of at most ``chunk_rows`` rows."""
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+        # A chunk can hold text in a metric column that a whole-file parse would not have typed
+        # the same way, so coerce before cleaning.
+        for column in metric_columns:
+            if column in chunk.columns:
+                chunk[column] = pd.to_numeric(chunk[column], errors='coerce')
+        chunk = clean(chunk)
+        if len(chunk):
+            yield chunk
+
+
+def _object_levels(frame):
+    # Chunks type the same names differently (object, or categoricals with other categories).
+    frame.index = pd.MultiIndex.from_arrays([frame.index.get_level_values(i).astype(object) for i in range(frame.index.nlevels)],
+                                            names=frame.index.names)
+    return frame
+
+
+class PointSummary:
+    """Mean of every numeric column per sample point and year, kept as running sums and counts."""
+
+    keys = ['Canal_name (EN)', 'Sample_water_point (EN)', 'year']
+    labels = ['Canal_name', 'Sample_water_point']
+
+    def __init__(self):
+        self.sums = self.counts = self.names = None
+
+    def update(self, chunk):
+        numeric = [column for column in chunk.select_dtypes('number').columns
+                   if column not in self.keys and 'unnamed' not in column.lower()]
+        frame = pd.DataFrame({**{key: chunk[key] for key in self.keys}, **{column: widen(chunk[column]) for column in numeric}},
+                             index=chunk.index)
+        grouped = frame.groupby(self.keys, observed=True)
+        sums, counts = _object_levels(grouped.sum()), _object_levels(grouped.count())
+        labels = [label for label in self.labels if label in chunk.columns]
+        names = _object_levels(chunk.groupby(self.keys, observed=True)[labels].first())
+        if self.sums is not None:
+            sums = pd.concat([self.sums, sums]).groupby(level=[0, 1, 2]).sum()
+            counts = pd.concat([self.counts, counts]).groupby(level=[0, 1, 2]).sum()
+            names = pd.concat([self.names, names]).groupby(level=[0, 1, 2]).first()
+        self.sums, self.counts, self.names = sums, counts, names
+
+    def table(self):
+        """One row per sample point and year with the mean of each column, typed like the map table."""
+        means = self.sums / self.counts.where(self.counts > 0)
+        df = pd.concat([self.names, means], axis=1).reset_index()
+        for column in self.keys[:2] + self.labels:
+            if column in df.columns:
+                df[column] = df[column].astype('category')
+        df['year'] = df['year'].astype(int)
+        return compact(df)
+
+    def to_table(self):
+        columns = {f"sum:{column}": self.sums[column].to_numpy() for column in self.sums.columns}
+        columns.update({f"count:{column}": self.counts[column].to_numpy() for column in self.counts.columns})
+        return pd.concat([self.names.reset_index(), pd.DataFrame(columns)], axis=1)
+
+    @classmethod
+    def from_table(cls, table):
+        summary = cls()
+        index = pd.MultiIndex.from_frame(pd.DataFrame({key: np.asarray(table[key]).astype(object) for key in cls.keys}))
+        labels = [label for label in cls.labels if label in table.columns]
+        summary.names = pd.DataFrame({label: np.asarray(table[label]).astype(object) for label in labels}, index=index)
+        columns = [name.split(":", 1)[1] for name in table.columns if name.startswith("sum:")]
+        summary.sums = pd.DataFrame({column: np.asarray(table[f"sum:{column}"]) for column in columns}, index=index)
+        summary.counts = pd.DataFrame({column: np.asarray(table[f"count:{column}"]) for column in columns}, index=index)
+        return summary
+
+
+def water_reductions():
+    """(TimeSeriesStore, AggregateCube) for the dashboard, from one chunked pass over water.csv."""
+    def build():
+        store = TimeSeriesStore(metric_columns)
+
+        def chunks():
+            for chunk in read_chunks(WATER_CSV, clean_water):
+                store.update(chunk)
+                yield with_wqi(chunk)
+        cube = AggregateCube.from_chunks(chunks(), metric_columns + [WQI])
+        return {"parts": cube.parts_table(), "series": store.to_table()}
+    tables = load_reduced(WATER_CSV, "dashboard", build, version=inference.model_version())
+    return (TimeSeriesStore.from_table(tables["series"], metric_columns),
+            AggregateCube.from_parts(tables["parts"], metric_columns + [WQI]))
+
+
+def canal_map_summary(correlation_columns):
+    """(PointSummary, RunningCorrelation) for the map, from one chunked pass over its CSV.
+
+    ``correlation_columns(chunk)`` picks the columns the correlation matrix covers.
+    """
+    def build():
+        summary, tracker = PointSummary(), None
+        for chunk in read_chunks(CANAL_MAP_CSV, clean_canal_map):
+            chunk = with_wqi(chunk)
+            if tracker is None:
+                tracker = RunningCorrelation(correlation_columns(chunk))
+            summary.update(chunk)
+            tracker.update(chunk)
+        return {"points": summary.to_table(), "correlation": tracker.to_table()}
+    tables = load_reduced(CANAL_MAP_CSV, "points", build, version=inference.model_version())
+    return PointSummary.from_table(tables["points"]), RunningCorrelation.from_table(tables["correlation"])
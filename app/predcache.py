@@ -0,0 +1,111 @@
+"""Cache of prediction-page results keyed on the quantized input vector.
+
+Inputs are rounded to ``WPP_PREDICTION_CACHE_DIGITS`` significant digits before lookup, and
+the prediction is computed on the rounded values, so near-identical inputs share one entry
+and every entry means the same thing however it was first reached. Entries expire after
+``WPP_PREDICTION_CACHE_TTL`` seconds, the least recently used go once there are more than
+``WPP_PREDICTION_CACHE_SIZE``, and everything is dropped when a new version of the model is swapped in.
+"""
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import inference
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_DIGITS = 4
+
+
+def quantize(values, digits):
+    """Round each value to ``digits`` significant digits."""
+    values = np.asarray(values, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        scale = 10.0 ** (digits - 1 - np.floor(np.log10(np.abs(values))))
+        rounded = np.round(values * scale) / scale
+    return np.where(np.isfinite(rounded), rounded, values)
+
+
+class PredictionCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL_SECONDS, digits=DEFAULT_DIGITS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.digits = digits
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._model_version = None
+        self.hits = self.misses = self.expired = self.evicted = self.invalidations = 0
+
+    def key(self, values):
+        return tuple(quantize(values, self.digits).tolist())
+
+    def get(self, key):
+        version = inference.model_version()
+        now = time.monotonic()
+        with self._lock:
+            if version != self._model_version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._model_version = version
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value, model_version=None):
+        with self._lock:
+            if model_version is not None and model_version != self._model_version:
+                return  # computed against a model that has since been replaced
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def memoize(self, fn):
+        """Cache ``fn(values)``; ``fn`` is called with the quantized values as a tuple."""
+        @functools.wraps(fn)
+        def wrapper(values):
+            key = self.key(values)
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+            model_version = self._model_version
+            result = fn(key)
+            self.put(key, result, model_version)
+            return result
+        return wrapper
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expired": self.expired, "evicted": self.evicted, "invalidations": self.invalidations,
+                "entries": len(self._entries), "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl, "digits": self.digits}
+
+
+def from_env():
+    return PredictionCache(
+        max_entries=int(os.environ.get("WPP_PREDICTION_CACHE_SIZE", DEFAULT_MAX_ENTRIES)),
+        ttl=float(os.environ.get("WPP_PREDICTION_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+        digits=int(os.environ.get("WPP_PREDICTION_CACHE_DIGITS", DEFAULT_DIGITS)),
+    )
+
+
+prediction_cache = from_env()
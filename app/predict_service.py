@@ -0,0 +1,144 @@
+"""Micro-batched prediction service.
+
+Callers submit rows and get a Future back. A batcher thread merges everything that is queued
+while the previous batch is being scored, plus whatever arrives within WPP_PREDICT_BATCH_MS,
+into one predict_wqi call. The call runs on a pool of WPP_PREDICT_WORKERS threads, or in the
+batcher thread itself when that is 0. The pool shares the process's loaded model. It uses threads
+rather than processes because every gunicorn worker runs its own service, and forking a process
+that is already running request threads is unsafe.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+import inference
+
+BATCH_WINDOW_MS = float(os.environ.get("WPP_PREDICT_BATCH_MS", 0))
+WORKERS = int(os.environ.get("WPP_PREDICT_WORKERS", 0))
+MAX_BATCH_ROWS = 4096
+
+
+def _score(values):
+    return inference.predict_wqi(values)
+
+
+class PredictionService:
+    def __init__(self, workers=WORKERS, window_ms=BATCH_WINDOW_MS, max_batch_rows=MAX_BATCH_ROWS):
+        self.workers = workers
+        self.window = window_ms / 1000
+        self.max_batch_rows = max_batch_rows
+        self.batches = 0
+        self.rows = 0
+        self._queue = queue.SimpleQueue()
+        self._pool = None
+        self._slots = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            if self.workers > 0:
+                # Load now rather than inside the first request.
+                inference.load_model()
+                self._slots = threading.Semaphore(self.workers)
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="predict")
+            self._thread = threading.Thread(target=self._run, name="predict-batcher", daemon=True)
+            self._thread.start()
+
+    def shutdown(self):
+        with self._lock:
+            if self._thread is None:
+                return
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def submit(self, values):
+        """Queue raw inputs (one row or an (n, 7) array); the Future resolves to n WQI values."""
+        if self._thread is None:
+            self.start()
+        values = np.asarray(values, dtype=float).reshape(-1, len(inference.selected_feature_keys))
+        future = Future()
+        self._queue.put((values, future))
+        return future
+
+    def predict(self, values):
+        return self.submit(values).result()
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "window_ms": self.window * 1000,
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_rows": self.rows / self.batches if self.batches else 0.0,
+        }
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._slots is not None:
+                # Hold the batch open until a worker is free so requests pile up behind it.
+                self._slots.acquire()
+            batch = [item]
+            rows = len(item[0])
+            deadline = time.monotonic() + self.window
+            stop = False
+            while rows < self.max_batch_rows:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+                rows += len(item[0])
+            self._dispatch(batch, rows)
+            if stop:
+                return
+
+    def _dispatch(self, batch, rows):
+        self.batches += 1
+        self.rows += rows
+        values = np.vstack([values for values, _ in batch])
+        if self._pool is None:
+            try:
+                self._resolve(batch, _score(values), None)
+            except Exception as e:
+                self._resolve(batch, None, e)
+            return
+        # The batcher goes straight back to collecting while the pool scores this batch.
+        pending = self._pool.submit(_score, values)
+        pending.add_done_callback(lambda done: self._resolve(batch, *_outcome(done)))
+
+    def _resolve(self, batch, wqi, error):
+        if self._slots is not None:
+            self._slots.release()
+        start = 0
+        for values, future in batch:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(wqi[start:start + len(values)])
+            start += len(values)
+
+
+def _outcome(done):
+    error = done.exception()
+    return (None, error) if error is not None else (done.result(), None)
+
+
+prediction_service = PredictionService()
@@ -0,0 +1,189 @@
+"""Registry of prediction models that can be replaced without a restart.
+
+Each model is served from a bundle: estimator, scaler and metadata (input features, file
+version, load time and size). When a model's files change on disk, or a reload is
+requested, the new version is loaded and warmed in a background thread while the current
+bundle keeps serving. It then replaces the old bundle in a single assignment, so a request
+sees either the old model or the new one, never a mix. Functions registered with ``subscribe``
+are called after each such swap, to rebuild anything computed with the old model.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+
+from tree_engine import CompiledEnsemble
+
+log = logging.getLogger(__name__)
+
+# How often get() looks at a model's files for a new version.
+CHECK_SECONDS = 1.0
+
+# Input transforms a spec can list features under, applied before scaling as in training.
+TRANSFORMS = {
+    "log1p": np.log1p,
+    "log10p": lambda x: np.log10(x + 1),
+}
+
+
+def file_version(spec):
+    """Short hash of the size and mtime of a model's files and of its input transforms.
+
+    Changes whenever a file is replaced or the transforms change, so scores cached under it go stale.
+    """
+    stats = [os.stat(spec[part]) for part in ("model", "scaler")]
+    raw = ":".join(f"{stat.st_mtime_ns}:{stat.st_size}" for stat in stats)
+    raw += ":" + ",".join(f"{kind}={'+'.join(spec[kind])}" for kind in TRANSFORMS if spec.get(kind))
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+
+class Bundle:
+    def __init__(self, name, spec, model, scaler, version, compiled=None):
+        self.name = name
+        self.model = model
+        self.scaler = scaler
+        self.version = version
+        self.compiled = compiled
+        self.features = list(spec["features"])
+        self._transforms = [(TRANSFORMS[kind], [self.features.index(key) for key in spec[kind]])
+                            for kind in TRANSFORMS if spec.get(kind)]
+        self.load_seconds = None
+        self.memory_bytes = None
+        self.loaded_at = None
+
+    def predict_wqi(self, values):
+        """Score an (n, len(features)) array of raw inputs and return n WQI values."""
+        values = np.asarray(values, dtype=float).reshape(-1, len(self.features))
+        if self._transforms:
+            values = values.copy()
+            for transform, columns in self._transforms:
+                values[:, columns] = transform(values[:, columns])
+        if self.compiled is not None:
+            return self.compiled.predict_wqi(values)
+        return np.exp(self.model.predict(self.scaler.transform(values)))
+
+    def info(self):
+        return {"name": self.name, "version": self.version, "features": self.features,
+                "backend": "compiled" if self.compiled is not None else "sklearn",
+                "load_seconds": self.load_seconds, "memory_bytes": self.memory_bytes, "loaded_at": self.loaded_at}
+
+
+def load_bundle(name, spec, compiled=False):
+    """Unpickle, compile and warm one model, recording how long that took and its size."""
+    import joblib
+
+    start = time.perf_counter()
+    version = file_version(spec)
+    scaler = joblib.load(spec["scaler"])
+    model = joblib.load(spec["model"])
+    bundle = Bundle(name, spec, model, scaler, version, CompiledEnsemble(model, scaler) if compiled else None)
+    # The first predict pays for sklearn's lazy setup; do it here rather than in a request.
+    bundle.predict_wqi(np.ones(len(bundle.features)))
+    bundle.load_seconds = time.perf_counter() - start
+    # Pickled size tracks the tree arrays that make up nearly all of a model's memory.
+    bundle.memory_bytes = len(pickle.dumps((model, scaler), protocol=pickle.HIGHEST_PROTOCOL))
+    bundle.loaded_at = time.time()
+    return bundle
+
+
+class ModelRegistry:
+    def __init__(self, specs, compiled=False):
+        self.specs = specs
+        self.compiled = compiled
+        self._bundles = {}
+        self._checked = {}
+        self._failed = {}
+        self._errors = {}
+        self._reloads = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._load_locks = {name: threading.Lock() for name in specs}
+
+    def get(self, name):
+        """The current bundle for ``name``. The first call loads it; later calls start a
+        background reload when the model's files have changed."""
+        if name not in self.specs:
+            raise KeyError(name)
+        bundle = self._bundles.get(name)
+        if bundle is None:
+            return self._load(name)
+        now = time.monotonic()
+        if now - self._checked.get(name, 0.0) >= CHECK_SECONDS:
+            self._checked[name] = now
+            try:
+                version = file_version(self.specs[name])
+            except OSError:
+                version = bundle.version  # mid-replace; look again on the next check
+            if version != bundle.version and version != self._failed.get(name):
+                self.reload(name)
+        return bundle
+
+    def version(self, name):
+        """Version of the bundle serving ``name``, or of its files when none is loaded yet; never loads one."""
+        bundle = self._bundles.get(name)
+        return bundle.version if bundle is not None else file_version(self.specs[name])
+
+    def subscribe(self, fn):
+        """Register ``fn(name)`` to be called once a reload has replaced ``name``; usable as a decorator."""
+        self._listeners.append(fn)
+        return fn
+
+    def reload(self, name, wait=False):
+        """Load the files for ``name`` again in the background and swap the result in when ready."""
+        if name not in self.specs:
+            raise KeyError(name)
+        with self._lock:
+            thread = self._reloads.get(name)
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=self._reload, args=(name,), name=f"reload-{name}", daemon=True)
+                self._reloads[name] = thread
+                thread.start()
+        if wait:
+            thread.join()
+        return thread
+
+    def _reload(self, name):
+        previous = self._bundles.get(name)
+        try:
+            bundle = self._load(name)
+        except Exception as e:
+            # Keep serving the current bundle; a broken file is not retried until it changes again.
+            try:
+                self._failed[name] = file_version(self.specs[name])
+            except OSError:
+                pass
+            self._errors[name] = f"{type(e).__name__}: {e}"
+            return
+        if previous is not None and bundle is not previous:
+            for fn in self._listeners:
+                try:
+                    fn(name)
+                except Exception:
+                    log.exception("reload listener failed model=%s", name)
+
+    def _load(self, name):
+        with self._load_locks[name]:
+            spec = self.specs[name]
+            current = self._bundles.get(name)
+            if current is not None and current.version == file_version(spec):
+                return current
+            bundle = load_bundle(name, spec, self.compiled)
+            self._bundles[name] = bundle
+            self._failed.pop(name, None)
+            self._errors.pop(name, None)
+            return bundle
+
+    def models(self):
+        listing = []
+        for name, spec in self.specs.items():
+            bundle = self._bundles.get(name)
+            info = bundle.info() if bundle is not None else {"name": name, "version": None, "features": list(spec["features"])}
+            reload = self._reloads.get(name)
+            info["reloading"] = reload is not None and reload.is_alive()
+            info["last_error"] = self._errors.get(name)
+            listing.append(info)
+        return listing
@@ -0,0 +1,44 @@
+"""Model-predicted WQI for every reading.
+
+Tables are scored in one vectorized pass and get a ``WQI`` column, which the aggregate cube and
+the map's point averages roll up like any metric, so no callback runs the model. The scores of
+each source CSV are cached next to its column cache, keyed on the CSV and the model version, so
+they are only recomputed when either changes. Ingested readings are scored as they arrive.
+"""
+import numpy as np
+import pandas as pd
+
+import inference
+from datastore import load_reduced, widen
+
+WQI = 'WQI'
+
+# The model validates in float32. Trees send every value past their largest split to the same
+# leaf, so clipping the odd huge count (coliform reaches 1e121) does not change its score.
+MAX_INPUT = float(np.finfo(np.float32).max)
+
+
+def score(readings, model=inference.DEFAULT_MODEL):
+    """Predicted WQI of every row of ``readings``; NaN where an input is missing or negative."""
+    features = inference.registry.get(model).features
+    values = np.column_stack([widen(pd.to_numeric(readings[inference.feature_info[key][0]], errors='coerce'))
+                              for key in features])
+    valid = (~np.isnan(values) & (values >= 0)).all(axis=1)
+    scores = np.full(len(values), np.nan)
+    if valid.any():
+        scores[valid] = inference.predict_wqi(np.minimum(values[valid], MAX_INPUT), model)
+    return scores
+
+
+def with_wqi(readings, scores=None):
+    """``readings`` plus a WQI column, sharing the other columns rather than copying them."""
+    table = readings.copy(deep=False)
+    table[WQI] = score(readings) if scores is None else scores
+    return table
+
+
+def scored_table(table, csv_path, model=inference.DEFAULT_MODEL):
+    """``table`` (the cleaned ``csv_path``) plus its WQI column, scored once per CSV and model version."""
+    tables = load_reduced(csv_path, WQI.lower(), lambda: {"scores": pd.DataFrame({WQI: score(table, model)})},
+                          version=inference.model_version(model))
+    return with_wqi(table, np.asarray(tables["scores"][WQI]))
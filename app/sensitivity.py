@@ -0,0 +1,70 @@
+"""What-if sensitivity of the predicted WQI around one set of inputs.
+
+Each input is swept over a grid from 0 to twice its entered value while the others stay put
+(one-at-a-time curves), and chosen pairs are swept over the full grid x grid (heatmaps). Every
+row of every sweep goes into one matrix that is scored in a single batched predict, so a full
+sweep costs about as much as one prediction of a few thousand rows.
+"""
+import numpy as np
+
+from inference import selected_feature_keys
+
+GRID_POINTS = 41
+
+
+def feature_grid(value, points=GRID_POINTS):
+    """``points`` values from 0 to twice ``value``, with ``value`` itself in the middle."""
+    return np.linspace(0, 2 * value if value > 0 else 1.0, points)
+
+
+def sweep_matrix(values, pairs=(), points=GRID_POINTS):
+    """All rows of the sweeps around ``values`` as one (rows, 7) matrix, plus the grid of each input."""
+    base = np.asarray(values, dtype=float)
+    grids = {key: feature_grid(value, points) for key, value in zip(selected_feature_keys, base)}
+    blocks = [base[None, :]]
+    for i, key in enumerate(selected_feature_keys):
+        block = np.repeat(base[None, :], points, axis=0)
+        block[:, i] = grids[key]
+        blocks.append(block)
+    for x_key, y_key in pairs:
+        xs, ys = np.meshgrid(grids[x_key], grids[y_key])
+        block = np.repeat(base[None, :], xs.size, axis=0)
+        block[:, selected_feature_keys.index(x_key)] = xs.ravel()
+        block[:, selected_feature_keys.index(y_key)] = ys.ravel()
+        blocks.append(block)
+    return np.vstack(blocks), grids
+
+
+def split_sweep(wqi, grids, pairs=(), points=GRID_POINTS):
+    """Split the scores of ``sweep_matrix`` rows back into (base WQI, curves, heatmaps).
+
+    ``curves[key]`` is the WQI along that input's grid; ``heatmaps[(x, y)]`` is a
+    (len(y grid), len(x grid)) array.
+    """
+    wqi = np.asarray(wqi, dtype=float)
+    curves, heatmaps = {}, {}
+    start = 1
+    for key in selected_feature_keys:
+        curves[key] = wqi[start:start + points]
+        start += points
+    for x_key, y_key in pairs:
+        size = len(grids[x_key]) * len(grids[y_key])
+        heatmaps[(x_key, y_key)] = wqi[start:start + size].reshape(len(grids[y_key]), len(grids[x_key]))
+        start += size
+    return wqi[0], curves, heatmaps
+
+
+def sensitivity(values, predict, pairs=(), points=GRID_POINTS):
+    """Sweep every input and each (x, y) pair around ``values`` with one ``predict(matrix)`` call.
+
+    Returns ``(base WQI, grids, curves, heatmaps)``; see ``split_sweep``.
+    """
+    matrix, grids = sweep_matrix(values, pairs, points)
+    base, curves, heatmaps = split_sweep(predict(matrix), grids, pairs, points)
+    return base, grids, curves, heatmaps
+
+
+def ranked_gains(base, curves):
+    """Inputs ordered by the most WQI that changing them alone could gain, as (key, gain, best value index)."""
+    gains = [(key, float(np.max(curve) - base), int(np.argmax(curve))) for key, curve in curves.items()]
+    return sorted(gains, key=lambda gain: gain[1], reverse=True)
@@ -0,0 +1,236 @@
+"""Viewport queries over sampling points with a uniform lat/long grid index.
+
+Rows are sorted by grid cell, so the cells covering a viewport map to one contiguous slice per
+grid row, found with ``searchsorted``, and a query touches only what is in view. For zoomed-out
+views, per-cell aggregates (point count, centroid, per-parameter status counts) are built at load
+for a ladder of coarser cell sizes, so a query returns a bounded number of summary points however many
+stations the dataset holds.
+
+Rows added later go to a small unsorted tail that queries scan directly, so an update costs the
+size of the batch rather than of the index. Callers rebuild once ``appended`` says the tail has
+outgrown ``MIN_TAIL`` rows or an eighth of the index.
+"""
+import copy
+
+import numpy as np
+
+# Aggregate cell sizes in degrees, coarse to fine (~70 km down to ~1 km at Bangkok's latitude).
+LEVELS = (0.64, 0.32, 0.16, 0.08, 0.04, 0.02, 0.01)
+# Fine grid used for raw point lookups.
+POINT_CELL = 0.005
+# A view with more matching points than this is served as aggregates instead.
+MAX_POINTS = 2000
+N_STATUSES = 4
+MIN_TAIL = 1024
+TAIL_FRACTION = 8
+
+
+class Grid:
+    def __init__(self, cell_size, south, west, north, east):
+        self.cell_size = cell_size
+        self.south, self.west = south, west
+        self.n_cols = int((east - west) // cell_size) + 1
+        self.n_rows = int((north - south) // cell_size) + 1
+
+    def cells(self, lat, lon):
+        col = np.clip(((lon - self.west) // self.cell_size).astype(np.int64), 0, self.n_cols - 1)
+        row = np.clip(((lat - self.south) // self.cell_size).astype(np.int64), 0, self.n_rows - 1)
+        return row * self.n_cols + col
+
+    def snap(self, bounds):
+        """Expand ``(south, west, north, east)`` outward to whole cells."""
+        size = self.cell_size
+        south, west, north, east = bounds
+        return (float(self.south + ((south - self.south) // size) * size), float(self.west + ((west - self.west) // size) * size),
+                float(self.south + ((north - self.south) // size + 1) * size), float(self.west + ((east - self.west) // size + 1) * size))
+
+    def span(self, bounds):
+        """``(row0, row1, col0, col1)`` of the cells intersecting ``bounds``, or None if there are none."""
+        south, west, north, east = bounds
+        col0, col1 = ((np.array([west, east]) - self.west) // self.cell_size).astype(np.int64)
+        row0, row1 = ((np.array([south, north]) - self.south) // self.cell_size).astype(np.int64)
+        if col1 < 0 or row1 < 0 or col0 >= self.n_cols or row0 >= self.n_rows:
+            return None
+        return max(row0, 0), min(row1, self.n_rows - 1), max(col0, 0), min(col1, self.n_cols - 1)
+
+    def covers(self, cells, bounds):
+        """Mask of ``cells`` (as returned by ``cells``) that intersect ``bounds``."""
+        span = self.span(bounds)
+        if span is None:
+            return np.zeros(len(cells), dtype=bool)
+        row0, row1, col0, col1 = span
+        row, col = cells // self.n_cols, cells % self.n_cols
+        return (row >= row0) & (row <= row1) & (col >= col0) & (col <= col1)
+
+    def positions(self, sorted_cells, bounds):
+        """Positions in ``sorted_cells`` whose cell intersects ``bounds``."""
+        span = self.span(bounds)
+        if span is None:
+            return np.empty(0, dtype=np.int64)
+        row0, row1, col0, col1 = span
+        rows = np.arange(row0, row1 + 1) * self.n_cols
+        starts = np.searchsorted(sorted_cells, rows + col0, side="left")
+        stops = np.searchsorted(sorted_cells, rows + col1, side="right")
+        lengths = stops - starts
+        if not lengths.sum():
+            return np.empty(0, dtype=np.int64)
+        # Concatenated ranges [start, stop) without a Python loop.
+        offsets = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+        return np.arange(lengths.sum()) + offsets
+
+
+class ViewportIndex:
+    """Spatial index over sampling points with optional equality filters and status summaries.
+
+    ``filters`` maps a name to an integer array (e.g. canal codes, years) that queries can match
+    on; ``statuses`` maps a parameter to its per-row status codes (0..3). Rows added with
+    ``appended`` get the positions after the existing ones.
+    """
+
+    def __init__(self, lat, lon, filters, statuses, max_points=MAX_POINTS):
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        self.filters = {name: np.asarray(values, dtype=np.int64) for name, values in filters.items()}
+        self.statuses = statuses
+        self.max_points = max_points
+        self.extent = (self.lat.min(), self.lon.min(), self.lat.max(), self.lon.max())
+        self.size = len(self.lat)
+        self.tail = None
+
+        self.point_grid = Grid(POINT_CELL, *self.extent)
+        cells = self.point_grid.cells(self.lat, self.lon)
+        self.point_order = np.argsort(cells, kind="stable")
+        self.point_cells = cells[self.point_order]
+        self.levels = {cell_size: self._build_level(cell_size) for cell_size in LEVELS}
+
+    def _build_level(self, cell_size):
+        # One row per (cell, filter values) with counts, coordinate sums and status counts.
+        grid = Grid(cell_size, *self.extent)
+        key = grid.cells(self.lat, self.lon)
+        decoders = []
+        for name, values in self.filters.items():
+            uniques, codes = np.unique(values, return_inverse=True)
+            key = key * len(uniques) + codes.ravel()
+            decoders.append((name, uniques))
+        group_keys, inverse = np.unique(key, return_inverse=True)
+        inverse = inverse.ravel()
+        n_groups = len(group_keys)
+
+        # Unpack the filter values again, last packed first.
+        filters = {}
+        for name, uniques in reversed(decoders):
+            filters[name] = uniques[group_keys % len(uniques)]
+            group_keys = group_keys // len(uniques)
+        return {
+            "grid": grid,
+            "cells": group_keys,
+            "filters": filters,
+            "count": np.bincount(inverse, minlength=n_groups),
+            "lat": np.bincount(inverse, weights=self.lat, minlength=n_groups),
+            "lon": np.bincount(inverse, weights=self.lon, minlength=n_groups),
+            # (groups, parameters, statuses), parameters in self.statuses order
+            "statuses": np.stack([np.bincount(inverse * N_STATUSES + codes, minlength=n_groups * N_STATUSES).reshape(n_groups, N_STATUSES)
+                                  for codes in self.statuses.values()], axis=1),
+        }
+
+    def appended(self, lat, lon, filters, statuses):
+        """A copy of the index with these rows added to its tail, or None when it should be rebuilt.
+
+        The copy shares every sorted array with this index, so this costs the size of the tail. Rows
+        outside the extent, or a tail past ``max(MIN_TAIL, size / TAIL_FRACTION)``, need a rebuild.
+        """
+        lat, lon = np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+        south, west, north, east = self.extent
+        if ((lat < south) | (lat > north) | (lon < west) | (lon > east)).any():
+            return None
+        new = {"lat": lat, "lon": lon, "filters": {name: np.asarray(filters[name], dtype=np.int64) for name in self.filters},
+               "statuses": np.column_stack([np.asarray(statuses[param], dtype=np.int64) for param in self.statuses])}
+        if self.tail is not None:
+            new = {"lat": np.concatenate([self.tail["lat"], new["lat"]]), "lon": np.concatenate([self.tail["lon"], new["lon"]]),
+                   "filters": {name: np.concatenate([self.tail["filters"][name], values]) for name, values in new["filters"].items()},
+                   "statuses": np.concatenate([self.tail["statuses"], new["statuses"]])}
+        if len(new["lat"]) > max(MIN_TAIL, self.size // TAIL_FRACTION):
+            return None
+        index = copy.copy(self)
+        index.tail = new
+        return index
+
+    def _tail_in_view(self, grid, bounds, filter_values):
+        # Tail positions in the cells of ``grid`` that intersect ``bounds`` and match the filters.
+        if self.tail is None:
+            return np.empty(0, dtype=np.int64)
+        covered = grid.covers(grid.cells(self.tail["lat"], self.tail["lon"]), bounds)
+        return self._matching(filter_values, self.tail["filters"], np.flatnonzero(covered))
+
+    @staticmethod
+    def level_for_zoom(zoom):
+        # Aim for aggregate cells about a quarter of a 256px tile wide.
+        target = 360 / 2 ** zoom / 4
+        return min(LEVELS, key=lambda size: abs(np.log2(size / target)))
+
+    def _matching(self, filter_values, arrays, positions):
+        mask = np.ones(len(positions), dtype=bool)
+        for name, value in filter_values.items():
+            if value is not None:
+                mask &= arrays[name][positions] == value
+        return positions[mask]
+
+    def snap(self, bounds, zoom):
+        """Pick the aggregate level for ``zoom`` and expand ``bounds`` to whole cells of it.
+
+        ``bounds`` is ``(south, west, north, east)`` or ``None`` for the full extent. Views that
+        snap to the same cells give the same result, so callers can cache on the return value.
+        """
+        cell_size = self.level_for_zoom(zoom if zoom is not None else 10)
+        return cell_size, Grid(cell_size, *self.extent).snap(bounds if bounds is not None else self.extent)
+
+    def query(self, bounds, cell_size, filter_values):
+        """Return ``("points", row_positions)`` or ``("cells", summary)`` for snapped ``bounds``.
+
+        The summary's ``status_counts`` maps every parameter to its (cells, statuses) counts.
+        """
+        # Count matching rows from the finest aggregates, without touching individual rows.
+        finest = self.levels[LEVELS[-1]]
+        in_view = self._matching(filter_values, finest["filters"], finest["grid"].positions(finest["cells"], bounds))
+        tail = self._tail_in_view(finest["grid"], bounds, filter_values)
+        if finest["count"][in_view].sum() + len(tail) <= self.max_points:
+            candidates = self.point_order[self.point_grid.positions(self.point_cells, bounds)]
+            rows = self._matching(filter_values, self.filters, candidates)
+            south, west, north, east = bounds
+            inside = (self.lat[rows] >= south) & (self.lat[rows] <= north) & (self.lon[rows] >= west) & (self.lon[rows] <= east)
+            rows = rows[inside]
+            if len(tail):
+                lat, lon = self.tail["lat"][tail], self.tail["lon"][tail]
+                inside = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+                rows = np.concatenate([rows, self.size + tail[inside]])
+            return "points", np.sort(rows)
+
+        level = self.levels[cell_size]
+        groups = self._matching(filter_values, level["filters"], level["grid"].positions(level["cells"], bounds))
+        keys, counts = level["cells"][groups], level["count"][groups]
+        lats, lons, statuses = level["lat"][groups], level["lon"][groups], level["statuses"][groups]
+        tail = self._tail_in_view(level["grid"], bounds, filter_values)
+        if len(tail):
+            # Tail rows count as groups of one, with a one-hot status per parameter
+            lat, lon = self.tail["lat"][tail], self.tail["lon"][tail]
+            one_hot = np.zeros((len(tail), len(self.statuses), N_STATUSES), dtype=statuses.dtype)
+            codes = self.tail["statuses"][tail]
+            one_hot[np.arange(len(tail))[:, None], np.arange(len(self.statuses))[None, :], codes] = 1
+            keys = np.concatenate([keys, level["grid"].cells(lat, lon)])
+            counts = np.concatenate([counts, np.ones(len(tail), dtype=counts.dtype)])
+            lats, lons = np.concatenate([lats, lat]), np.concatenate([lons, lon])
+            statuses = np.concatenate([statuses, one_hot])
+        cells, inverse = np.unique(keys, return_inverse=True)
+        inverse = inverse.ravel()
+        count = np.bincount(inverse, weights=counts, minlength=len(cells))
+        # Sum the status counts of every parameter per cell in one pass over the groups sorted by cell
+        order = np.argsort(inverse, kind="stable")
+        totals = np.add.reduceat(statuses[order], np.searchsorted(inverse[order], np.arange(len(cells))))
+        status_counts = {param: totals[:, i] for i, param in enumerate(self.statuses)}
+        summary = {
+            "lat": np.bincount(inverse, weights=lats, minlength=len(cells)) / count,
+            "lon": np.bincount(inverse, weights=lons, minlength=len(cells)) / count,
+            "count": count.astype(np.int64),
+            "status_counts": status_counts,
+        }
+        return "cells", summary
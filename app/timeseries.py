@@ -0,0 +1,154 @@
+"""Multi-resolution time series of the metrics per canal, for the Trends tab.
+
+Readings are rolled up into sums and counts per canal and hour, day, week, month and year as they
+arrive, so a query never touches raw readings. A query picks the finest rollup that covers the
+requested range in at most ``OVERSAMPLE * max_points`` buckets, then thins each metric to
+``max_points`` with largest-triangle-three-buckets, which keeps the peaks and troughs a plain
+stride would drop. The figure therefore ships a bounded number of points whether a canal has
+three yearly samples or years of hourly sensor data, and zooming in re-queries a finer rollup.
+
+Readings carry a ``timestamp`` column when their time is known. Rows with only a ``year`` (the
+annual samples in data/water.csv) are placed on 1 January of that year.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from datastore import widen
+
+CANAL = 'Canal_name (EN)'
+TIMESTAMP = 'timestamp'
+
+# Finest first; the pandas period each rollup buckets by.
+LEVELS = {'hour': 'h', 'day': 'D', 'week': 'W', 'month': 'M', 'year': 'Y'}
+MAX_POINTS = 400
+OVERSAMPLE = 4
+
+
+def reading_times(readings):
+    """Timestamp of every reading: its ``timestamp`` if set, else 1 January of its year."""
+    years = pd.to_datetime(readings['year'].astype(int).astype(str), format='%Y', errors='coerce')
+    if TIMESTAMP not in readings.columns:
+        return pd.Series(years.to_numpy(), index=readings.index)
+    times = pd.to_datetime(readings[TIMESTAMP], errors='coerce')
+    return times.fillna(pd.Series(years.to_numpy(), index=readings.index))
+
+
+def lttb(x, y, threshold):
+    """Indices of the ``threshold`` points of (x, y) that largest-triangle-three-buckets keeps.
+
+    ``x`` must be increasing. The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with the previous pick and the mean of
+    the next bucket.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    picked = np.empty(threshold, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        following = slice(stop, edges[i + 2] if i + 2 < len(edges) else n)
+        next_x, next_y = x[following].mean(), y[following].mean()
+        ax, ay = x[previous], y[previous]
+        area = np.abs((ax - next_x) * (y[start:stop] - ay) - (ax - x[start:stop]) * (next_y - ay))
+        previous = start + int(np.argmax(area))
+        picked[i + 1] = previous
+    return picked
+
+
+class TimeSeriesStore:
+    def __init__(self, metrics):
+        self.metrics = list(metrics)
+        self._sums = {level: None for level in LEVELS}
+        self._counts = {level: None for level in LEVELS}
+        self._means = {}
+        self._lock = threading.Lock()
+
+    def update(self, readings):
+        """Fold ``readings`` (cleaned rows with canal, year and metric columns) into every rollup."""
+        if not len(readings):
+            return
+        times = reading_times(readings)
+        values = pd.DataFrame({metric: widen(readings[metric]) for metric in self.metrics}, index=readings.index)
+        canals = readings[CANAL].astype(object)
+        with self._lock:
+            for level, period in LEVELS.items():
+                buckets = times.dt.to_period(period).dt.start_time
+                grouped = values.groupby([canals, buckets.rename('time')])
+                sums, counts = grouped.sum(), grouped.count()
+                if self._sums[level] is not None:
+                    sums = pd.concat([self._sums[level], sums]).groupby(level=[0, 1]).sum()
+                    counts = pd.concat([self._counts[level], counts]).groupby(level=[0, 1]).sum()
+                self._sums[level], self._counts[level] = sums, counts
+            self._means = {}
+
+    def _canal_means(self, level, canal):
+        # Sliced per canal on first use and dropped on the next update. Under the lock, so a slice
+        # of the old rollups is never cached after an update has cleared the cache.
+        key = (level, canal)
+        with self._lock:
+            means = self._means.get(key)
+            if means is None:
+                sums, counts = self._sums[level], self._counts[level]
+                if sums is None or canal not in sums.index.get_level_values(0):
+                    means = pd.DataFrame(columns=self.metrics, index=pd.DatetimeIndex([], name='time'))
+                else:
+                    means = (sums.xs(canal, level=0) / counts.xs(canal, level=0).where(lambda c: c > 0)).sort_index()
+                self._means[key] = means
+        return means
+
+    def series(self, canal, start=None, end=None, max_points=MAX_POINTS):
+        """Return ``(level, {metric: Series})`` for ``canal`` between ``start`` and ``end``.
+
+        Each Series holds at most ``max_points`` bucket means, indexed by bucket start time.
+        """
+        chosen, window = None, None
+        for level in LEVELS:
+            means = self._canal_means(level, canal).loc[start:end]
+            if len(means) or chosen is None:
+                chosen, window = level, means
+            if len(means) <= max_points * OVERSAMPLE:
+                break
+        series = {}
+        for metric in self.metrics:
+            values = window[metric].dropna()
+            if len(values) > max_points:
+                values = values.iloc[lttb(values.index.asi8, values.to_numpy(), max_points)]
+            series[metric] = values
+        return chosen, series
+
+    def to_table(self):
+        """Every rollup as one flat table (level, canal, time, sum:metric, count:metric), for caching."""
+        frames = []
+        with self._lock:
+            rollups = [(level, self._sums[level], self._counts[level]) for level in LEVELS]
+        for level, sums, counts in rollups:
+            if sums is None:
+                continue
+            frame = sums.index.to_frame(index=False)
+            frame.insert(0, 'level', level)
+            for metric in self.metrics:
+                frame[f"sum:{metric}"] = sums[metric].to_numpy()
+                frame[f"count:{metric}"] = counts[metric].to_numpy()
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True)
+
+    @classmethod
+    def from_table(cls, table, metrics):
+        store = cls(metrics)
+        levels = np.asarray(table['level']).astype(object)
+        for level in LEVELS:
+            rows = np.flatnonzero(levels == level)
+            if not len(rows):
+                continue
+            index = pd.MultiIndex.from_arrays([np.asarray(table[CANAL])[rows].astype(object),
+                                               pd.DatetimeIndex(np.asarray(table['time'])[rows])], names=[CANAL, 'time'])
+            store._sums[level] = pd.DataFrame({metric: np.asarray(table[f"sum:{metric}"])[rows] for metric in store.metrics}, index=index)
+            store._counts[level] = pd.DataFrame({metric: np.asarray(table[f"count:{metric}"])[rows] for metric in store.metrics}, index=index)
+        return store
@@ -0,0 +1,104 @@
+import numpy as np
+
+# Samples scored per pass; keeps the (rows x trees) working arrays cache-sized.
+CHUNK_ROWS = 4096
+
+
+class CompiledEnsemble:
+    """A fitted GradientBoostingRegressor and its StandardScaler compiled into NumPy lookup tables.
+
+    The trees are first flattened into one contiguous node table (feature, threshold, left,
+    right, value). From that, each feature gets a sorted list of split thresholds and, per tree,
+    a bitmask of the leaves still reachable once a sample exceeds those thresholds. Scoring is
+    then one ``searchsorted`` and one table gather per feature, an AND across features, and a
+    lowest-set-bit lookup to find each tree's leaf, with no per-node Python work.
+    """
+
+    def __init__(self, model, scaler):
+        if not hasattr(model, "estimators_") or model.estimators_.shape[1] != 1:
+            raise TypeError(f"Cannot compile {type(model).__name__}: expected a fitted single-output gradient boosting regressor")
+
+        trees = [estimator.tree_ for estimator in model.estimators_[:, 0]]
+        self.n_trees = len(trees)
+        self.n_features = model.n_features_in_
+        self.max_leaves = max(tree.n_leaves for tree in trees)
+        if self.max_leaves > 64:
+            raise ValueError(f"Cannot compile trees with {self.max_leaves} leaves (at most 64 supported)")
+
+        sizes = np.array([tree.node_count for tree in trees])
+        self.roots = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        self.feature = np.concatenate([tree.feature for tree in trees])
+        self.threshold = np.concatenate([tree.threshold for tree in trees])
+        self.left = np.concatenate([np.where(tree.children_left == -1, -1, tree.children_left + offset) for offset, tree in zip(self.roots, trees)])
+        self.right = np.concatenate([np.where(tree.children_right == -1, -1, tree.children_right + offset) for offset, tree in zip(self.roots, trees)])
+        self.value = np.concatenate([tree.value[:, 0, 0] for tree in trees]) * model.learning_rate
+
+        self.base = 0.0 if model.init_ == "zero" else float(model.init_.predict(np.zeros((1, self.n_features)))[0])
+        self.mean = scaler.mean_ if scaler.with_mean else np.zeros(self.n_features)
+        self.scale = scaler.scale_ if scaler.with_std else np.ones(self.n_features)
+
+        self._build_tables()
+
+    def _build_tables(self):
+        self.mask_dtype = np.uint16 if self.max_leaves <= 16 else np.uint64
+        all_leaves = int(np.iinfo(self.mask_dtype).max)
+
+        # Leaves are numbered left to right within each tree; a split that fails (x > threshold)
+        # clears the bits of every leaf under its left child.
+        self.leaf_values = np.zeros((self.n_trees, self.max_leaves))
+        splits = [[] for _ in range(self.n_features)]
+        for tree, root in enumerate(self.roots):
+            leaves = []
+
+            def visit(node):
+                if self.left[node] == -1:
+                    leaves.append(node)
+                    return 1 << (len(leaves) - 1)
+                left_bits = visit(self.left[node])
+                right_bits = visit(self.right[node])
+                splits[self.feature[node]].append((self.threshold[node], tree, all_leaves & ~left_bits))
+                return left_bits | right_bits
+
+            visit(root)
+            self.leaf_values[tree, :len(leaves)] = self.value[leaves]
+
+        # masks[f][k] is the AND of the masks of the k smallest thresholds on feature f.
+        self.split_thresholds, self.masks = [], []
+        for feature_splits in splits:
+            feature_splits.sort(key=lambda split: split[0])
+            masks = np.full((len(feature_splits) + 1, self.n_trees), all_leaves, dtype=self.mask_dtype)
+            for k, (_, tree, mask) in enumerate(feature_splits, start=1):
+                masks[k] = masks[k - 1]
+                masks[k, tree] &= mask
+            self.split_thresholds.append(np.array([split[0] for split in feature_splits]))
+            self.masks.append(masks)
+
+        if self.mask_dtype == np.uint16:
+            bits = np.arange(1, 1 << 16)
+            self.lowest_bit = np.zeros(1 << 16, dtype=np.intp)
+            self.lowest_bit[1:] = np.log2(bits & -bits).astype(np.intp)
+        self.leaf_offsets = np.arange(self.n_trees) * self.max_leaves
+
+    def _first_leaf(self, bits):
+        if self.mask_dtype == np.uint16:
+            return self.lowest_bit[bits]
+        return np.log2(bits & (~bits + np.uint64(1))).astype(np.intp)
+
+    def predict(self, values):
+        """Equivalent of ``model.predict(scaler.transform(values))``."""
+        # sklearn compares float32 features against float64 thresholds; round the same way.
+        scaled = ((np.asarray(values, dtype=float) - self.mean) / self.scale).astype(np.float32).astype(float)
+        leaf_values = self.leaf_values.ravel()
+        out = np.empty(len(scaled))
+        for start in range(0, len(scaled), CHUNK_ROWS):
+            chunk = scaled[start:start + CHUNK_ROWS]
+            bits = None
+            for feature in range(self.n_features):
+                failed = np.searchsorted(self.split_thresholds[feature], chunk[:, feature], side="left")
+                bits = self.masks[feature][failed] if bits is None else bits & self.masks[feature][failed]
+            leaves = self._first_leaf(bits) + self.leaf_offsets
+            out[start:start + CHUNK_ROWS] = self.base + leaf_values[leaves].sum(axis=1)
+        return out
+
+    def predict_wqi(self, values):
+        return np.exp(self.predict(values))
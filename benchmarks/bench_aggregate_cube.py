@@ -0,0 +1,98 @@
+"""Dashboard data-access latency: boolean masks + groupby over the raw table vs AggregateCube lookups.
+
+The dataset is resampled to 1M rows. Run from the repository root:
+    python benchmarks/bench_aggregate_cube.py [rows]
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+warnings.filterwarnings("ignore")
+
+import app  # noqa: E402
+from cube import AggregateCube  # noqa: E402
+from datastore import WATER_CSV, metric_columns, water_table  # noqa: E402
+from scoring import WQI, scored_table  # noqa: E402
+from timeseries import TimeSeriesStore  # noqa: E402
+
+CANAL, YEAR, POINT = 'Canal_name (EN)', 'year', 'Sample_water_point (EN)'
+COLUMNS = metric_columns + [WQI]
+
+
+def scaled_table(rows, seed=0):
+    # Scored like load_data's table, so the cube carries the WQI column the gauges read.
+    return scored_table(water_table(), WATER_CSV).sample(rows, replace=True, random_state=seed).reset_index(drop=True)
+
+
+def time_calls(fn, args, repeat=3):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for arg in args:
+            fn(*arg)
+    return (time.perf_counter() - start) / (repeat * len(args)) * 1e3
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    df = scaled_table(rows)
+
+    start = time.perf_counter()
+    aggregated_df = df.groupby([CANAL, YEAR], observed=True)[COLUMNS].mean().reset_index()
+    groupby_ms = (time.perf_counter() - start) * 1e3
+    start = time.perf_counter()
+    cube = AggregateCube(df, COLUMNS)
+    cube_ms = (time.perf_counter() - start) * 1e3
+    print(f"{rows:,} rows: canal/year groupby {groupby_ms:.0f} ms, cube build {cube_ms:.0f} ms")
+
+    keys = aggregated_df[[CANAL, YEAR]].drop_duplicates().head(50).itertuples(index=False)
+    keys = [(canal, year) for canal, year in keys]
+    canals = [(canal,) for canal in dict.fromkeys(canal for canal, _ in keys)]
+
+    def bar_before(canal):
+        return df[df[CANAL] == canal].groupby(POINT, observed=True)['DO (mg/l)'].mean().reset_index()
+
+    def bar_after(canal):
+        return cube.by_sample_point(canal)[['DO (mg/l)']].reset_index()
+
+    def gauge_before(canal, year):
+        filtered = aggregated_df[(aggregated_df[YEAR] == year) & (aggregated_df[CANAL] == canal)]
+        return None if filtered.empty else filtered.iloc[0]
+
+    def gauge_after(canal, year):
+        return cube.get(canal, year)
+
+    def trend_before(canal):
+        return aggregated_df[aggregated_df[CANAL] == canal].copy()
+
+    def trend_after(canal):
+        return cube.by_year(canal).reset_index()
+
+    print(f"{'data access':<22} {'before ms':>10} {'after ms':>10}")
+    for name, before, after, args in [
+        ("update_bar_chart", bar_before, bar_after, canals),
+        ("update_gauge_graph", gauge_before, gauge_after, keys),
+        ("update_cards", gauge_before, gauge_after, keys),
+        ("update_trend_chart", trend_before, trend_after, canals),
+    ]:
+        print(f"{name:<22} {time_calls(before, args):>10.3f} {time_calls(after, args):>10.3f}")
+
+    # Whole callbacks (figure building included) against the scaled cube and trend rollups.
+    series_store = TimeSeriesStore(metric_columns)
+    series_store.update(df)
+    app.df, app.cube, app.series_store = df, cube, series_store
+    print(f"{'full callback':<22} {'ms':>10}")
+    with contextlib.redirect_stdout(io.StringIO()):
+        bar = time_calls(lambda canal: app.update_bar_chart(canal, 'DO (mg/l)'), canals, repeat=1)
+    print(f"{'update_bar_chart':<22} {bar:>10.2f}")
+    print(f"{'update_gauge_graph':<22} {time_calls(lambda c, y: app.update_gauge_graph(y, c), keys[:10], repeat=1):>10.2f}")
+    print(f"{'update_cards':<22} {time_calls(lambda c, y: app.update_cards(y, c), keys):>10.3f}")
+    # The trend callback only routes zoom events; the figure itself is built by trend_figure.
+    print(f"{'update_trend_chart':<22} {time_calls(app.trend_figure, canals[:10], repeat=1):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
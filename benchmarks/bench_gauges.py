@@ -0,0 +1,109 @@
+"""Payload and server time of the dashboard gauge grid, per canal/year change and per tab load.
+
+Requests go through the Flask test client exactly as the browser sends them, so the sizes are
+the serialized response bodies. For comparison, ``before`` rebuilds and serializes the whole
+13-gauge figure for every change, which is what update_gauge_graph returned before it sent a
+Patch. It is timed in-process, so it leaves out the request overhead that ``after`` includes. Run from the repository root: python benchmarks/bench_gauges.py
+"""
+import os
+import statistics
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+warnings.filterwarnings("ignore")
+
+import app  # noqa: E402
+import plotly.graph_objects as go  # noqa: E402
+from plotly.io.json import to_json_plotly  # noqa: E402
+from plotly.subplots import make_subplots  # noqa: E402
+
+
+def dependency(client, output_prefix, first_input):
+    for dep in client.get("/_dash-dependencies").get_json():
+        if dep["output"].startswith(output_prefix) and dep["inputs"][0]["id"] == first_input:
+            return dep
+
+
+def post(client, dep, values):
+    output_id, output_prop = dep["output"].split(".", 1)
+    body = {"output": dep["output"], "outputs": {"id": output_id, "property": output_prop},
+            "inputs": [dict(item, value=value) for item, value in zip(dep["inputs"], values)],
+            "changedPropIds": [f"{item['id']}.{item['property']}" for item in dep["inputs"]], "state": []}
+    start = time.perf_counter()
+    response = client.post("/_dash-update-component", json=body)
+    elapsed = time.perf_counter() - start
+    assert response.status_code == 200, response.status_code
+    return len(response.data), elapsed * 1e3
+
+
+def rebuilt_figure(selected_year, selected_canal):
+    """The whole gauge grid with values, built from scratch the way the callback used to."""
+    metrics = app.cube.get(selected_canal, selected_year)
+    if metrics is None:
+        return go.Figure()
+    fig = make_subplots(rows=3, cols=5, specs=[[{'type': 'indicator'}]*5]*3)
+    for i, (name, column) in enumerate(app.gauge_metrics.items()):
+        limit1, limit2 = app.gauge_thresholds[name]
+        low, mid, high = app.gauge_step_colors.get(name, ["#00C49F", "#FFD700", "#FF6B6B"])
+        fig.add_trace(go.Indicator(
+            mode="gauge+number",
+            value=metrics[column],
+            title={'text': name},
+            gauge={
+                'axis': {'range': [0, app.gauge_max_ranges[name]], 'tickwidth': 1, 'tickcolor': "#7f8c8d"},
+                'bar': {'color': "#2c3e50"},
+                'steps': [
+                    {'range': [0, limit1], 'color': low},
+                    {'range': [limit1, limit2], 'color': mid},
+                    {'range': [limit2, app.gauge_max_ranges[name]], 'color': high}
+                ],
+                'threshold': {'line': {'color': "blue", 'width': 4}, 'thickness': 0.75, 'value': limit2}
+            }
+        ), row=i // 5 + 1, col=i % 5 + 1)
+    fig.update_layout(
+        template='plotly_white',
+        font=dict(family="Inter, sans-serif", size=14, color="#333"),
+        title_text=f"Water Quality Metrics – {selected_canal} ({selected_year})",
+        title_x=0.5,
+        height=900,
+        margin=dict(t=60, b=40, l=40, r=40)
+    )
+    return fig
+
+
+def rebuild(selected_year, selected_canal):
+    start = time.perf_counter()
+    size = len(to_json_plotly({"response": {"gauge-graph": {"figure": rebuilt_figure(selected_year, selected_canal)}}}).encode())
+    return size, (time.perf_counter() - start) * 1e3
+
+
+def summary(label, sizes, times):
+    print(f"{label:<14} {len(sizes):>8} {statistics.mean(sizes) / 1024:>8.2f} {statistics.median(times):>10.2f} {max(times):>8.2f}")
+
+
+def main():
+    client = app.create_app().server.test_client()
+    client.get("/")
+    app.load_data()
+    years = [int(option['value']) for option in app.year_options]
+    canals = [option['value'] for option in app.canal_options]
+
+    tab = dependency(client, "tabs-content.", "tabs")
+    tab_bytes, tab_ms = post(client, tab, ["tab-main-graph"])
+    print(f"gauge tab load: {tab_bytes / 1024:.1f} KB in {tab_ms:.1f} ms")
+
+    gauges = dependency(client, "gauge-graph.figure", "year-dropdown")
+    post(client, gauges, [years[0], canals[0]])
+    rebuild(years[0], canals[0])
+    pairs = [(year, canal) for canal in canals for year in years]
+    before = [rebuild(year, canal) for year, canal in pairs]
+    after = [post(client, gauges, [year, canal]) for year, canal in pairs]
+    print(f"{'gauge update':<14} {'changes':>8} {'KB':>8} {'median ms':>10} {'max ms':>8}")
+    summary("before", *zip(*before))
+    summary("after", *zip(*after))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Bytes on the wire for a typical dashboard session, with and without compression and revalidation.
+
+One user opens the app (index page, component bundles, layout, dependencies) and then makes
+``--passes`` passes through the dashboard. Each pass is the one bench_serving.py simulates:
+layout, tabs, gauges, cards, bar chart, trend chart and a map pan, with the canal and year drawn
+from ``--canals`` canals, so later passes revisit earlier selections. The same requests are sent
+twice through the Flask test client:
+
+- ``plain``: no Accept-Encoding and no If-None-Match, i.e. what was sent before app/httpcache.py.
+- ``http cache``: gzip, plus If-None-Match with the ETag last seen for the same request, which is
+  what the browser cache (GETs) and assets/revalidate.js (callback POSTs) send.
+
+Component bundles are fingerprinted and cached by the browser for a year, so both clients fetch
+them on the first visit only. Sizes are response bodies, without headers.
+
+Run from the repository root: python benchmarks/bench_http_payloads.py [--passes 10] [--canals 3]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+warnings.filterwarnings("ignore")
+
+import app  # noqa: E402
+from bench_serving import session_requests  # noqa: E402
+
+
+class Client:
+    def __init__(self, client, http_cache):
+        self.client = client
+        self.http_cache = http_cache
+        self.etags = {}
+        self.requests = self.bytes = self.not_modified = 0
+
+    def send(self, method, path, body=None):
+        headers = {"Content-Type": "application/json"} if body else {}
+        key = (method, path, body)
+        if self.http_cache:
+            headers["Accept-Encoding"] = "gzip"
+            if key in self.etags:
+                headers["If-None-Match"] = self.etags[key]
+        response = self.client.open(path, method=method, data=body, headers=headers)
+        if response.headers.get("ETag"):
+            self.etags[key] = response.headers["ETag"]
+        self.requests += 1
+        self.bytes += len(response.get_data())
+        self.not_modified += response.status_code == 304
+        return response
+
+
+def run(http_cache, passes, canals, years, deps, bundles):
+    client = Client(app.app.server.test_client(), http_cache)
+    rng = random.Random(0)
+    rows = []
+    for i in range(passes + 1):
+        before = (client.requests, client.bytes, client.not_modified)
+        if i == 0:
+            for path in bundles:
+                client.send("GET", path)
+        for method, path, body in session_requests(deps, canals, years, rng):
+            client.send(method, path, body)
+        rows.append((client.requests - before[0], client.bytes - before[1], client.not_modified - before[2]))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--passes", type=int, default=10)
+    parser.add_argument("--canals", type=int, default=3)
+    args = parser.parse_args()
+
+    app.load_data()
+    client = app.app.server.test_client()
+    deps = {dep["output"].split("@")[0]: dep for dep in client.get("/_dash-dependencies").get_json()}
+    bundles = re.findall(r'src="([^"]+)"', client.get("/").get_data(as_text=True))
+    canals = [option["value"] for option in app.canal_options[1:args.canals + 1]]
+    years = sorted(int(option["value"]) for option in app.year_options[1:])[-3:]
+
+    plain = run(False, args.passes, canals, years, deps, bundles)
+    cached = run(True, args.passes, canals, years, deps, bundles)
+    print(f"{'':<14} {'requests':>8} {'plain KB':>10} {'http cache KB':>14} {'304s':>6} {'saved':>7}")
+    labels = ["first visit"] + [f"pass {i}" for i in range(1, args.passes + 1)]
+    for label, (requests, plain_bytes, _), (_, cached_bytes, not_modified) in zip(labels, plain, cached):
+        print(f"{label:<14} {requests:>8} {plain_bytes / 1024:>10.1f} {cached_bytes / 1024:>14.1f} {not_modified:>6} "
+              f"{1 - cached_bytes / plain_bytes:>7.0%}")
+    total_plain = sum(row[1] for row in plain)
+    total_cached = sum(row[1] for row in cached)
+    print(f"{'session':<14} {sum(row[0] for row in plain):>8} {total_plain / 1024:>10.1f} {total_cached / 1024:>14.1f} "
+          f"{sum(row[2] for row in cached):>6} {1 - total_cached / total_plain:>7.0%}")
+    print(json.dumps(app.httpcache.stats()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Map callback payload and build time: one dl.Marker component per row vs a single GeoJSON collection.
+
+Client-side render time needs a browser and is not measured here. Run from the repository root:
+    python benchmarks/bench_map_layer.py [rows]
+"""
+import os
+import sys
+import time
+import warnings
+
+import dash_leaflet as dl
+import numpy as np
+from dash import html
+from plotly.io.json import to_json_plotly
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+warnings.filterwarnings("ignore")
+
+import map as map_page  # noqa: E402
+
+PARAMETER = '  pH'
+
+
+def selected_rows(selected_canal, selected_year):
+    df = map_page.points.df
+    mask = np.ones(len(df), dtype=bool)
+    if selected_canal != 'all':
+        mask &= (df['Canal_name (EN)'] == selected_canal).to_numpy()
+    if selected_year != 'all':
+        mask &= df['year'].to_numpy() == int(selected_year)
+    return np.flatnonzero(mask)
+
+
+def marker_components(rows):
+    # The layer update_map_markers returned before the GeoJSON rewrite.
+    df = map_page.points.df.iloc[rows]
+    codes = map_page.classify_safety(df[PARAMETER], PARAMETER)
+    return [
+        dl.Marker(
+            position=[lat, lon],
+            icon={"iconUrl": pin, "iconSize": [32, 32], "iconAnchor": [16, 32], "popupAnchor": [0, -32]},
+            children=[dl.Tooltip(html.Div([
+                html.Div(f"Canal: {canal}"),
+                html.Div(f"Sampling Point: {point}"),
+                html.Div(f"{PARAMETER}: {value} ({status})")
+            ]))]
+        )
+        for lat, lon, canal, point, value, status, pin in zip(
+            df["Latitude"].tolist(), df["Longitude"].tolist(), df['Canal_name (EN)'].tolist(),
+            df['Sample_water_point (EN)'].tolist(), df[PARAMETER].tolist(),
+            map_page.safety_status_names[codes].tolist(), map_page.pin_images[codes].tolist())
+    ]
+
+
+def measure(fn):
+    start = time.perf_counter()
+    payload = to_json_plotly(fn())
+    return (time.perf_counter() - start) * 1e3, len(payload.encode())
+
+
+def main():
+    map_page.load_data()
+    if len(sys.argv) > 1:
+        df = map_page.points.df.sample(int(sys.argv[1]), replace=True, random_state=0).reset_index(drop=True)
+        map_page.replace_points(map_page.MapPoints.classify(df))
+
+    canal = map_page.points.df['Canal_name (EN)'].iloc[0]
+    print(f"{'selection':<40} {'markers ms':>11} {'markers KB':>11} {'geojson ms':>11} {'geojson KB':>11}")
+    for selected_canal, selected_year in [('all', 'all'), ('all', '2019'), (canal, 'all')]:
+        rows = selected_rows(selected_canal, selected_year)
+        before_ms, before_bytes = measure(lambda: marker_components(rows))
+        after_ms, after_bytes = measure(lambda: map_page.point_geojson(map_page.points, rows))
+        label = f"{selected_canal[:28]} / {selected_year}"
+        print(f"{label:<40} {before_ms:>11.1f} {before_bytes / 1024:>11.1f} {after_ms:>11.1f} {after_bytes / 1024:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
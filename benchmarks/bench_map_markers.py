@@ -0,0 +1,62 @@
+"""update_map_markers with per-row iterrows + get_safety_status vs vectorized classification.
+
+The map table is resampled to 100k sampling points. Run from the repository root:
+    python benchmarks/bench_map_markers.py [rows]
+"""
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+warnings.filterwarnings("ignore")
+
+import map as map_page  # noqa: E402
+
+PARAMETER = '  pH'
+
+
+def row_status(value, parameter):
+    # The classifier update_map_markers used to call once per row.
+    if pd.isna(value) or not isinstance(value, (int, float)):
+        return 'unknown', '#808080'
+    thresholds = map_page.safety_thresholds[parameter]
+    safe_min, safe_max = thresholds['safe']
+    moderate_min, moderate_max = thresholds['moderate']
+    if safe_min <= value <= safe_max:
+        return 'safe', '#00FF00'
+    if moderate_min <= value <= moderate_max:
+        return 'moderate', '#FFFF00'
+    return 'unsafe', '#FF0000'
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1e3
+
+
+def main():
+    map_page.load_data()
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    df = map_page.points.df.sample(rows, replace=True, random_state=0).reset_index(drop=True)
+
+    before, before_ms = timed(lambda: [row_status(row[PARAMETER], PARAMETER)[0] for _, row in df.iterrows()])
+    codes, after_ms = timed(map_page.classify_safety, df[PARAMETER], PARAMETER)
+    assert before == map_page.safety_status_names[codes].tolist()
+    print(f"classify {rows:,} rows: iterrows {before_ms:.0f} ms, vectorized {after_ms:.2f} ms")
+
+    start = time.perf_counter()
+    safety_codes = {param: map_page.classify_safety(df[param], param) for param in map_page.safety_thresholds}
+    print(f"precompute status columns for {len(safety_codes)} parameters: {(time.perf_counter() - start) * 1e3:.0f} ms")
+    map_page.replace_points(map_page.MapPoints(df, safety_codes))
+
+    geojson, layer_ms = timed(map_page.point_geojson, map_page.points, np.arange(len(df)))
+    print(f"marker layer for all {len(geojson['features']):,} points: {layer_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
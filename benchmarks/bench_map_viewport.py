@@ -0,0 +1,74 @@
+"""Viewport-aware map callback latency and payload as the station count grows.
+
+The append column is the mean time to add one batch of ingested readings to the built index
+(tail appends plus any rebuild they trigger). Stations are synthesized by resampling canalwater1.csv and scattering them over greater Bangkok.
+Run from the repository root: python benchmarks/bench_map_viewport.py
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+from plotly.io.json import to_json_plotly
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+warnings.filterwarnings("ignore")
+
+import map as map_page  # noqa: E402
+
+STATION_COUNTS = [1_000, 10_000, 100_000, 1_000_000]
+ZOOMS = [10, 12, 14, 16]
+CENTER = (13.7563, 100.5018)
+APPEND_BATCHES, APPEND_ROWS = 50, 20
+# Viewport size in pixels for the map div.
+WIDTH, HEIGHT = 1200, 600
+
+
+def synthetic_stations(n, seed=0):
+    rng = np.random.default_rng(seed)
+    df = map_page.points.df.sample(n, replace=True, random_state=seed).reset_index(drop=True)
+    df['Latitude'] = rng.uniform(13.5, 14.0, n)
+    df['Longitude'] = rng.uniform(100.3, 100.9, n)
+    return df
+
+
+def viewport(zoom):
+    degrees_per_px = 360 / (256 * 2 ** zoom)
+    half_w, half_h = WIDTH / 2 * degrees_per_px, HEIGHT / 2 * degrees_per_px
+    return [[CENTER[0] - half_h, CENTER[1] - half_w], [CENTER[0] + half_h, CENTER[1] + half_w]]
+
+
+def main():
+    map_page.load_data()
+    print(f"{'stations':>10} {'build ms':>9} " + " ".join(f"{f'z{z} ms':>8} {f'z{z} KB':>8} {f'z{z} pts':>8}" for z in ZOOMS) + f" {'append ms':>10}")
+    for n in STATION_COUNTS:
+        df = synthetic_stations(n)
+        start = time.perf_counter()
+        map_page.replace_points(map_page.MapPoints.classify(df))
+        build_ms = (time.perf_counter() - start) * 1e3
+
+        cells = []
+        for zoom in ZOOMS:
+            map_page.viewport_geojson.cache_clear()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                points, _, aggregates = map_page.update_map_markers('all', 'all', viewport(zoom), zoom, None)
+            payload = len(to_json_plotly([points, aggregates]).encode())
+            elapsed = (time.perf_counter() - start) * 1e3
+            shown = len(points['features']) + len(aggregates['features'])
+            cells.append(f"{elapsed:>8.1f} {payload / 1024:>8.1f} {shown:>8}")
+
+        batches = synthetic_stations(APPEND_BATCHES * APPEND_ROWS, seed=1)
+        current = map_page.points
+        start = time.perf_counter()
+        for offset in range(0, len(batches), APPEND_ROWS):
+            current = current.appended(batches.iloc[offset:offset + APPEND_ROWS])
+        append_ms = (time.perf_counter() - start) * 1e3 / APPEND_BATCHES
+        print(f"{n:>10,} {build_ms:>9.0f} " + " ".join(cells) + f" {append_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
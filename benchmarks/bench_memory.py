@@ -0,0 +1,60 @@
+"""Per-worker memory once both pages have loaded their data, and table size by column types.
+
+The worker figure comes from a fresh process that imports the app and loads the dashboard and
+map data, as a gunicorn worker would by its first requests. RssFile is memory-mapped cache
+and library pages that workers share; RssAnon is private to each worker.
+
+Run from the repository root: python benchmarks/bench_memory.py
+"""
+import os
+import subprocess
+import sys
+import warnings
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+warnings.filterwarnings("ignore")
+
+import datastore  # noqa: E402
+
+WORKER_SCRIPT = """
+import sys, warnings
+warnings.filterwarnings("ignore")
+sys.path.insert(0, "app")
+import app, map
+app.load_data()
+map.load_data()
+status = dict(line.split(":", 1) for line in open("/proc/self/status"))
+print(" ".join(status[field].split()[0] for field in ("VmRSS", "RssAnon", "RssFile")))
+"""
+SCALES = [1, 100, 1000]
+
+
+def worker_rss():
+    result = subprocess.run([sys.executable, "-c", WORKER_SCRIPT], capture_output=True, text=True, check=True)
+    return [int(kb) / 1024 for kb in result.stdout.split()[-3:]]
+
+
+def table_bytes(df):
+    return df.memory_usage(deep=True).sum()
+
+
+def main():
+    rss, anon, file_backed = worker_rss()
+    print(f"worker after loading both pages: RSS {rss:.1f} MB (private {anon:.1f} MB, shared/file {file_backed:.1f} MB)")
+
+    print(f"\n{'table':<16} {'rows':>10} {'as parsed MB':>13} {'compact MB':>11} {'ratio':>6}")
+    for csv_path, clean in [(datastore.WATER_CSV, datastore.clean_water), (datastore.CANAL_MAP_CSV, datastore.clean_canal_map)]:
+        parsed = clean(pd.read_csv(csv_path))
+        for scale in SCALES:
+            rows = parsed.sample(len(parsed) * scale, replace=True, random_state=0) if scale > 1 else parsed
+            compact = datastore.compact(rows)
+            compact = compact.astype({name: "category" for name in compact.columns if compact[name].dtype == object})
+            before, after = table_bytes(rows), table_bytes(compact)
+            name = os.path.basename(csv_path)
+            print(f"{name:<16} {len(rows):>10,} {before / 1e6:>13.2f} {after / 1e6:>11.2f} {before / after:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
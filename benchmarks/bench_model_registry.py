@@ -0,0 +1,95 @@
+"""Model load time and memory, and request latency while a new model version is swapped in.
+
+The swap test copies the weight model to a temporary directory, keeps client threads
+predicting against it, and replaces the file halfway through, the way a deploy would.
+
+Run from the repository root: python benchmarks/bench_model_registry.py
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+warnings.filterwarnings("ignore")
+
+import registry  # noqa: E402
+from inference import MODEL_SPECS  # noqa: E402
+
+CLIENTS = 8
+DURATION_SECONDS = 4.0
+
+
+def load_report():
+    print(f"{'model':<8} {'features':>8} {'load ms':>8} {'memory KB':>10}")
+    for name, spec in MODEL_SPECS.items():
+        bundle = registry.load_bundle(name, spec)
+        print(f"{name:<8} {len(bundle.features):>8} {bundle.load_seconds * 1e3:>8.1f} {bundle.memory_bytes / 1024:>10.0f}")
+
+
+def swap_under_load():
+    workdir = tempfile.mkdtemp()
+    spec = dict(MODEL_SPECS["weight"])
+    for part in ("model", "scaler"):
+        spec[part] = shutil.copy(spec[part], workdir)
+    models = registry.ModelRegistry({"weight": spec})
+    first = models.get("weight")
+
+    rows = first.scaler.mean_[None, :]
+    latencies, versions, errors = [], set(), []
+    stop = threading.Event()
+
+    def client():
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                bundle = models.get("weight")
+                bundle.predict_wqi(rows)
+                versions.add(bundle.version)
+            except Exception as e:
+                errors.append(e)
+            latencies.append((start, time.perf_counter() - start))
+
+    threads = [threading.Thread(target=client) for _ in range(CLIENTS)]
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION_SECONDS / 2)
+
+    # Deploy: write the new file next to the old one and rename it into place.
+    swap_at = time.perf_counter()
+    staged = spec["model"] + ".new"
+    shutil.copy(MODEL_SPECS["weight"]["model"], staged)
+    os.replace(staged, spec["model"])
+    while models.get("weight").version == first.version:
+        time.sleep(0.001)
+    swapped_in = time.perf_counter() - swap_at
+
+    time.sleep(DURATION_SECONDS / 2)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    shutil.rmtree(workdir)
+
+    # Includes up to CHECK_SECONDS for the registry to notice the new file.
+    window = [duration for start, duration in latencies if swap_at <= start <= swap_at + swapped_in]
+    steady = [duration for start, duration in latencies if start < swap_at]
+    print(f"\nswap under {CLIENTS} clients: new version serving after {swapped_in * 1e3:.0f} ms, "
+          f"{len(versions)} versions seen, {len(errors)} errors")
+    for label, sample in [("before swap", steady), ("during swap", window)]:
+        sample = np.array(sample) * 1e3
+        print(f"  {label:<12} {len(sample):>7} requests  p50 {np.percentile(sample, 50):.2f} ms  "
+              f"p99 {np.percentile(sample, 99):.2f} ms  max {sample.max():.2f} ms")
+
+
+def main():
+    load_report()
+    swap_under_load()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Throughput and p50/p99 latency of single-row predictions under concurrent clients.
+
+Compares calling predict_wqi inline in each request thread with the micro-batched
+prediction service, scored in the batcher thread and on a thread pool.
+
+Run from the repository root: python benchmarks/bench_predict_load.py
+"""
+import os
+import sys
+import threading
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+warnings.filterwarnings("ignore")
+
+from inference import feature_info, selected_feature_keys, predict_wqi  # noqa: E402
+from predict_service import PredictionService  # noqa: E402
+
+CLIENTS = [1, 16, 128]
+# Each run lasts this long; clients send back-to-back requests, one row each.
+DURATION_SECONDS = 3.0
+# The default collects only what queues up while the previous batch is scored; the wider
+# window trades single-client latency for larger batches.
+WIDE_WINDOW_MS = 2
+POOL_WORKERS = max(2, min(4, os.cpu_count() or 1))
+
+
+def sample_rows(n=1000, seed=0):
+    source = pd.read_csv("data/water.csv")
+    columns = [feature_info[key][0] for key in selected_feature_keys]
+    rows = source[columns].dropna().sample(n, replace=True, random_state=seed).to_numpy(dtype=float)
+    rows[:, selected_feature_keys.index("coliform")] = rows[:, selected_feature_keys.index("coliform")].clip(max=1e6)
+    return rows
+
+
+def run_load(predict, rows, clients):
+    latencies = [[] for _ in range(clients)]
+    start_gate = threading.Barrier(clients + 1)
+    stop_at = [0.0]
+
+    def client(i):
+        own = latencies[i]
+        row_index = i
+        start_gate.wait()
+        while time.perf_counter() < stop_at[0]:
+            t0 = time.perf_counter()
+            predict(rows[row_index % len(rows)])
+            own.append(time.perf_counter() - t0)
+            row_index += clients
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    stop_at[0] = time.perf_counter() + DURATION_SECONDS
+    start_gate.wait()
+    for thread in threads:
+        thread.join()
+
+    done = np.concatenate([np.array(own) for own in latencies])
+    return len(done) / DURATION_SECONDS, np.percentile(done, 50) * 1000, np.percentile(done, 99) * 1000
+
+
+def main():
+    rows = sample_rows()
+    batcher = PredictionService(workers=0, window_ms=0)
+    wide = PredictionService(workers=0, window_ms=WIDE_WINDOW_MS)
+    pool = PredictionService(workers=POOL_WORKERS, window_ms=0)
+    services = [batcher, wide, pool]
+    for service in services:
+        service.start()
+    modes = [
+        ("inline", predict_wqi, None),
+        ("batched", batcher.predict, batcher),
+        (f"batched, {WIDE_WINDOW_MS} ms window", wide.predict, wide),
+        (f"batched, {POOL_WORKERS} threads", pool.predict, pool),
+    ]
+
+    print(f"{'mode':<24} {'clients':>7} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'rows/batch':>10}")
+    for name, predict, service in modes:
+        for clients in CLIENTS:
+            before = service.stats() if service else None
+            throughput, p50, p99 = run_load(predict, rows, clients)
+            per_batch = ""
+            if service:
+                after = service.stats()
+                per_batch = f"{(after['rows'] - before['rows']) / max(after['batches'] - before['batches'], 1):.1f}"
+            print(f"{name:<24} {clients:>7} {throughput:>10,.0f} {p50:>8.2f} {p99:>8.2f} {per_batch:>10}")
+
+    for service in services:
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
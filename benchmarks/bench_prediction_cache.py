@@ -0,0 +1,63 @@
+"""Prediction-page latency and hit rate with the quantized-input prediction cache.
+
+Clicks are drawn from a handful of lab templates with a little float noise on top, the way
+pre-filled forms are re-submitted.
+
+Run from the repository root: python benchmarks/bench_prediction_cache.py
+"""
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+warnings.filterwarnings("ignore")
+
+from app import predict_quality, prediction_result  # noqa: E402
+from inference import feature_info, selected_feature_keys  # noqa: E402
+from predcache import prediction_cache  # noqa: E402
+
+CLICKS = 2000
+TEMPLATES = [10, 100, 1000]
+# Relative noise on every input, well below the cache's 4 significant digits.
+JITTER = 1e-7
+
+
+def clicks(templates, seed=0):
+    source = pd.read_csv("data/water.csv")
+    columns = [feature_info[key][0] for key in selected_feature_keys]
+    rows = source[columns].dropna().sample(templates, replace=True, random_state=seed).to_numpy(dtype=float)
+    rows[:, selected_feature_keys.index("coliform")] = rows[:, selected_feature_keys.index("coliform")].clip(max=1e6)
+    rng = np.random.default_rng(seed)
+    picked = rows[rng.integers(0, templates, CLICKS)]
+    return picked * (1 + rng.uniform(-JITTER, JITTER, picked.shape))
+
+
+def per_click_ms(fn, inputs):
+    start = time.perf_counter()
+    for values in inputs:
+        fn(1, *values)
+    return (time.perf_counter() - start) / len(inputs) * 1e3
+
+
+def uncached(n_clicks, *values):
+    return prediction_result.__wrapped__([float(x) for x in values])
+
+
+def main():
+    print(f"{'templates':>9} {'uncached ms':>12} {'cached ms':>10} {'hit rate':>9}")
+    for templates in TEMPLATES:
+        inputs = clicks(templates)
+        before = per_click_ms(uncached, inputs)
+        prediction_cache.clear()
+        hits, misses = prediction_cache.hits, prediction_cache.misses
+        after = per_click_ms(predict_quality, inputs)
+        hit_rate = (prediction_cache.hits - hits) / (prediction_cache.hits - hits + prediction_cache.misses - misses)
+        print(f"{templates:>9} {before:>12.3f} {after:>10.3f} {hit_rate:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""What-if sweep cost: one batched predict over the whole sweep matrix vs one predict per grid point.
+
+Run from the repository root: python benchmarks/bench_sensitivity.py
+"""
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+warnings.filterwarnings("ignore")
+
+from inference import predict_wqi  # noqa: E402
+from sensitivity import sensitivity, sweep_matrix  # noqa: E402
+
+VALUES = [7.2, 3.1, 6.0, 1.2, 30.0, 40.0, 50000.0]
+PAIRS = [("bod", "do")]
+GRIDS = [11, 21, 41]
+
+
+def main():
+    predict_wqi(np.array(VALUES))
+    print(f"{'grid':>5} {'rows':>7} {'batched ms':>11} {'loop ms':>10} {'speedup':>9}")
+    for points in GRIDS:
+        matrix, _ = sweep_matrix(VALUES, PAIRS, points)
+        start = time.perf_counter()
+        for _ in range(5):
+            batched = sensitivity(VALUES, predict_wqi, PAIRS, points)
+        batched_ms = (time.perf_counter() - start) / 5 * 1e3
+
+        start = time.perf_counter()
+        looped = np.array([predict_wqi(row)[0] for row in matrix])
+        loop_ms = (time.perf_counter() - start) * 1e3
+        assert np.allclose(looped, predict_wqi(matrix)) and np.isclose(looped[0], batched[0])
+        print(f"{points:>5} {len(matrix):>7,} {batched_ms:>11.1f} {loop_ms:>10.0f} {loop_ms / batched_ms:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Throughput and latency of the served app under 100+ concurrent dashboard sessions.
+
+Starts gunicorn from gunicorn.conf.py twice, once with sync workers and once with gthread workers,
+with the same number of worker processes. Each session loads the page and then keeps cycling
+through the dashboard like a user: switch tab, pick a canal and year (gauges and cards), open the
+bar chart and the trend chart, and pan the map. Sessions pause ``--think-ms`` between requests.
+Optional slow clients send their request headers one byte per second, the way a stalled mobile
+connection does, and hold whatever serves them.
+
+Run from the repository root:
+    python benchmarks/bench_serving.py [--sessions 100,200] [--slow-clients 0,4] [--seconds 20]
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+warnings.filterwarnings("ignore")
+
+from datastore import water_table  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+HOST = "127.0.0.1"
+PORT = 8131
+WORKERS = os.cpu_count() or 1
+CONFIGS = {
+    # gunicorn swaps sync for gthread when threads > 1, and the config file sets threads
+    "sync": ["--worker-class", "sync", "--threads", "1"],
+    "gthread": ["--worker-class", "gthread", "--threads", "8"],
+}
+# Greater Bangkok, for random map viewports.
+LAT, LON = (13.6, 13.95), (100.35, 100.75)
+
+
+def start_server(name):
+    with socket.socket() as probe:
+        if probe.connect_ex((HOST, PORT)) == 0:
+            raise RuntimeError(f"port {PORT} is already in use")
+    command = [sys.executable, "-m", "gunicorn", "--bind", f"{HOST}:{PORT}", "--workers", str(WORKERS),
+               "--log-level", "warning"] + CONFIGS[name]
+    # Sessions pick from every canal's figures (about 500), more than the default figure cache
+    # holds; size it to fit so the runs compare serving rather than re-rendering evicted figures.
+    env = dict(os.environ, WPP_FIGURE_CACHE_SIZE=os.environ.get("WPP_FIGURE_CACHE_SIZE", "1024"))
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn ({name}) exited")
+        try:
+            connection = http.client.HTTPConnection(HOST, PORT, timeout=5)
+            connection.request("GET", "/")
+            if connection.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"gunicorn ({name}) did not start")
+
+
+def dependencies():
+    connection = http.client.HTTPConnection(HOST, PORT, timeout=30)
+    connection.request("GET", "/_dash-dependencies")
+    deps = json.loads(connection.getresponse().read())
+    return {dep["output"].split("@")[0]: dep for dep in deps}
+
+
+def callback_body(dep, values):
+    outputs = []
+    for output in dep["output"].strip(".").split("..."):
+        output_id, output_prop = output.split("@")[0].split(".", 1)
+        outputs.append({"id": output_id, "property": output_prop})
+    return json.dumps({
+        "output": dep["output"], "outputs": outputs if len(outputs) > 1 else outputs[0],
+        "inputs": [dict(item, value=value) for item, value in zip(dep["inputs"], values)],
+        "changedPropIds": [f"{dep['inputs'][0]['id']}.{dep['inputs'][0]['property']}"],
+        "state": [dict(item, value=None) for item in dep.get("state", [])],
+    })
+
+
+def session_requests(deps, canals, years, rng):
+    """One pass through the dashboard as (method, path, body) tuples."""
+    canal, year = rng.choice(canals), rng.choice(years)
+    lat, lon = rng.uniform(*LAT), rng.uniform(*LON)
+    bounds = [[lat - 0.05, lon - 0.1], [lat + 0.05, lon + 0.1]]
+    post = "/_dash-update-component"
+    return [
+        ("GET", "/", None),
+        ("GET", "/_dash-layout", None),
+        ("POST", post, callback_body(deps["page-content.children"], ["/"])),
+        ("POST", post, callback_body(deps["tabs-content.children"], ["tab-main-graph"])),
+        ("POST", post, callback_body(deps["gauge-graph.figure"], [year, canal])),
+        ("POST", post, callback_body(deps["..card-ph.children...card-do.children...card-tds.children.."], [year, canal])),
+        ("POST", post, callback_body(deps["canal-bar-graph.figure"], [canal, rng.choice(["DO (mg/l)", "BOD (mg/l)"])])),
+        ("POST", post, callback_body(deps["trend-line-chart.figure"], [canal, None])),
+        ("POST", post, callback_body(deps["..marker-layer.data...marker-layer.hideout...aggregate-layer.data.."],
+                                     ["all", rng.choice(years + ["all"]), bounds, 13])),
+    ]
+
+
+def warm(deps, canals):
+    """Render every canal's bar and trend figures so the timed runs measure serving, not first renders."""
+    connection = http.client.HTTPConnection(HOST, PORT, timeout=60)
+    # Connections land on workers at random, so go round a few times to reach each one
+    for _ in range(WORKERS * 2):
+        for canal in canals:
+            bodies = [callback_body(deps["canal-bar-graph.figure"], [canal, metric]) for metric in ("DO (mg/l)", "BOD (mg/l)")]
+            bodies.append(callback_body(deps["trend-line-chart.figure"], [canal, None]))
+            for body in bodies:
+                connection.request("POST", "/_dash-update-component", body=body, headers={"Content-Type": "application/json"})
+                connection.getresponse().read()
+        connection.close()
+
+
+def slow_client(stop):
+    request = f"GET / HTTP/1.1\r\nHost: {HOST}\r\nX-Padding: {'x' * 4096}\r\n\r\n".encode()
+    while not stop.is_set():
+        try:
+            with socket.create_connection((HOST, PORT), timeout=5) as sock:
+                for byte in request:
+                    if stop.is_set():
+                        return
+                    sock.sendall(bytes([byte]))
+                    time.sleep(1)
+        except OSError:
+            time.sleep(0.1)
+
+
+def run_load(deps, canals, years, sessions, slow_clients, seconds, think):
+    latencies = [[] for _ in range(sessions)]
+    errors = [0] * sessions
+    stop = threading.Event()
+    start_gate = threading.Barrier(sessions + 1)
+
+    def session(i):
+        rng = random.Random(i)
+        own = latencies[i]
+        connection = http.client.HTTPConnection(HOST, PORT, timeout=60)
+        start_gate.wait()
+        time.sleep(rng.uniform(0, think))
+        while not stop.is_set():
+            for method, path, body in session_requests(deps, canals, years, rng):
+                if stop.is_set():
+                    break
+                headers = {"Content-Type": "application/json"} if body else {}
+                t0 = time.perf_counter()
+                try:
+                    connection.request(method, path, body=body, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    if response.status not in (200, 204):
+                        errors[i] += 1
+                except (OSError, http.client.HTTPException):
+                    errors[i] += 1
+                    connection.close()
+                    continue
+                own.append(time.perf_counter() - t0)
+                stop.wait(think)
+        connection.close()
+
+    slow = [threading.Thread(target=slow_client, args=(stop,), daemon=True) for _ in range(slow_clients)]
+    for thread in slow:
+        thread.start()
+    threads = [threading.Thread(target=session, args=(i,), daemon=True) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    start_gate.wait()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=90)
+
+    done = np.concatenate([np.array(own) for own in latencies]) if any(latencies) else np.array([0.0])
+    return len(done) / seconds, np.percentile(done, 50) * 1000, np.percentile(done, 99) * 1000, sum(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", default="100,200")
+    parser.add_argument("--slow-clients", default="0,4")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--think-ms", type=float, default=500)
+    parser.add_argument("--configs", default=",".join(CONFIGS))
+    args = parser.parse_args()
+
+    df = water_table()
+    canals = sorted(str(canal) for canal in df['Canal_name (EN)'].unique() if canal != '#VALUE!')
+    years = sorted(int(year) for year in df['year'].unique())
+    del df
+
+    print(f"{WORKERS} worker process(es), {args.think_ms:.0f} ms think time, {args.seconds:.0f} s per run")
+    print(f"{'workers':<8} {'sessions':>8} {'slow':>5} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>9} {'errors':>7}")
+    for name in args.configs.split(","):
+        server = start_server(name)
+        try:
+            deps = dependencies()
+            warm(deps, canals)
+            for sessions in [int(n) for n in args.sessions.split(",")]:
+                for slow_clients in [int(n) for n in args.slow_clients.split(",")]:
+                    throughput, p50, p99, errors = run_load(deps, canals, years, sessions, slow_clients,
+                                                            args.seconds, args.think_ms / 1000)
+                    print(f"{name:<8} {sessions:>8} {slow_clients:>5} {throughput:>8.1f} {p50:>8.1f} {p99:>9.1f} {errors:>7}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""HTTP requests a scripted user session costs, from the app's callback graph.
+
+Each step of the session is a set of component properties the user changes at once (a click, a
+dropdown pick, a pan). Every callback with one of them as an Input fires, and so does every
+callback fed by those callbacks' outputs. Server callbacks cost one POST to
+/_dash-update-component each, while clientside callbacks run in the browser. The graph comes from
+/_dash-dependencies, so the script runs unchanged against older trees. Initial calls when a page
+renders are not counted.
+
+Run from the repository root: python benchmarks/bench_session_requests.py
+"""
+import os
+import sys
+import warnings
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+warnings.filterwarnings("ignore")
+
+import app  # noqa: E402
+import map as map_page  # noqa: E402
+
+NAVIGATE = [("url", "pathname"), ("nav-url", "pathname")]
+PAN = [("map", "bounds"), ("map", "zoom")]
+
+# (label, steps, times)
+SESSION = [
+    ("open prediction page", NAVIGATE, 1),
+    ("predict", [("predict-button", "n_clicks")], 3),
+    ("reset inputs", [("reset-button", "n_clicks")], 3),
+    ("what-if axes", [("sensitivity-x", "value")], 2),
+    ("open dashboard", NAVIGATE, 1),
+    ("switch tab", [("tabs", "value")], 3),
+    ("bar chart metric", [("bar-metric-dropdown", "value")], 2),
+    ("pick canal", [("canal-dropdown", "value")], 2),
+    ("pick year", [("year-dropdown", "value")], 2),
+    ("map parameter", [("parameter-dropdown", "value")], len(map_page.parameter_options) - 1),
+    ("map pan and zoom", PAN, 5),
+]
+
+
+def parse_outputs(output):
+    output = output.split("@")[0]
+    parts = output.strip(".").split("...") if output.startswith("..") else [output]
+    return [tuple(part.split("@")[0].rsplit(".", 1)) for part in parts]
+
+
+def fired(deps, changed):
+    """Callbacks fired by changing ``changed``, including the ones chained off their outputs."""
+    changed, runs, seen = set(changed), [], set()
+    while True:
+        new = [i for i, dep in enumerate(deps) if i not in seen
+               and any((item["id"], item["property"]) in changed for item in dep["inputs"])]
+        if not new:
+            return runs
+        for i in new:
+            seen.add(i)
+            runs.append(deps[i])
+            changed.update(parse_outputs(deps[i]["output"]))
+
+
+def main():
+    deps = app.app.server.test_client().get("/_dash-dependencies").get_json()
+    totals = Counter()
+    print(f"{'step':<22} {'times':>5} {'requests':>9} {'in browser':>11}")
+    for label, props, times in SESSION:
+        runs = fired(deps, props)
+        server = sum(1 for dep in runs if not dep.get("clientside_function")) * times
+        browser = len(runs) * times - server
+        totals["requests"] += server
+        totals["browser"] += browser
+        print(f"{label:<22} {times:>5} {server:>9} {browser:>11}")
+    print(f"{'session':<22} {'':>5} {totals['requests']:>9} {totals['browser']:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Cold-start cost of the app: import time, time to first response and time to first data.
+
+Starts `python app/app.py` in a fresh process and polls it, so nothing is warm.
+
+Run from the repository root: python benchmarks/bench_startup.py
+"""
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+APP_DIR = os.path.join(os.path.dirname(__file__), "..", "app")
+RUNS = 3
+TOP_IMPORTS = 12
+
+MAP_TAB_REQUEST = {
+    "output": "tabs-content.children",
+    "outputs": {"id": "tabs-content", "property": "children"},
+    "inputs": [{"id": "tabs", "property": "value", "value": "tab-map"}],
+    "changedPropIds": ["tabs.value"],
+    "state": [],
+}
+PREDICT_REQUEST = [{"ph": 7.0, "do": 5.0, "bod": 2.0, "no3": 1.0, "tds": 20.0, "cod": 10.0, "coliform": 100.0}]
+
+
+def import_profile():
+    """(total seconds, [(cumulative seconds, module)]) for the heaviest imports under `import app`."""
+    env = dict(os.environ, PYTHONPATH=APP_DIR)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)", line)
+        if match:
+            rows.append((int(match.group(1)) / 1e6, len(match.group(2)) // 2, match.group(3)))
+    total = next(cumulative for cumulative, _, name in rows if name == "app")
+    top = sorted(((cumulative, name) for cumulative, depth, name in rows if depth == 1), reverse=True)
+    return total, top[:TOP_IMPORTS]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def request(url, payload=None):
+    data = None if payload is None else json.dumps(payload).encode()
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=60) as response:
+        return response.read()
+
+
+def cold_start():
+    """Seconds from process start to the first index response, first map tab and first prediction."""
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, PORT=str(port))
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, os.path.join(APP_DIR, "app.py")], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            try:
+                request(base + "/")
+                break
+            except OSError:
+                if server.poll() is not None:
+                    raise RuntimeError("app exited during startup")
+                time.sleep(0.01)
+        first_response = time.perf_counter() - start
+        request(base + "/_dash-update-component", MAP_TAB_REQUEST)
+        first_map = time.perf_counter() - start
+        request(base + "/api/v1/predict", PREDICT_REQUEST)
+        first_prediction = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+    return first_response, first_map, first_prediction
+
+
+def main():
+    total, top = import_profile()
+    print(f"import app: {total * 1e3:.0f} ms")
+    for cumulative, name in top:
+        print(f"  {cumulative * 1e3:>7.0f} ms  {name}")
+
+    runs = [cold_start() for _ in range(RUNS)]
+    first_response, first_map, first_prediction = (min(column) for column in zip(*runs))
+    print(f"\nseconds from process start, best of {RUNS}:")
+    print(f"  first response  {first_response:.2f}")
+    print(f"  map tab         {first_map:.2f}")
+    print(f"  prediction      {first_prediction:.2f}")
+
+
+if __name__ == "__main__":
+    main()
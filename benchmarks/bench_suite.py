@@ -0,0 +1,324 @@
+"""Benchmark suite over synthetic datasets at 1x, 100x and 10,000x the size of data/water.csv.
+
+For each scale it times CSV load plus cleaning, the column compaction, scoring every row with
+the WQI model, building the aggregate cube (which replaced ``aggregated_df``) and the trend
+rollups, every dashboard callback called directly (caches bypassed), and
+``update_map_markers`` for every canal x year combination. It also
+times model prediction at a range of batch sizes, once per run. Results go to a JSON file
+that ``--compare`` checks against an earlier run to catch regressions.
+
+Every scale runs once per data mode: ``memory`` loads the whole table, ``chunked`` streams the
+CSV through the out-of-core reductions (WPP_DATA_MODE=chunked) and skips the raw table.
+
+Synthetic rows are resampled from the real CSVs with multiplicative noise on the metrics and
+jitter on the coordinates, so canals, sample points and years keep their real distribution.
+They are written once per scale to ``--data-dir`` and reused by later runs.
+
+Run from the repository root:
+    python benchmarks/bench_suite.py [--scales 1,100,10000] [--modes memory,chunked] [--output results.json]
+    python benchmarks/bench_suite.py --compare old.json new.json [--threshold 0.2]
+"""
+import argparse
+import inspect
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+warnings.filterwarnings("ignore")
+
+import app  # noqa: E402
+import inference  # noqa: E402
+import map as map_page  # noqa: E402
+from cube import AggregateCube  # noqa: E402
+from datastore import CANAL_MAP_CSV, WATER_CSV, clean_canal_map, clean_water, compact, metric_columns  # noqa: E402
+from outofcore import PointSummary, read_chunks  # noqa: E402
+from predcache import prediction_cache  # noqa: E402
+from scoring import WQI, with_wqi  # noqa: E402
+from timeseries import TimeSeriesStore  # noqa: E402
+
+SCALES = [1, 100, 10000]
+BATCH_SIZES = [1, 10, 100, 1000, 10000, 100000]
+CHUNK_ROWS = 500_000
+SEED = 0
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def synthetic_csv(source, scale, data_dir, jitter_coordinates=False):
+    """Path of a CSV with ``scale`` times the rows of ``source``, written on first use."""
+    stem = os.path.splitext(os.path.basename(source))[0]
+    path = os.path.join(data_dir, f"{stem}-x{scale}-seed{SEED}.csv")
+    if os.path.exists(path):
+        return path
+    base = pd.read_csv(source)
+    rng = np.random.default_rng(SEED)
+    metrics = [column for column in metric_columns if column in base.columns]
+    total = len(base) * scale
+    tmp = path + ".tmp"
+    for start in range(0, total, CHUNK_ROWS):
+        rows = min(CHUNK_ROWS, total - start)
+        chunk = base.iloc[rng.integers(0, len(base), rows)].reset_index(drop=True)
+        if scale > 1:
+            noisy = chunk[metrics].apply(pd.to_numeric, errors="coerce") * rng.lognormal(0, 0.1, (rows, len(metrics)))
+            # Three significant digits, like the source, keeps the CSV about as large per row
+            chunk[metrics] = noisy.apply(lambda column: column.map("{:.3g}".format))
+            if jitter_coordinates:
+                for column in ("Latitude", "Longitude"):
+                    chunk[column] = (pd.to_numeric(chunk[column], errors="coerce") + rng.normal(0, 0.002, rows)).round(6)
+        chunk.to_csv(tmp, mode="w" if start == 0 else "a", header=start == 0, index=False)
+    os.replace(tmp, path)
+    return path
+
+
+def timed(fn, repeat=1, warmup=True):
+    """(result of the last call, list of seconds per call). The warm-up call pays for lazy imports."""
+    if warmup:
+        fn()
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        seconds.append(time.perf_counter() - start)
+    return result, seconds
+
+
+def record(results, name, scale, rows, seconds, calls=1, mode="memory"):
+    """Store the median over repeats of the per-call time."""
+    per_call = [total / calls for total in seconds]
+    entry = {"name": name, "scale": scale, "mode": mode, "rows": rows, "calls": calls, "repeat": len(seconds),
+             "seconds": statistics.median(per_call), "min_seconds": min(per_call)}
+    results.append(entry)
+    print(f"  {name:<28} x{scale:<6} {mode:<8} {entry['seconds'] * 1e3:>11.3f} ms")
+
+
+def bench_dashboard(results, scale, data_dir, mode):
+    path = synthetic_csv(WATER_CSV, scale, data_dir)
+    # The largest scales are slow enough to time in one pass
+    repeat, warmup = (3, True) if scale < 1000 else (1, False)
+    if mode == "chunked":
+        cube, seconds = timed(lambda: AggregateCube.from_chunks((with_wqi(chunk) for chunk in read_chunks(path, clean_water)),
+                                                                metric_columns + [WQI]), repeat, warmup)
+        rows = int(cube.get(stat='count')[metric_columns[0]])
+        record(results, "aggregate_cube", scale, rows, seconds, mode=mode)
+        canals, years = cube.table(['Canal_name (EN)']).index.tolist(), cube.table(['year']).index.tolist()
+        df = None
+
+        def rollups():
+            store = TimeSeriesStore(metric_columns)
+            for chunk in read_chunks(path, clean_water):
+                store.update(chunk)
+            return store
+        store, seconds = timed(rollups, repeat, warmup)
+        record(results, "trend_rollups", scale, rows, seconds, mode=mode)
+    else:
+        df, seconds = timed(lambda: clean_water(pd.read_csv(path)), repeat, warmup)
+        record(results, "load_clean_water", scale, len(df), seconds)
+        df, seconds = timed(lambda: compact(df), repeat, warmup)
+        record(results, "compact_water", scale, len(df), seconds)
+        df, seconds = timed(lambda: with_wqi(df), repeat, warmup)
+        record(results, "score_wqi", scale, len(df), seconds)
+        cube, seconds = timed(lambda: AggregateCube(df, metric_columns + [WQI]), repeat, warmup)
+        rows = len(df)
+        record(results, "aggregate_cube", scale, rows, seconds)
+        canals, years = df['Canal_name (EN)'].unique().tolist(), df['year'].unique().tolist()
+
+        def rollups():
+            store = TimeSeriesStore(metric_columns)
+            store.update(df)
+            return store
+        store, seconds = timed(rollups, repeat, warmup)
+        record(results, "trend_rollups", scale, rows, seconds)
+
+    app.df, app.cube, app.series_store = df, cube, store
+    canals = [canal for canal in canals if canal != '#VALUE!']
+    pairs = [(year, canal) for canal in canals for year in sorted(years)]
+    callbacks = [
+        ("update_bar_chart", [(canal, metric) for canal in canals for metric in ('DO (mg/l)', 'BOD (mg/l)')]),
+        ("update_gauge_graph", pairs),
+        ("update_cards", pairs),
+        ("update_trend_chart", [(canal,) for canal in canals]),
+    ]
+    # The trend callback only routes zoom events; the figure itself is built by trend_figure.
+    targets = {"update_trend_chart": app.trend_figure}
+    for name, calls in callbacks:
+        fn = inspect.unwrap(targets.get(name) or getattr(app, name))
+        _, seconds = timed(lambda: [fn(*args) for args in calls])
+        record(results, name, scale, rows, seconds, len(calls), mode)
+
+    predict_quality = inspect.unwrap(app.predict_quality)
+    inputs = np.random.default_rng(SEED).uniform(1, 50, (50, len(inference.selected_feature_keys)))
+
+    def predict_all():
+        for row in inputs:
+            prediction_cache.clear()
+            predict_quality(1, *row.tolist())
+    _, seconds = timed(predict_all)
+    record(results, "predict_quality", scale, rows, seconds, len(inputs), mode)
+    app.df = app.cube = app.series_store = None
+
+
+def bench_map(results, scale, data_dir, mode):
+    path = synthetic_csv(CANAL_MAP_CSV, scale, data_dir, jitter_coordinates=True)
+    if mode == "chunked":
+        # Readings are averaged per sample point and year, so the map holds far fewer rows
+        def summarize():
+            summary = PointSummary()
+            for chunk in read_chunks(path, clean_canal_map):
+                summary.update(with_wqi(chunk))
+            return summary.table()
+        df, seconds = timed(summarize, warmup=scale < 1000)
+        record(results, "map_point_summary", scale, len(df), seconds, mode=mode)
+    else:
+        df = with_wqi(compact(clean_canal_map(pd.read_csv(path))))
+        for column in ['Canal_name', 'Sample_water_point', 'Canal_name (EN)', 'Sample_water_point (EN)']:
+            df[column] = df[column].astype('category')
+    safety_codes = {param: map_page.classify_safety(df[param], param) for param in map_page.safety_thresholds if param in df.columns}
+    points, seconds = timed(lambda: map_page.MapPoints(df, safety_codes), warmup=scale < 1000)
+    record(results, "map_viewport_index", scale, len(df), seconds, mode=mode)
+    map_page.replace_points(points)
+
+    canals = ['all'] + df['Canal_name (EN)'].unique().tolist()
+    years = ['all'] + [str(year) for year in sorted(df['year'].unique())]
+    combos = [(canal, year) for canal in canals for year in years]
+    update_map_markers = inspect.unwrap(map_page.update_map_markers)
+
+    def update_all():
+        map_page.viewport_geojson.cache_clear()
+        for args in combos:
+            update_map_markers(*args)
+    _, seconds = timed(update_all)
+    record(results, "update_map_markers", scale, len(df), seconds, len(combos), mode)
+    map_page.replace_points(None)
+
+
+def bench_inference(results):
+    model, scaler = inference.load_model()
+    rng = np.random.default_rng(SEED)
+    for size in BATCH_SIZES:
+        values = rng.uniform(1, 50, (size, len(inference.selected_feature_keys)))
+        scaled = scaler.transform(values)
+        repeat = max(3, min(200, 20000 // size))
+        _, seconds = timed(lambda: model.predict(scaled), repeat)
+        record(results, f"model_predict_b{size}", 1, size, seconds)
+        _, seconds = timed(lambda: inference.predict_wqi(values), repeat)
+        record(results, f"predict_wqi_b{size}", 1, size, seconds)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_scale(scale, mode, data_dir, output):
+    """Benchmark one scale and data mode and write the results to ``output``; runs in its own process."""
+    results = []
+    bench_dashboard(results, scale, data_dir, mode)
+    bench_map(results, scale, data_dir, mode)
+    with open(output, "w") as f:
+        json.dump({"results": results, "peak_rss_mb": peak_rss_mb()}, f)
+
+
+def run(scales, modes, output, data_dir):
+    os.makedirs(data_dir, exist_ok=True)
+    results, scale_reports = [], {}
+    for scale in scales:
+        # Written here, so generating them does not count towards a child's peak memory
+        synthetic_csv(WATER_CSV, scale, data_dir)
+        synthetic_csv(CANAL_MAP_CSV, scale, data_dir, jitter_coordinates=True)
+        for mode in modes:
+            # A fresh process per scale and mode, so peak memory is measured for each and running
+            # out of it at the largest scale is recorded rather than ending the whole run.
+            print(f"scale x{scale}, {mode}")
+            with tempfile.NamedTemporaryFile(suffix=".json") as part:
+                child = subprocess.run([sys.executable, __file__, "--scale-worker", str(scale), "--modes", mode,
+                                        "--data-dir", data_dir, "--output", part.name])
+                if child.returncode == 0:
+                    with open(part.name) as f:
+                        scale_report = json.load(f)
+                    results.extend(scale_report.pop("results"))
+                else:
+                    reason = "killed, most likely out of memory" if child.returncode == -9 else f"exit code {child.returncode}"
+                    scale_report = {"error": reason}
+                    print(f"  failed: {reason}")
+            scale_reports[f"x{scale} {mode}"] = scale_report
+    print("inference")
+    bench_inference(results)
+
+    commit = git_commit()
+    report = {"commit": commit, "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "python": platform.python_version(),
+              "machine": platform.machine(), "cpus": os.cpu_count(), "backend": inference.INFERENCE_BACKEND,
+              "scales": scale_reports, "results": results}
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{commit}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=1)
+    for scale, scale_report in scale_reports.items():
+        print(f"{scale}: " + (scale_report["error"] if "error" in scale_report else f"peak RSS {scale_report['peak_rss_mb']:.0f} MB"))
+    print(f"wrote {output}")
+
+
+def compare(old_path, new_path, threshold):
+    """Print new/old time ratios; returns the number of benchmarks slower by more than ``threshold``."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    before = {(entry["name"], entry["scale"], entry.get("mode", "memory")): entry for entry in old["results"]}
+    regressions = 0
+    print(f"{old['commit']} -> {new['commit']}")
+    print(f"{'benchmark':<28} {'scale':>6} {'mode':<8} {'before ms':>11} {'after ms':>11} {'ratio':>7}")
+    for entry in new["results"]:
+        previous = before.get((entry["name"], entry["scale"], entry.get("mode", "memory")))
+        if previous is None:
+            continue
+        ratio = entry["seconds"] / previous["seconds"]
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{entry['name']:<28} {entry['scale']:>6} {entry.get('mode', 'memory'):<8} {previous['seconds'] * 1e3:>11.3f} {entry['seconds'] * 1e3:>11.3f} {ratio:>6.2f}x{flag}")
+    for scale, scale_report in new.get("scales", {}).items():
+        if "error" in scale_report and "error" not in old.get("scales", {}).get(scale, {}):
+            regressions += 1
+            print(f"{scale} failed: {scale_report['error']}  REGRESSION")
+    print(f"\n{regressions} regression(s) over {threshold:.0%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default=",".join(map(str, SCALES)), help="comma-separated dataset multipliers")
+    parser.add_argument("--modes", default="memory,chunked", help="data modes to run (memory, chunked)")
+    parser.add_argument("--output", help="results file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "wpp-bench"), help="where synthetic CSVs are kept")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two results files")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown that counts as a regression")
+    parser.add_argument("--scale-worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scale_worker is not None:
+        return run_scale(args.scale_worker, args.modes, args.data_dir, args.output)
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+    run([int(scale) for scale in args.scales.split(",")], args.modes.split(","), args.output, args.data_dir)
+
+
+if __name__ == "__main__":
+    main()
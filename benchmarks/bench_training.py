@@ -0,0 +1,79 @@
+"""Retraining cost of the notebook's grid search vs code/train_weight.py at 1x and 100x data.
+
+A whole search at 100x takes hours on one core, so this fits a random sample of candidates of
+each search on one of the cached folds and extrapolates: serial time is the mean fit times
+candidates times folds, and wall time divides that by the cores (the search runs one fit per
+core). The notebook searches gradient boosting only, with n_estimators as a grid axis and no
+early stopping; the pipeline searches gradient boosting with early stopping, random forests
+and a linear baseline.
+
+Run from the repository root: python benchmarks/bench_training.py [--scales 1,100] [--sample 8] [--cores 1,8,32]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.model_selection import KFold, ParameterGrid, train_test_split
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "code"))
+warnings.filterwarnings("ignore")
+
+import train_weight  # noqa: E402
+from bench_suite import synthetic_csv  # noqa: E402
+
+FOLDS = 5
+
+
+def sampled_fit_seconds(space, X, y, fold, sample, rng):
+    """(candidates, mean seconds per fit) of one search, from ``sample`` random candidates."""
+    estimator, grid = space
+    candidates = list(ParameterGrid(grid))
+    train, _ = fold
+    seconds = []
+    for i in rng.choice(len(candidates), min(sample, len(candidates)), replace=False):
+        model = clone(estimator).set_params(**candidates[i])
+        start = time.perf_counter()
+        model.fit(X[train], y[train])
+        seconds.append(time.perf_counter() - start)
+    return len(candidates), float(np.mean(seconds))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", default="1,100")
+    parser.add_argument("--sample", type=int, default=8, help="candidates timed per search")
+    parser.add_argument("--cores", default="1,8,32", help="core counts to extrapolate wall time to")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "wpp-bench"))
+    args = parser.parse_args()
+    cores = [int(n) for n in args.cores.split(",")]
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    print(f"{'scale':>6} {'rows':>9} {'search':>9} {'fits':>6} {'s/fit':>7} "
+          + " ".join(f"{f'{n} core min':>12}" for n in cores))
+    for scale in [int(s) for s in args.scales.split(",")]:
+        X, y = train_weight.prepare([synthetic_csv(os.path.join("data", "water.csv"), scale, args.data_dir)])
+        X_train, _, y_train, _ = train_test_split(X, y, test_size=0.15, random_state=42)
+        X_train, y_train = StandardScaler().fit_transform(X_train), np.asarray(y_train)
+        fold = next(KFold(n_splits=FOLDS, shuffle=True, random_state=42).split(X_train))
+        rng = np.random.default_rng(0)
+
+        notebook = {"gb": train_weight.search_spaces(early_stopping=False)["gb"]}
+        searches = {"notebook": notebook, "pipeline": train_weight.search_spaces()}
+        for name, spaces in searches.items():
+            fits, serial = 0, 0.0
+            for space in spaces.values():
+                candidates, per_fit = sampled_fit_seconds(space, X_train, y_train, fold, args.sample, rng)
+                fits += candidates * FOLDS
+                serial += candidates * FOLDS * per_fit
+            print(f"{scale:>5}x {len(X_train):>9,} {name:>9} {fits:>6} {serial / fits:>7.2f} "
+                  + " ".join(f"{serial / n / 60:>12.1f}" for n in cores))
+
+
+if __name__ == "__main__":
+    main()
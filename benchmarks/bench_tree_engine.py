@@ -0,0 +1,54 @@
+"""Latency of the compiled tree engine against sklearn's scaler.transform + model.predict.
+
+Run from the repository root: python benchmarks/bench_tree_engine.py
+"""
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+warnings.filterwarnings("ignore")
+
+from inference import load_model  # noqa: E402
+from tree_engine import CompiledEnsemble  # noqa: E402
+
+model, scaler = load_model()
+
+BATCH_SIZES = [1, 10, 100, 1_000, 10_000, 100_000]
+
+
+def synthetic_inputs(n, seed=0):
+    # Spread samples over a few standard deviations of the training distribution.
+    rng = np.random.default_rng(seed)
+    return np.abs(scaler.mean_ + rng.normal(scale=2.0, size=(n, len(scaler.mean_))) * scaler.scale_)
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    compiled = CompiledEnsemble(model, scaler)
+    print(f"{'rows':>8} {'sklearn ms':>12} {'compiled ms':>12} {'speedup':>8} {'max abs diff':>14}")
+    for n in BATCH_SIZES:
+        values = synthetic_inputs(n)
+        expected = np.exp(model.predict(scaler.transform(values)))
+        actual = compiled.predict_wqi(values)
+        np.testing.assert_allclose(actual, expected, rtol=1e-9)
+
+        repeat = 50 if n <= 1_000 else 5
+        sk = best_of(lambda: np.exp(model.predict(scaler.transform(values))), repeat)
+        fast = best_of(lambda: compiled.predict_wqi(values), repeat)
+        print(f"{n:>8} {sk * 1e3:>12.3f} {fast * 1e3:>12.3f} {sk / fast:>7.1f}x {np.abs(actual - expected).max():>14.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Trends chart latency and payload on dense sensor-style data, rollups vs plotting every reading.
+
+Each canal gets readings every 10 minutes over ``YEARS`` years, resampled from water.csv with a
+seasonal swing and noise. For each range (the full span, one year, one month, one day) it times
+building the figure from the multi-resolution rollups and from the raw readings, and reports the
+serialized figure size and the number of points plotted.
+Run from the repository root: python benchmarks/bench_trends.py [readings per canal]
+"""
+import inspect
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from plotly.io.json import to_json_plotly
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+warnings.filterwarnings("ignore")
+
+import app  # noqa: E402
+from datastore import metric_columns  # noqa: E402
+from timeseries import TIMESTAMP, TimeSeriesStore  # noqa: E402
+
+CANALS = 2
+READINGS = 500_000
+YEARS = 9.5
+
+
+def dense_readings(n, seed=0):
+    rng = np.random.default_rng(seed)
+    canals = app.df['Canal_name (EN)'].astype(str).unique()[:CANALS]
+    frames = []
+    for canal in canals:
+        rows = app.df[app.df['Canal_name (EN)'] == canal].sample(n, replace=True, random_state=seed).reset_index(drop=True)
+        times = pd.Timestamp("2015-01-01") + pd.to_timedelta(np.arange(n) * 600, unit="s")
+        season = 1 + 0.3 * np.sin(2 * np.pi * np.arange(n) / (n / YEARS))
+        for column in metric_columns:
+            rows[column] = rows[column].astype(float) * season * rng.lognormal(0, 0.2, n)
+        rows[TIMESTAMP] = times
+        rows['year'] = times.year
+        frames.append(rows)
+    return pd.concat(frames, ignore_index=True)
+
+
+def raw_figure(readings, canal, start, end):
+    # What the tab would have to send without rollups: every reading in range.
+    import plotly.express as px
+
+    rows = readings[readings['Canal_name (EN)'] == canal].set_index(TIMESTAMP).sort_index().loc[start:end]
+    value_vars = [column for column in metric_columns if column != 'T.Coliform (col/100ml)']
+    df_long = rows[value_vars].reset_index().melt(id_vars=TIMESTAMP, var_name='Metric', value_name='Measurement')
+    return px.line(df_long, x=TIMESTAMP, y='Measurement', color='Metric')
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1e3
+
+
+def main():
+    readings_per_canal = int(sys.argv[1]) if len(sys.argv) > 1 else READINGS
+    app.load_data()
+    readings = dense_readings(readings_per_canal)
+    canal = readings['Canal_name (EN)'].iloc[0]
+
+    store = TimeSeriesStore(metric_columns)
+    _, build_ms = timed(lambda: store.update(readings))
+    app.series_store = store
+    print(f"{len(readings):,} readings over {CANALS} canals, rollups built in {build_ms:.0f} ms")
+
+    last = readings[TIMESTAMP].max()
+    ranges = {
+        "full": (None, None),
+        "year": (str(last - pd.Timedelta(days=365)), str(last)),
+        "month": (str(last - pd.Timedelta(days=30)), str(last)),
+        "day": (str(last - pd.Timedelta(days=1)), str(last)),
+    }
+    trend_figure = inspect.unwrap(app.trend_figure)
+    print(f"{'range':>6} {'level':>6} {'ms':>8} {'KB':>8} {'points':>8}   {'raw ms':>8} {'raw KB':>9} {'raw points':>11}")
+    for name, (start, end) in ranges.items():
+        level, _ = store.series(canal, start, end)
+        fig, ms = timed(lambda: trend_figure(canal, start, end))
+        points = sum(len(trace.x) for trace in fig.data)
+        size = len(to_json_plotly(fig).encode())
+        raw, raw_ms = timed(lambda: raw_figure(readings, canal, start, end))
+        raw_points = sum(len(trace.x) for trace in raw.data)
+        raw_size = len(to_json_plotly(raw).encode())
+        print(f"{name:>6} {level:>6} {ms:>8.1f} {size / 1024:>8.1f} {points:>8,}   {raw_ms:>8.1f} {raw_size / 1024:>9.1f} {raw_points:>11,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""Rebuild code/scaler_isqa.dump, the input scaler of wpp_model_isqa.pkl.
+
+water_isqa.ipynb fits its StandardScaler on the training split but never saves it. This
+repeats the notebook's steps up to that fit: log1p(TC), the 15% test split with
+random_state=42, and the IQR clipping of the training columns.
+
+Run from the repository root: python code/build_isqa_scaler.py
+"""
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+FEATURES = {'  pH': 'pH', 'COD (mg/l)': 'CO', 'H2S (mg/l)': 'HS', 'T.Coliform (col/100ml)': 'TC'}
+
+data = pd.read_csv('data/water.csv').rename(columns=FEATURES)
+data['TC'] = np.log1p(data['TC'])
+X_train, _ = train_test_split(data[list(FEATURES.values())], test_size=0.15, random_state=42)
+X_train = X_train.copy()
+
+for col in X_train.columns:
+    q75, q25 = np.percentile(X_train[col], [75, 25])
+    iqr = q75 - q25
+    min_val, max_val = q25 - iqr * 1.5, q75 + iqr * 1.5
+    if ((X_train[col] > max_val) | (X_train[col] < min_val)).any():
+        X_train[col] = X_train[col].clip(lower=min_val, upper=max_val)
+
+joblib.dump(StandardScaler().fit(X_train), 'code/scaler_isqa.dump')
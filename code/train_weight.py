@@ -0,0 +1,205 @@
+"""Retrain the weight-based WQI model (wpp_model_weight.pkl and scaler.dump) from the command line.
+
+Repeats water_weight.ipynb: the weighted WQI computed from twelve sub-indices, the seven model
+inputs with log10(TC + 1) for coliform, a log1p target, the 15% test split with
+random_state=42 and a StandardScaler fitted on the training split. The hyperparameter search
+runs every candidate of every model family in parallel on all cores, over one set of CV folds
+computed up front and shared by all of them. Gradient boosting stops adding trees once a
+held-out slice stops improving, so ``n_estimators`` is a cap rather than a grid axis;
+``--no-early-stopping --models gb`` runs the notebook's exact search.
+
+Each run writes a versioned bundle (model, scaler and metrics.json) to code/models/<version>/;
+``--install`` then swaps it into code/, where the app's model registry picks it up without a
+restart.
+
+Run from the repository root:
+    python code/train_weight.py [--data data/water.csv ...] [--models gb,rf,linear] [--install]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import make_scorer, mean_absolute_error, mean_squared_error, median_absolute_error, r2_score
+from sklearn.model_selection import GridSearchCV, KFold, train_test_split
+from sklearn.preprocessing import StandardScaler
+
+COLUMNS = {
+    '  pH': 'pH', 'DO (mg/l)': 'DO', 'H2S (mg/l)': 'HS', 'BOD (mg/l)': 'BO', 'COD (mg/l)': 'CO', 'SS (mg/l)': 'SS',
+    'TKN (mg/l)': 'TKN', 'NH3N (mg/l)': 'AN', 'NO2 (mg/l)': 'NO2N', 'NO3 (mg/l)': 'NO3N', 'T-P (mg/l)': 'TP',
+    'T.Coliform (col/100ml)': 'TC',
+}
+FEATURES = ['pH', 'DO', 'BO', 'NO3N', 'SS', 'CO', 'TC_log']
+
+# Sub-index of each parameter: 100 at the "good" value, 0 at the "bad" one, linear and clipped
+# in between (pH has its own two-sided curve), and its weight in the WQI.
+SUB_INDICES = {
+    'DO': (5, 2, 0.083), 'BO': (2, 10, 0.083), 'TC_log': (3, 5, 0.083), 'NO3N': (10, 50, 0.104),
+    'NO2N': (0.05, 1, 0.104), 'AN': (0.5, 1.5, 0.083), 'TP': (0.1, 1, 0.083), 'SS': (50, 500, 0.063),
+    'TKN': (0.5, 2, 0.083), 'HS': (0.05, 0.5, 0.063), 'CO': (20, 100, 0.083),
+}
+PH_WEIGHT = 0.083
+
+SCORING = {
+    "neg_mean_squared_error": make_scorer(mean_squared_error, greater_is_better=False),
+    "neg_mean_absolute_error": make_scorer(mean_absolute_error, greater_is_better=False),
+    "neg_median_absolute_error": make_scorer(median_absolute_error, greater_is_better=False),
+    "r2": make_scorer(r2_score),
+}
+REFIT = "neg_median_absolute_error"
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_FILE = "wpp_model_weight.pkl"
+SCALER_FILE = "scaler.dump"
+
+
+def search_spaces(early_stopping=True):
+    """(estimator, parameter grid) per model family; the gradient boosting grid is the notebook's."""
+    gb_grid = {
+        'learning_rate': [0.01, 0.05, 0.1],
+        'max_depth': [2, 3, 4],
+        'subsample': [0.6, 0.8, 1.0],
+        'max_features': ['sqrt', 'log2', 0.5],
+    }
+    if early_stopping:
+        # Capped at the notebook's largest n_estimators, so stopping early only ever saves trees
+        gb = GradientBoostingRegressor(n_estimators=200, n_iter_no_change=10, validation_fraction=0.1, random_state=42)
+    else:
+        gb = GradientBoostingRegressor(random_state=42)
+        gb_grid['n_estimators'] = [50, 100, 200]
+    return {
+        "gb": (gb, gb_grid),
+        # One job per forest, as the search already keeps every core busy, and each tree on half the rows
+        "rf": (RandomForestRegressor(n_estimators=100, max_samples=0.5, random_state=42, n_jobs=1),
+               {'max_depth': [8, 16, None], 'max_features': ['sqrt', 0.5]}),
+        "linear": (LinearRegression(), {}),
+    }
+
+
+def wqi(data):
+    """Weighted WQI of every row, vectorized from the notebook's per-row sub-index functions."""
+    ph = data['pH'].to_numpy(dtype=float)
+    ph_index = np.where((ph >= 5) & (ph < 7), 100 * (ph - 5) / 2, np.where((ph >= 7) & (ph <= 9.5), 100 * (9.5 - ph) / 2.5, 0))
+    total = ph_index * PH_WEIGHT
+    for column, (good, bad, weight) in SUB_INDICES.items():
+        total = total + np.clip(100 * (bad - data[column].to_numpy(dtype=float)) / (bad - good), 0, 100) * weight
+    return total
+
+
+def prepare(paths):
+    """Model inputs X (a DataFrame with the FEATURES columns) and the log1p(WQI) target."""
+    data = pd.concat([pd.read_csv(path, usecols=list(COLUMNS)) for path in paths], ignore_index=True).rename(columns=COLUMNS)
+    data = data.apply(pd.to_numeric, errors='coerce').dropna()
+    data['TC_log'] = np.log10(data['TC'] + 1)
+    return data[FEATURES], np.log1p(wqi(data))
+
+
+def data_hash(paths):
+    digest = hashlib.sha1()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:8]
+
+
+def search(X_train, y_train, families, early_stopping=True, jobs=-1, folds=5):
+    """Grid-search each family over the same cached folds. Returns {family: fitted GridSearchCV}."""
+    # Split once and hand every search the same index arrays
+    cv = list(KFold(n_splits=folds, shuffle=True, random_state=42).split(X_train))
+    spaces = search_spaces(early_stopping)
+    results = {}
+    for family in families:
+        estimator, grid = spaces[family]
+        results[family] = GridSearchCV(estimator, grid, cv=cv, n_jobs=jobs, scoring=SCORING, refit=REFIT).fit(X_train, y_train)
+    return results
+
+
+def test_metrics(model, X_test, y_test):
+    # The app turns predictions back into a WQI with exp(), as the notebook did
+    actual, predicted = np.exp(y_test), np.exp(model.predict(X_test))
+    return {
+        "mean_squared_error": mean_squared_error(actual, predicted),
+        "mean_absolute_error": mean_absolute_error(actual, predicted),
+        "median_absolute_error": median_absolute_error(actual, predicted),
+        "r2": r2_score(actual, predicted),
+    }
+
+
+def write_bundle(directory, model, scaler, report):
+    os.makedirs(directory, exist_ok=True)
+    joblib.dump(model, os.path.join(directory, MODEL_FILE))
+    joblib.dump(scaler, os.path.join(directory, SCALER_FILE))
+    with open(os.path.join(directory, "metrics.json"), "w") as f:
+        json.dump(report, f, indent=2, default=str)
+
+
+def install(directory, target=CODE_DIR):
+    """Copy a bundle's model and scaler over the ones in ``target``, each in one rename."""
+    for name in (SCALER_FILE, MODEL_FILE):
+        fd, tmp = tempfile.mkstemp(dir=target, prefix=f".{name}-")
+        os.close(fd)
+        shutil.copyfile(os.path.join(directory, name), tmp)
+        os.replace(tmp, os.path.join(target, name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", nargs="+", default=["data/water.csv"], help="CSV files with the data/water.csv columns")
+    parser.add_argument("--models", default="gb,rf,linear", help="model families to search: gb, rf, linear")
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel fits (default: all cores)")
+    parser.add_argument("--no-early-stopping", action="store_true", help="search n_estimators like the notebook instead")
+    parser.add_argument("--output-dir", default=os.path.join(CODE_DIR, "models"))
+    parser.add_argument("--install", action="store_true", help="swap the new model and scaler into code/")
+    args = parser.parse_args()
+    families = args.models.split(",")
+
+    start = time.perf_counter()
+    X, y = prepare(args.data)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.15, random_state=42)
+    scaler = StandardScaler().fit(X_train)
+    X_train, X_test = scaler.transform(X_train), scaler.transform(X_test)
+    prepared = time.perf_counter()
+
+    searches = search(X_train, y_train, families, not args.no_early_stopping, args.jobs)
+    family = max(searches, key=lambda name: searches[name].best_score_)
+    model = searches[family].best_estimator_
+    searched = time.perf_counter()
+
+    version = f"{datetime.now(timezone.utc):%Y%m%d-%H%M%S}-{data_hash(args.data)}"
+    report = {
+        "version": version,
+        "data": args.data,
+        "rows": {"train": len(X_train), "test": len(X_test)},
+        "features": FEATURES,
+        "family": family,
+        "params": model.get_params(),
+        "n_estimators_fitted": getattr(model, "n_estimators_", None),
+        "cv": {name: {"best_params": s.best_params_, REFIT: s.best_score_, "candidates": len(s.cv_results_["params"])}
+               for name, s in searches.items()},
+        "test": test_metrics(model, X_test, y_test),
+        "seconds": {"prepare": prepared - start, "search": searched - prepared},
+        "jobs": args.jobs if args.jobs > 0 else os.cpu_count(),
+        "sklearn": sklearn.__version__,
+    }
+    directory = os.path.join(args.output_dir, version)
+    write_bundle(directory, model, scaler, report)
+    print(json.dumps({key: report[key] for key in ("version", "rows", "family", "cv", "test", "seconds")}, indent=2, default=str))
+    print(f"bundle: {directory}")
+    if args.install:
+        install(directory)
+        print(f"installed into {CODE_DIR}")
+
+
+if __name__ == "__main__":
+    main()
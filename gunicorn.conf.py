@@ -0,0 +1,27 @@
+"""gunicorn settings for serving the app. Run ``gunicorn`` from the repository root and it picks this file up.
+
+Workers use the gthread class: each worker process accepts connections and watches idle
+keep-alive sockets in its main thread, and runs requests (and so Dash callbacks) on a pool of
+``WPP_THREADS`` threads. A slow client or a long ``update_map_markers`` call holds one thread
+instead of the whole worker. CPU-bound work is spread over the worker processes.
+
+Each worker also runs its own prediction service: one batcher thread, plus ``WPP_PREDICT_WORKERS``
+scoring threads when that is above 0. They are threads in the worker, sharing its loaded model, so
+the service adds no processes and no model copies; the worker count is the process count.
+"""
+import os
+
+wsgi_app = "app:server"
+chdir = os.path.dirname(os.path.abspath(__file__))
+pythonpath = "app"
+bind = f"0.0.0.0:{os.environ.get('PORT', 8050)}"
+
+worker_class = "gthread"
+# POST /api/v1/readings reaches every worker only through WPP_INGEST_DIR; without it, a POSTed
+# batch is applied by the one worker that receives it.
+workers = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+threads = int(os.environ.get("WPP_THREADS", 8))
+keepalive = 5
+# Callbacks that hit an uncached 10,000x dataset can take tens of seconds.
+timeout = 120
+graceful_timeout = 30
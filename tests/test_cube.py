@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cube import CANAL, POINT, YEAR, AggregateCube
+
+WATER_CSV = os.path.join(os.path.dirname(__file__), "..", "data", "water.csv")
+METRICS = ['DO (mg/l)', 'BOD (mg/l)', 'H2S (mg/l)', 'T.Coliform (col/100ml)']
+LEVELS = [(CANAL,), (YEAR,), (POINT,), (CANAL, YEAR), (CANAL, POINT), (CANAL, YEAR, POINT)]
+
+
+@pytest.fixture
+def water():
+    return pd.read_csv(WATER_CSV)[[CANAL, YEAR, POINT] + METRICS]
+
+
+def assert_matches_groupby(cube, frame):
+    for levels in LEVELS:
+        for stat in AggregateCube.stats:
+            expected = frame.groupby(list(levels))[METRICS].agg(stat).reset_index().sort_values(list(levels))
+            actual = cube.table(levels, stat).reset_index().astype({level: expected[level].dtype for level in levels})
+            actual = actual.sort_values(list(levels))
+            assert actual[list(levels)].to_numpy().tolist() == expected[list(levels)].to_numpy().tolist()
+            assert np.allclose(actual[METRICS].to_numpy(float), expected[METRICS].to_numpy(float), equal_nan=True), (levels, stat)
+
+    total = cube.get()
+    for metric in METRICS:
+        assert np.isclose(total[metric], frame[metric].mean())
+    canal, year = frame[CANAL].iloc[0], frame[YEAR].iloc[0]
+    in_cell = frame[(frame[CANAL] == canal) & (frame[YEAR] == year)]
+    assert cube.get(canal, year, stat='count') == in_cell[METRICS].count().to_dict()
+
+
+def test_queries_match_groupby_before_and_after_update(water):
+    first = water.sample(frac=0.5, random_state=0)
+    cube = AggregateCube(first, METRICS)
+    assert_matches_groupby(cube, first)
+
+    # The table has one row per canal x year x point, so repeat readings of some of the first half
+    # to land in cells the cube already has, next to new cells and a canal it has not seen
+    repeats = first.iloc[:100].assign(**{'DO (mg/l)': first['DO (mg/l)'].iloc[:100] + 1})
+    new_canal = water.iloc[[0]].assign(**{CANAL: "New canal", 'DO (mg/l)': np.nan})
+    for batch in (water.drop(first.index), repeats, new_canal):
+        cube.update(batch)
+    assert_matches_groupby(cube, pd.concat([water, repeats, new_canal], ignore_index=True))
+    assert np.isnan(cube.get("New canal")['DO (mg/l)'])
@@ -0,0 +1,62 @@
+import os
+
+import plotly.graph_objects as go
+import pytest
+
+import figcache
+from figcache import FigureCache, MemoryBackend, SQLiteBackend
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def test_exceptions_are_not_cached():
+    cache = FigureCache(MemoryBackend(4))
+    calls = []
+
+    @cache.memoize
+    def figure(fail):
+        calls.append(fail)
+        if fail:
+            raise ValueError("no data")
+        return go.Figure()
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            figure(True)
+    figure(False)
+    figure(False)
+    assert calls == [True, True, False]
+    assert cache.stats()["entries"] == 1
+
+
+def test_error_figures_are_not_cached(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    import app
+    app.load_data()
+    monkeypatch.setattr(app.figure_cache, "backend", MemoryBackend(4))
+    canal = app.cube.table(['Canal_name (EN)']).index[0]
+
+    figure = app.update_bar_chart(canal, "no such metric")
+    assert figure.layout.title.text.startswith("Error")
+    assert app.figure_cache.stats()["entries"] == 0
+    app.update_bar_chart(canal, "DO (mg/l)")
+    assert app.figure_cache.stats()["entries"] == 1
+
+
+def test_sqlite_lookups_write_counters_in_batches(tmp_path):
+    path = str(tmp_path / "figures.db")
+    backend = SQLiteBackend(path, 4)
+    backend.put("a", "{}")
+    db = backend._connect()
+    changes = db.total_changes
+    for _ in range(figcache.FLUSH_EVERY - 1):
+        assert backend.get("a") == "{}"
+    assert backend.get("b") is None
+    assert db.total_changes > changes
+
+    changes = db.total_changes
+    backend.get("a")
+    assert db.total_changes == changes
+    other = SQLiteBackend(path, 4)
+    assert (other.stats()["hits"], other.stats()["misses"]) == (figcache.FLUSH_EVERY - 1, 1)
+    assert (backend.stats()["hits"], backend.stats()["misses"]) == (figcache.FLUSH_EVERY, 1)
@@ -0,0 +1,66 @@
+import gzip
+import os
+import types
+
+import pytest
+
+import httpcache
+import inference
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    import app
+    return app.app.server.test_client()
+
+
+def callback_body(client, output, values):
+    dep = next(dep for dep in client.get("/_dash-dependencies").get_json() if dep["output"] == output)
+    output_id, output_prop = output.split(".", 1)
+    return {"output": output, "outputs": {"id": output_id, "property": output_prop},
+            "inputs": [dict(item, value=value) for item, value in zip(dep["inputs"], values)],
+            "changedPropIds": [f"{item['id']}.{item['property']}" for item in dep["inputs"]], "state": []}
+
+
+def test_page_callback_does_not_load_the_model(monkeypatch, client):
+    monkeypatch.setattr(inference.registry, "_bundles", {})
+    response = client.post("/_dash-update-component", json=callback_body(client, "page-content.children", ["/"]))
+    assert response.status_code == 200
+    assert response.headers["ETag"]
+    assert inference.registry._bundles == {}
+
+
+def test_repeated_callback_with_its_etag_gets_304(monkeypatch, client):
+    import app
+    body = callback_body(client, "page-content.children", ["/"])
+    first = client.post("/_dash-update-component", json=body)
+    tag = first.headers["ETag"]
+
+    again = client.post("/_dash-update-component", json=body, headers={"If-None-Match": tag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == tag and not again.get_data()
+
+    monkeypatch.setattr(app.figure_cache, "version", "new data")
+    changed = client.post("/_dash-update-component", json=body, headers={"If-None-Match": tag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != tag
+
+
+def test_encoding_follows_accept_encoding(monkeypatch, client):
+    plain = client.get("/_dash-layout")
+    assert "Content-Encoding" not in plain.headers
+    assert len(plain.get_data()) > httpcache.MIN_SIZE
+
+    monkeypatch.setattr(httpcache, "brotli", None)
+    zipped = client.get("/_dash-layout", headers={"Accept-Encoding": "br, gzip"})
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(zipped.get_data()) == plain.get_data()
+    assert "Accept-Encoding" in zipped.headers["Vary"]
+
+    monkeypatch.setattr(httpcache, "brotli", types.SimpleNamespace(compress=lambda data, quality: b"br:" + data))
+    assert client.get("/_dash-layout", headers={"Accept-Encoding": "br, gzip"}).headers["Content-Encoding"] == "br"
+    assert client.get("/_dash-layout", headers={"Accept-Encoding": "gzip"}).headers["Content-Encoding"] == "gzip"
+    assert "Content-Encoding" not in client.get("/_dash-layout", headers={"Accept-Encoding": "identity"}).headers
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import inference
+import registry
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(ROOT, "code"))
+
+import train_weight  # noqa: E402
+
+WATER_CSV = os.path.join(ROOT, "data", "water.csv")
+RAW_COLUMNS = ["  pH", "DO (mg/l)", "BOD (mg/l)", "NO3 (mg/l)", "SS (mg/l)", "COD (mg/l)", "T.Coliform (col/100ml)"]
+
+
+def test_weight_predictions_use_the_training_transform(monkeypatch):
+    features, target = train_weight.prepare([WATER_CSV])
+    raw = pd.read_csv(WATER_CSV, usecols=RAW_COLUMNS)[RAW_COLUMNS].apply(pd.to_numeric, errors="coerce")
+    raw = raw.loc[features.index].to_numpy(dtype=float)
+
+    monkeypatch.chdir(ROOT)
+    spec = inference.MODEL_SPECS["weight"]
+    model = joblib.load(spec["model"])
+    scaler = joblib.load(spec["scaler"])
+    expected = np.exp(model.predict(scaler.transform(features)))
+    served = inference.predict_wqi(raw, "weight")
+    compiled = registry.load_bundle("weight", spec, compiled=True).predict_wqi(raw)
+
+    np.testing.assert_allclose(served, expected, rtol=1e-6)
+    np.testing.assert_allclose(compiled, expected, rtol=1e-6)
+    assert np.abs(served - np.expm1(target)).mean() < 2
@@ -0,0 +1,88 @@
+import os
+
+import pandas as pd
+import pytest
+
+import ingest
+
+WATER_CSV = os.path.join(os.path.dirname(__file__), "..", "data", "water.csv")
+
+
+@pytest.fixture
+def received(monkeypatch):
+    batches = []
+    monkeypatch.setattr(ingest, "_subscribers", [batches.append])
+    return batches
+
+
+@pytest.fixture
+def rows():
+    return pd.read_csv(WATER_CSV, nrows=3)
+
+
+def test_appended_rows_are_ingested_once(tmp_path, received, rows):
+    path = str(tmp_path / "drop.csv")
+    offsets = {}
+    rows.iloc[:2].to_csv(path, index=False)
+    assert ingest.ingest_file(path, offsets) == (2, 0)
+
+    rows.iloc[2:].to_csv(path, mode="a", header=False, index=False)
+    assert ingest.ingest_file(path, offsets) == (1, 0)
+    assert ingest.ingest_file(path, offsets) == (0, 0)
+    assert sum(len(batch) for batch in received) == 3
+
+
+def test_partial_line_waits_for_its_newline(tmp_path, received, rows):
+    path = str(tmp_path / "drop.csv")
+    offsets = {}
+    rows.iloc[:1].to_csv(path, index=False)
+    line = rows.iloc[1:2].to_csv(header=False, index=False)
+    with open(path, "a") as f:
+        f.write(line[:10])
+    assert ingest.ingest_file(path, offsets) == (1, 0)
+    with open(path, "a") as f:
+        f.write(line[10:])
+    assert ingest.ingest_file(path, offsets) == (1, 0)
+    assert sum(len(batch) for batch in received) == 2
+
+
+def test_refused_rows_are_read_again(tmp_path, received, rows):
+    path = str(tmp_path / "drop.csv")
+    offsets = {}
+    rows.drop(columns=["year"]).to_csv(path, index=False)
+    with pytest.raises(ValueError):
+        ingest.ingest_file(path, offsets)
+    assert offsets == {}
+
+    rows.to_csv(path, index=False)
+    assert ingest.ingest_file(path, offsets) == (3, 0)
+    assert sum(len(batch) for batch in received) == 3
+
+
+def test_posted_readings_go_through_the_drop_directory(monkeypatch, tmp_path, received, rows):
+    import app
+    monkeypatch.setenv("WPP_INGEST_DIR", str(tmp_path))
+    client = app.app.server.test_client()
+    response = client.post("/api/v1/readings", data=rows.to_csv(index=False), content_type="text/csv")
+    assert response.status_code == 202
+    assert response.get_json()["accepted"] == 3
+    assert received == []
+
+    (drop,) = tmp_path.glob("*.csv")
+    assert ingest.ingest_file(str(drop), {}) == (3, 0)
+    assert received[0]["year"].tolist() == (rows["year"] - 543).tolist()
+
+
+def test_rescore_reads_ingested_rows_back_from_the_journal(monkeypatch, received, rows):
+    chunks = []
+    monkeypatch.setattr(ingest, "_rescorers", [lambda readings: chunks.extend(readings)])
+    ingest.rescore(ingest.inference.DEFAULT_MODEL)
+    before = sum(len(chunk) for chunk in chunks)
+
+    assert ingest.ingest_readings(rows) == (3, 0)
+    chunks.clear()
+    ingest.rescore(ingest.inference.DEFAULT_MODEL)
+    rescored = pd.concat(chunks, ignore_index=True)
+    assert len(rescored) == before + 3
+    assert rescored["year"].tail(3).tolist() == (rows["year"] - 543).tolist()
+    assert rescored["WQI"].tail(3).tolist() == pytest.approx(received[0]["WQI"].tolist())
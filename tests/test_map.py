@@ -0,0 +1,60 @@
+import os
+
+import pandas as pd
+import pytest
+
+import ingest
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+BOUNDS = [[13.0, 100.0], [14.5, 101.0]]
+
+
+@pytest.fixture
+def map_page(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    import map as map_page
+    map_page.load_data()
+    monkeypatch.setattr(map_page, "points", map_page.points)
+    monkeypatch.setattr(map_page, "correlation_tracker", map_page.correlation_tracker)
+    monkeypatch.setattr(ingest, "_subscribers", [map_page.apply_readings])
+    yield map_page
+    map_page.viewport_geojson.cache_clear()
+
+
+def shown(map_page, canal):
+    markers, _, cells = map_page.update_map_markers(canal, 'all', BOUNDS, 18)
+    return len(markers['features']) + sum(feature['properties']['n'] for feature in cells['features'])
+
+
+def test_located_readings_replace_the_points(map_page):
+    before = map_page.points
+    canal = before.df['Canal_name (EN)'].iloc[0]
+    count = shown(map_page, canal)
+
+    reading = pd.read_csv(os.path.join(ROOT, "data", "canalwater1.csv"), nrows=1)
+    assert ingest.ingest_readings(reading) == (1, 0)
+
+    after = map_page.points
+    assert after is not before
+    assert len(after) == len(before) + 1
+    assert after.df is before.df
+    assert shown(map_page, canal) == count + 1
+
+
+def test_appended_points_match_a_rebuild(map_page):
+    readings = pd.read_csv(os.path.join(ROOT, "data", "canalwater1.csv"), nrows=400)
+    for start in range(0, len(readings), 20):
+        ingest.ingest_readings(readings.iloc[start:start + 20])
+
+    appended = map_page.points
+    rebuilt = map_page.MapPoints.classify(appended.table(), list(appended.safety_codes))
+    assert len(appended.recent) == len(appended) - len(appended.df) > 0
+    for cell_size in (0.0005, 0.05):
+        (mode, result), (rebuilt_mode, expected) = (
+            points.viewport_index.query((13.0, 100.0, 14.5, 101.0), cell_size, {'canal': None, 'year': None})
+            for points in (appended, rebuilt))
+        assert mode == rebuilt_mode
+        if mode == "points":
+            assert map_page.point_geojson(appended, result) == map_page.point_geojson(rebuilt, expected)
+        else:
+            assert result["count"].sum() == expected["count"].sum()
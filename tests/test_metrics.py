@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    import app
+    return app.app.server.test_client()
+
+
+def test_debug_endpoints_are_off_without_a_token(monkeypatch, client):
+    monkeypatch.delenv("WPP_DEBUG_TOKEN", raising=False)
+    assert client.get("/metrics").status_code == 404
+    assert client.get("/debug/profile?seconds=0").status_code == 404
+
+
+def test_debug_endpoints_need_the_token_even_from_localhost(monkeypatch, client):
+    monkeypatch.setenv("WPP_DEBUG_TOKEN", "s3cret")
+    local = {"REMOTE_ADDR": "127.0.0.1"}
+    assert client.get("/metrics", environ_base=local).status_code == 403
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 403
+    assert client.get("/metrics", headers={"Authorization": "Basic s3cret"}).status_code == 403
+
+    authorized = {"Authorization": "Bearer s3cret"}
+    response = client.get("/metrics", headers=authorized)
+    assert response.status_code == 200
+    assert "# TYPE wpp_callback_seconds histogram" in response.get_data(as_text=True)
+    assert client.get("/debug/profile?seconds=0.01", headers=authorized).status_code == 200
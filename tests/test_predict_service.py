@@ -0,0 +1,17 @@
+import numpy as np
+import pytest
+
+import inference
+from predict_service import PredictionService
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_batched_predictions_match_inline(workers):
+    rows = np.random.default_rng(0).uniform(1, 50, (64, len(inference.selected_feature_keys)))
+    service = PredictionService(workers=workers)
+    try:
+        futures = [service.submit(row) for row in rows]
+        batched = np.concatenate([future.result(timeout=10) for future in futures])
+    finally:
+        service.shutdown()
+    np.testing.assert_allclose(batched, inference.predict_wqi(rows))
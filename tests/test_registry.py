@@ -0,0 +1,26 @@
+import os
+import shutil
+
+import inference
+from registry import ModelRegistry
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def test_listeners_run_after_a_swap(tmp_path):
+    spec = dict(inference.MODEL_SPECS["weight"])
+    for part in ("model", "scaler"):
+        spec[part] = shutil.copy(os.path.join(ROOT, spec[part]), tmp_path)
+    models = ModelRegistry({"weight": spec})
+    swapped = []
+    models.subscribe(swapped.append)
+    first = models.get("weight")
+
+    models.reload("weight", wait=True)
+    assert swapped == []
+
+    stat = os.stat(spec["model"])
+    os.utime(spec["model"], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    models.reload("weight", wait=True)
+    assert swapped == ["weight"]
+    assert models.get("weight") is not first
@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+import pytest
+
+import datastore
+import inference
+import ingest
+from scoring import WQI
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+@pytest.fixture
+def pages(monkeypatch, tmp_path):
+    monkeypatch.chdir(ROOT)
+    import app
+    import map as map_page
+    app.load_data()
+    map_page.load_data()
+    # Restored after the test, since a rescore replaces them
+    for module, names in [(app, ["df", "cube"]), (map_page, ["points", "point_summary"])]:
+        for name in names:
+            monkeypatch.setattr(module, name, getattr(module, name))
+    monkeypatch.setattr(app.figure_cache, "version", app.figure_cache.version)
+    monkeypatch.setattr(datastore, "CACHE_DIR", str(tmp_path))
+    return app, map_page
+
+
+def test_model_swap_rescores_dashboard_and_map(monkeypatch, pages):
+    app, map_page = pages
+    version = app.figure_cache.version
+    monkeypatch.setattr(inference, "predict_wqi", lambda values, model=None: np.full(len(values), 80.0))
+    for module in (inference, app):
+        monkeypatch.setattr(module, "model_version", lambda name=None: "swapped")
+
+    ingest.rescore(inference.DEFAULT_MODEL)
+
+    by_canal = app.cube.table(['Canal_name (EN)'])[WQI].dropna()
+    assert len(by_canal) and np.allclose(by_canal, 80.0)
+    points = map_page.points
+    scores = points.df[WQI].dropna()
+    assert len(scores) and np.allclose(scores, 80.0)
+    assert (points.safety_codes[WQI][points.df[WQI].notna().to_numpy()] == map_page.SAFE).all()
+    assert app.figure_cache.version != version
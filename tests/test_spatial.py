@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from spatial import LEVELS, MIN_TAIL, N_STATUSES, POINT_CELL, ViewportIndex
+
+N = 5000
+
+
+@pytest.fixture
+def stations():
+    rng = np.random.default_rng(0)
+    lat, lon = rng.uniform(13.5, 14.0, N), rng.uniform(100.3, 100.9, N)
+    # Some stations exactly on point-grid cell edges
+    lat[:200] = 13.5 + POINT_CELL * rng.integers(0, 100, 200)
+    lon[100:300] = 100.3 + POINT_CELL * rng.integers(0, 120, 200)
+    filters = {'canal': rng.integers(0, 5, N), 'year': rng.integers(2018, 2024, N)}
+    statuses = {'DO': rng.integers(0, N_STATUSES, N), 'BOD': rng.integers(0, N_STATUSES, N)}
+    return lat, lon, filters, statuses
+
+
+def bboxes(lat, lon):
+    rng = np.random.default_rng(1)
+    south, west = rng.uniform(13.5, 13.9, 20), rng.uniform(100.3, 100.8, 20)
+    yield from zip(south, west, south + rng.uniform(0.001, 0.1, 20), west + rng.uniform(0.001, 0.1, 20))
+    # Edges on cell boundaries of the point grid and of an aggregate level, and through stations
+    for size in (POINT_CELL, LEVELS[-1]):
+        yield 13.5 + 10 * size, 100.3 + 10 * size, 13.5 + 30 * size, 100.3 + 30 * size
+    yield min(lat[2], lat[3]), min(lon[102], lon[103]), max(lat[2], lat[3]), max(lon[102], lon[103])
+    # Touching the extent from outside, and covering all of it
+    yield lat.max(), lon.min() - 1, lat.max() + 1, lon.max()
+    yield lat.min() - 1, lon.min() - 1, lat.max() + 1, lon.max() + 1
+
+
+def expected_rows(lat, lon, filters, bounds, filter_values):
+    south, west, north, east = bounds
+    mask = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+    for name, value in filter_values.items():
+        mask &= filters[name] == value
+    return np.flatnonzero(mask)
+
+
+@pytest.mark.parametrize("filter_values", [{}, {'canal': 2}, {'canal': 1, 'year': 2020}])
+def test_bbox_query_returns_the_rows_a_mask_selects(stations, filter_values):
+    lat, lon, filters, statuses = stations
+    index = ViewportIndex(lat, lon, filters, statuses, max_points=N)
+    for bounds in bboxes(lat, lon):
+        mode, rows = index.query(bounds, LEVELS[-1], filter_values)
+        assert mode == "points"
+        assert rows.tolist() == expected_rows(lat, lon, filters, bounds, filter_values).tolist(), bounds
+
+
+@pytest.mark.parametrize("filter_values", [{}, {'canal': 2}, {'canal': 1, 'year': 2020}])
+def test_aggregate_counts_sum_to_the_row_count(stations, filter_values):
+    lat, lon, filters, statuses = stations
+    index = ViewportIndex(lat, lon, filters, statuses, max_points=0)
+    matching = expected_rows(lat, lon, filters, index.extent, filter_values)
+    for cell_size in LEVELS:
+        mode, summary = index.query(index.extent, cell_size, filter_values)
+        assert mode == "cells"
+        assert summary["count"].sum() == len(matching)
+        for param, codes in statuses.items():
+            assert summary["status_counts"][param].sum(axis=0).tolist() == np.bincount(codes[matching], minlength=N_STATUSES).tolist()
+
+
+def test_appended_rows_are_queried_like_indexed_ones_until_the_tail_is_full(stations):
+    lat, lon, filters, statuses = stations
+    # The stations on the edges of the extent go first, so the appended ones all fall inside it
+    edges = np.isin(np.arange(N), [lat.argmin(), lat.argmax(), lon.argmin(), lon.argmax()])
+    order = np.argsort(~edges, kind="stable")
+    lat, lon = lat[order], lon[order]
+    filters = {name: values[order] for name, values in filters.items()}
+    statuses = {param: codes[order] for param, codes in statuses.items()}
+    half = N - MIN_TAIL
+    split = [lat[:half], lon[:half], {name: values[:half] for name, values in filters.items()},
+             {param: codes[:half] for param, codes in statuses.items()}]
+    index = ViewportIndex(*split, max_points=N)
+    for start in range(half, N, 128):
+        part = slice(start, start + 128)
+        index = index.appended(lat[part], lon[part], {name: values[part] for name, values in filters.items()},
+                               {param: codes[part] for param, codes in statuses.items()})
+        assert index is not None
+    assert index.appended(lat[:1], lon[:1], {name: values[:1] for name, values in filters.items()},
+                          {param: codes[:1] for param, codes in statuses.items()}) is None
+
+    for bounds in bboxes(lat, lon):
+        assert index.query(bounds, LEVELS[-1], {'canal': 3})[1].tolist() == expected_rows(lat, lon, filters, bounds, {'canal': 3}).tolist()
+    index.max_points = 0
+    for cell_size in LEVELS:
+        summary = index.query(index.extent, cell_size, {})[1]
+        assert summary["count"].sum() == N
+        assert summary["status_counts"]['DO'].sum(axis=0).tolist() == np.bincount(statuses['DO'], minlength=N_STATUSES).tolist()
+
+
+def test_rows_outside_the_extent_ask_for_a_rebuild(stations):
+    lat, lon, filters, statuses = stations
+    index = ViewportIndex(lat, lon, filters, statuses)
+    assert index.appended([15.0], [100.5], {'canal': [0], 'year': [2020]}, {'DO': [0], 'BOD': [0]}) is None
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from timeseries import CANAL, TIMESTAMP, TimeSeriesStore, lttb
+
+METRICS = ['DO (mg/l)', 'BOD (mg/l)']
+
+
+def readings(start, hours, seed):
+    rng = np.random.default_rng(seed)
+    times = pd.Timestamp(start) + pd.to_timedelta(np.sort(rng.uniform(0, hours, 3000)), unit='h')
+    frame = pd.DataFrame({CANAL: rng.choice(["A", "B"], len(times)), 'year': times.year, TIMESTAMP: times,
+                          **{metric: rng.normal(5, 2, len(times)) for metric in METRICS}})
+    frame.loc[rng.random(len(frame)) < 0.1, 'BOD (mg/l)'] = np.nan
+    return frame
+
+
+def resampled(frame, canal, rule):
+    rows = frame[frame[CANAL] == canal].set_index(TIMESTAMP)
+    return rows[METRICS].resample(rule).mean()
+
+
+def test_lttb_keeps_the_ends_and_returns_threshold_points():
+    rng = np.random.default_rng(0)
+    x = np.cumsum(rng.uniform(0.5, 1.5, 1000))
+    y = rng.normal(0, 1, 1000)
+    y[437] = 50
+    picked = lttb(x, y, 60)
+    assert len(picked) == 60
+    assert picked[0] == 0 and picked[-1] == 999
+    assert (np.diff(picked) > 0).all()
+    assert 437 in picked
+    assert lttb(x[:10], y[:10], 60).tolist() == list(range(10))
+
+
+def assert_series_match(store, frame, max_points, level, rule):
+    start, end = pd.Timestamp("2024-01-10"), pd.Timestamp("2024-02-05")
+    for canal in ("A", "B"):
+        chosen, series = store.series(canal, start, end, max_points=max_points)
+        assert chosen == level
+        expected = resampled(frame, canal, rule).loc[start:end]
+        for metric in METRICS:
+            pd.testing.assert_series_equal(series[metric], expected[metric].dropna(), check_names=False, check_freq=False,
+                                           check_index_type=False)
+
+
+@pytest.mark.parametrize("max_points, level, rule", [(1000, 'hour', 'h'), (100, 'day', 'D')])
+def test_series_matches_a_pandas_resample_before_and_after_update(max_points, level, rule):
+    # The later readings overlap the first ones, so the update lands in existing buckets too
+    first, later = readings("2024-01-01", 24 * 30, seed=0), readings("2024-01-20", 24 * 30, seed=1)
+    store = TimeSeriesStore(METRICS)
+    store.update(first)
+    assert_series_match(store, first, max_points, level, rule)
+    store.update(later)
+    assert_series_match(store, pd.concat([first, later], ignore_index=True), max_points, level, rule)
+
+
+def test_series_thins_a_long_window_to_resampled_points():
+    frame = readings("2024-01-01", 24 * 30, seed=0)
+    store = TimeSeriesStore(METRICS)
+    store.update(frame)
+    chosen, series = store.series("A", max_points=200)
+    expected = resampled(frame, "A", 'h')['DO (mg/l)'].dropna()
+    assert chosen == 'hour' and len(expected) > 200
+    values = series['DO (mg/l)']
+    assert len(values) == 200
+    assert values.index[0] == expected.index[0] and values.index[-1] == expected.index[-1]
+    assert np.allclose(values, expected.loc[values.index])